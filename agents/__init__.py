@@ -1,3 +1,9 @@
 # agents/__init__.py
 # Permet l'import direct des agents du package.
-from .medical_agent import medical_agent
\ No newline at end of file
+# Import paresseux : `import agents` ne charge google.adk qu'à l'accès à l'agent.
+
+def __getattr__(name):
+    if name == "medical_agent":
+        from .medical_agent import medical_agent
+        return medical_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
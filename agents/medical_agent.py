@@ -1,17 +1,31 @@
 from google.adk.agents import Agent
+from google.adk.tools import FunctionTool
 from tools.diagnosis_tools import (
     diagnose, list_symptoms, suggest_questions, add_new_rule,
     explain_disease, get_patient_history, save_patient_interaction
 )
-import os
-import json
+from utils.config import get_app_config
+from utils.metrics import tool_metrics, track_tool
 
-def load_app_config():
-    config_path = os.environ.get("APP_CONFIG_PATH", "config/app_config.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
 
-app_config = load_app_config()
+class InstrumentedTool(FunctionTool):
+    """
+    FunctionTool mesuré (durée, appels, erreurs : voir utils/metrics.py).
+    La fonction outil n'est pas enveloppée : ADK construit la déclaration
+    envoyée au modèle (description, paramètres) à partir de `func` lui-même.
+    """
+
+    def __init__(self, func):
+        super().__init__(func)
+        tool_metrics(self.name)
+
+    async def run_async(self, *, args, tool_context):
+        with track_tool(self.name) as call:
+            call.result = await super().run_async(args=args, tool_context=tool_context)
+        return call.result
+
+
+app_config = get_app_config()
 MODEL_ID = app_config.get("default_model", "gemini-2.0-flash")
 
 medical_agent = Agent(
@@ -25,6 +39,7 @@ medical_agent = Agent(
         "Tu es un agent médical intelligent (et tu te fais passer pour le docteur Fox et te comporte comme tel), empathique, rigoureux. "
         "Guide l'utilisateur pour collecter tous les symptômes pertinents (un par un si besoin). "
         "Utilise 'diagnose' dès que possible pour proposer un diagnostic, toujours expliquer l'incertitude. "
+        "Les symptômes peuvent être passés aux outils tels que le patient les nomme (ex: {'toux': 'oui'}), ils sont reconnus automatiquement. "
         "Propose d'autres questions avec 'suggest_questions' si tu hésites. "
         "Utilise 'list_symptoms' pour savoir quoi demander. "
         "Tu peux aussi appeler 'add_new_rule' si un nouveau cas se présente. "
@@ -34,7 +49,8 @@ medical_agent = Agent(
         "Si dans la bases de fichiers de connaissances une maladie ne figure pas ou son traitement tu es libre d'utiliser tes connaissances a toi en tant que LLM."
 "si tu estime que la consultation est finie , dans ton dernier message du dois rajouter 'END_DIAG' a la fin"
     ),
-    tools=[
+    # Chaque outil est instrumenté (durée, appels, erreurs : voir utils/metrics.py)
+    tools=[InstrumentedTool(tool) for tool in (
         diagnose,
         list_symptoms,
         suggest_questions,
@@ -42,5 +58,5 @@ medical_agent = Agent(
         explain_disease,
         get_patient_history,
         save_patient_interaction
-    ]
+    )]
 )
\ No newline at end of file
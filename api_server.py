@@ -1,73 +1,34 @@
 import os
-import sys
-import json
 import logging
-import uuid
-import datetime
-from flask import Flask, request, jsonify, session
+import shutil
+import tempfile
+import time
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from agents.medical_agent import medical_agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
-import dotenv
 
+from services.runtime import (
+    app_config, APP_NAME, SESSION_SERVICE, RUNNER, SESSION_TRACKER, BATCH_MAX_WORKERS,
+    generate_session_id, generate_user_id, ensure_session, terminate_session, health_payload
+)
+from services.streaming import STREAMING_RUN_CONFIG, SSE_HEADERS, TurnStream, format_sse
 from utils.utils import sanitize_for_logging
+from utils.logging_setup import log_context
+from utils.tracing import start_trace, to_chrome_trace, trace_store
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS_REGISTRY, track_turn
+from tools.batch import check_batch_params, detect_format, iter_records, iter_jsonl_lines, score_records
+from tools.diagnosis_tools import RULES_FILE
+from tools.patient_store import is_valid_patient_id
+from tools.rule_only import rule_only_diagnosis
 
-# Charger les variables d'environnement
-dotenv.load_dotenv()
-
-# === CONFIG ===
-APP_CONFIG_PATH = os.environ.get("APP_CONFIG_PATH", "config/app_config.json")
-LOG_CONFIG_PATH = os.environ.get("LOG_CONFIG_PATH", "config/logging.json")
-
-
-def load_json_config(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-app_config = load_json_config(APP_CONFIG_PATH)
-logging_config = load_json_config(LOG_CONFIG_PATH)
-import logging.config
-
-logging.config.dictConfig(logging_config)
 logger = logging.getLogger("medical_expert_api")
 
-# Créer dossiers essentiels dynamiquement
-for d in [app_config["logs_dir"], app_config["sessions_dir"], os.path.join(app_config["data_dir"], "patients")]:
-    os.makedirs(d, exist_ok=True)
-
-APP_NAME = app_config.get("app_name", "medical_expert_adk")
-SESSION_SERVICE = InMemorySessionService()
-
 # Initialisation de l'application Flask
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", os.urandom(24).hex())
 # Activer CORS pour permettre les requêtes cross-origin (utile pour les clients Web)
 CORS(app)
 
-# Dictionnaire pour conserver les runners par session
-session_runners = {}
-
-
-def get_runner_for_session(session_id):
-    """Obtient ou crée un runner pour une session donnée."""
-    if session_id not in session_runners:
-        session_runners[session_id] = Runner(agent=medical_agent, app_name=APP_NAME, session_service=SESSION_SERVICE)
-    return session_runners[session_id]
-
-
-def generate_session_id():
-    """Génère un identifiant de session unique."""
-    dt = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"session_{dt}_{uuid.uuid4().hex[:4]}"
-
-
-def generate_user_id():
-    """Génère un identifiant utilisateur unique."""
-    return f"user_{uuid.uuid4().hex[:8]}"
-
 
 @app.route('/api/session/new', methods=['POST'])
 def create_session():
@@ -79,7 +40,11 @@ def create_session():
     session_id = data.get("session_id", generate_session_id())
 
     # Créer la session dans le service de session
-    SESSION_SERVICE.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    try:
+        SESSION_SERVICE.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    SESSION_TRACKER.touch(session_id, user_id)
 
     # Log de création de session
     logger.info(f"Nouvelle session API créée : session_id={session_id} user_id={user_id}")
@@ -105,35 +70,44 @@ def chat():
     user_id = data.get("user_id")
     session_id = data.get("session_id")
 
-    # Si l'un des identifiants est manquant, créer une nouvelle session
-    if not user_id or not session_id:
-        user_id = user_id or generate_user_id()
-        session_id = session_id or generate_session_id()
-        SESSION_SERVICE.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    # Si l'un des identifiants est manquant, ou si la session a expiré, créer une nouvelle session
+    user_id, session_id, created = ensure_session(user_id, session_id)
+    if created:
         logger.info(f"Nouvelle session API implicite : session_id={session_id} user_id={user_id}")
 
     message = data.get("message", "")
-    safe_message = sanitize_for_logging(message)
+    trace = start_trace(session_id, user_id, "api")
+    with trace.span("sanitize_for_logging", "logging", chars=len(message)):
+        safe_message = sanitize_for_logging(message)
 
     # Journaliser la requête
-    logger.info(f"API User({user_id}) [{session_id}] : {safe_message}")
+    with trace.span("logger.info", "logging"):
+        logger.info(f"API User({user_id}) [{session_id}] : {safe_message}",
+                    extra=log_context(session_id, user_id))
 
     # Préparer le contenu pour l'agent
     content = Content(role="user", parts=[Part(text=message)])
 
-    # Obtenir le runner pour cette session
-    runner = get_runner_for_session(session_id)
+    SESSION_TRACKER.touch(session_id, user_id)
 
     # Exécuter l'agent et récupérer la réponse finale
     response_text = ""
+    started = time.perf_counter()
     try:
-        for event in runner.run(user_id=user_id, session_id=session_id, new_message=content):
-            if event.is_final_response():
-                response_text = event.content.parts[0].text
+        with track_turn("api") as turn:
+            for event in RUNNER.run(user_id=user_id, session_id=session_id, new_message=content):
+                turn.event(event)
+                trace.event(event)
+                if event.is_final_response():
+                    response_text = event.content.parts[0].text
+        SESSION_TRACKER.record_turn(session_id)
 
         # Journaliser la réponse (après sanitization pour éviter les problèmes d'encodage)
-        safe_response = sanitize_for_logging(response_text)
-        logger.info(f"API Agent [{session_id}] : {safe_response}")
+        with trace.span("sanitize_for_logging", "logging", chars=len(response_text)):
+            safe_response = sanitize_for_logging(response_text)
+        with trace.span("logger.info", "logging"):
+            logger.info(f"API Agent [{session_id}] : {safe_response}",
+                        extra=log_context(session_id, user_id, started))
 
         return jsonify({
             "status": "success",
@@ -144,6 +118,7 @@ def chat():
 
     except Exception as e:
         error_msg = str(e)
+        trace.set_error(error_msg)
         logger.error(f"Erreur lors du traitement de la requête pour session={session_id}: {error_msg}")
         return jsonify({
             "status": "error",
@@ -151,6 +126,117 @@ def chat():
             "session_id": session_id,
             "error": error_msg
         }), 500
+    finally:
+        trace.finish()
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Variante de /api/chat en Server-Sent Events : texte partiel, début/fin des
+    appels d'outils et réponse finale sont transmis au fil de l'eau.
+    """
+    data = request.json or {}
+
+    if "message" not in data:
+        return jsonify({"status": "error", "message": "Le paramètre 'message' est requis"}), 400
+
+    user_id, session_id, created = ensure_session(data.get("user_id"), data.get("session_id"))
+    if created:
+        logger.info(f"Nouvelle session API implicite : session_id={session_id} user_id={user_id}")
+
+    message = data.get("message", "")
+    logger.info(f"API User({user_id}) [{session_id}] : {sanitize_for_logging(message)}",
+                extra=log_context(session_id, user_id))
+    content = Content(role="user", parts=[Part(text=message)])
+    SESSION_TRACKER.touch(session_id, user_id)
+
+    def generate():
+        stream = TurnStream()
+        started = time.perf_counter()
+        yield format_sse("session", {"user_id": user_id, "session_id": session_id})
+        try:
+            with track_turn("api_stream") as turn:
+                for event in RUNNER.run(user_id=user_id, session_id=session_id, new_message=content,
+                                        run_config=STREAMING_RUN_CONFIG):
+                    turn.event(event)
+                    yield from stream.translate(event)
+            SESSION_TRACKER.record_turn(session_id)
+            logger.info(f"API Agent [{session_id}] : {sanitize_for_logging(stream.final_text)}",
+                        extra=log_context(session_id, user_id, started))
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de la requête pour session={session_id}: {str(e)}")
+            yield format_sse("error", {"error": str(e)})
+        yield format_sse("done", {})
+
+    return Response(generate(), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.route('/api/diagnose', methods=['POST'])
+def diagnose_direct():
+    """
+    Diagnostic déterministe par le moteur de règles, sans appel au modèle.
+    Corps : {"symptoms": {symptôme: "yes"/"no"}, "patient_id": optionnel, "top_k": optionnel}
+    """
+    data = request.json or {}
+    symptoms = data.get("symptoms")
+    if not isinstance(symptoms, dict):
+        return jsonify({"status": "error", "message": "Le paramètre 'symptoms' (objet) est requis"}), 400
+    try:
+        top_k = int(data.get("top_k", 1))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Le paramètre 'top_k' doit être un entier"}), 400
+    patient_id = data.get("patient_id")
+    if patient_id is not None and not is_valid_patient_id(patient_id):
+        return jsonify({"status": "error", "message": "Le paramètre 'patient_id' est invalide (lettres, chiffres, '_' ou '-')"}), 400
+
+    result = rule_only_diagnosis(symptoms, patient_id=data.get("patient_id"), top_k=top_k)
+    logger.info(f"Diagnostic direct : patient={data.get('patient_id')} diagnostic={result.get('diagnosis')}")
+    return jsonify(result)
+
+
+@app.route('/api/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    """
+    Diagnostic en masse par le moteur de règles (sans LLM).
+
+    Le fichier JSONL/CSV est envoyé en multipart (champ 'file') ou en corps brut
+    (format via ?format=jsonl|csv ou le Content-Type). Il est recopié sur disque
+    par blocs, puis les résultats sont renvoyés en flux NDJSON au fil du calcul.
+    """
+    upload = request.files.get("file")
+    fmt = request.args.get("format")
+    try:
+        # Le client peut réduire le nombre de processus, pas dépasser la limite du serveur
+        workers = min(int(request.args.get("workers", BATCH_MAX_WORKERS)), BATCH_MAX_WORKERS)
+        chunk_size = int(request.args.get("chunk_size", app_config.get("batch_chunk_size", 1000)))
+        top_k = int(request.args.get("top_k", 3))
+        check_batch_params(workers, chunk_size, top_k)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Paramètres workers/chunk_size/top_k invalides"}), 400
+
+    fd, tmp_path = tempfile.mkstemp(prefix="batch_", suffix=".input")
+    with os.fdopen(fd, "wb") as tmp:
+        if upload is not None:
+            shutil.copyfileobj(upload.stream, tmp, 1 << 20)
+            fmt = fmt or detect_format(upload.filename or "")
+        else:
+            shutil.copyfileobj(request.stream, tmp, 1 << 20)
+            fmt = fmt or ("csv" if "csv" in (request.content_type or "") else "jsonl")
+
+    logger.info(f"Diagnostic batch : format={fmt} workers={workers} chunk_size={chunk_size}")
+
+    def generate():
+        try:
+            with open(tmp_path, "r", encoding="utf-8", newline="") as src:
+                results = score_records(iter_records(src, fmt), RULES_FILE,
+                                        workers=workers, chunk_size=chunk_size, top_k=top_k,
+                                        match_threshold=app_config.get("symptom_match_threshold", 0.6))
+                yield from iter_jsonl_lines(results)
+        finally:
+            os.remove(tmp_path)
+
+    return Response(generate(), mimetype="application/x-ndjson")
 
 
 @app.route('/api/history', methods=['GET'])
@@ -180,11 +266,11 @@ def end_session():
         return jsonify({"status": "error", "message": "Le paramètre 'session_id' est requis"}), 400
 
     session_id = data["session_id"]
-    user_id = data.get("user_id", "unknown")
 
-    # Supprimer le runner associé à cette session
-    if session_id in session_runners:
-        del session_runners[session_id]
+    # Supprimer la session (état, événements) et oublier son suivi
+    user_id = terminate_session(session_id, data.get("user_id"))
+    if user_id is None:
+        return jsonify({"status": "error", "message": "Le paramètre 'user_id' est requis pour cette session"}), 400
 
     # Log de fin de session
     logger.info(f"Fin session API : session_id={session_id} user_id={user_id}")
@@ -198,12 +284,28 @@ def end_session():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Vérifie si l'API est en cours d'exécution."""
-    return jsonify({
-        "status": "ok",
-        "message": "Medical Expert API is running",
-        "version": app_config.get("version", "1.0.0"),
-        "timestamp": datetime.datetime.now().isoformat()
-    })
+    return jsonify(health_payload())
+
+
+@app.route('/api/debug/trace/<session_id>', methods=['GET'])
+def debug_trace(session_id):
+    """
+    Traces des derniers tours d'une session (si `tracing_enabled`).
+    `?format=chrome` : export Chrome trace-event (chrome://tracing, Perfetto).
+    """
+    store = trace_store()
+    if store is None:
+        return jsonify({"status": "error", "message": "Traçage désactivé (tracing_enabled)"}), 404
+    traces = store.for_session(session_id)
+    if request.args.get("format") == "chrome":
+        return jsonify(to_chrome_trace(traces))
+    return jsonify({"status": "success", "session_id": session_id, "traces": traces})
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Métriques au format texte Prometheus (outils, tours d'agent, sessions)."""
+    return Response(METRICS_REGISTRY.render(), mimetype=METRICS_CONTENT_TYPE)
 
 
 # Gestionnaire d'erreurs pour les routes non trouvées
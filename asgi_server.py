@@ -0,0 +1,325 @@
+"""
+Variante ASGI de l'API (mêmes routes que `api_server.py`), pilotant
+`Runner.run_async` : un tour d'agent n'occupe plus un thread pendant toute la
+durée des appels au modèle, et un seul processus peut tenir des centaines de
+consultations simultanées.
+
+- `asgi_max_concurrent_turns` plafonne les tours (donc les appels au modèle) en vol.
+- Les tours d'une même session sont sérialisés, dans l'ordre d'arrivée.
+- Le service de sessions (SQLite) n'est pas appelé sur la boucle : création et
+  chargement passent par le pool de threads, et les événements ajoutés par
+  `run_async` sont écrits par le thread d'écriture du service.
+
+Lancement :
+    python asgi_server.py
+    # ou : uvicorn asgi_server:app --host 0.0.0.0 --port 8000
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from google.genai.types import Content, Part
+
+from services.concurrency import SessionLocks, TurnLimiter, TurnLimitExceeded
+from services.streaming import STREAMING_RUN_CONFIG, SSE_HEADERS, TurnStream, format_sse
+from services.runtime import (
+    app_config, APP_NAME, SESSION_SERVICE, RUNNER, SESSION_TRACKER, BATCH_MAX_WORKERS,
+    generate_session_id, generate_user_id, ensure_session, terminate_session, health_payload
+)
+from utils.utils import sanitize_for_logging
+from utils.logging_setup import log_context
+from utils.tracing import start_trace, to_chrome_trace, trace_store
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS_REGISTRY, track_turn
+from tools.batch import check_batch_params, detect_format, iter_records, iter_jsonl_lines, score_records
+from tools.diagnosis_tools import RULES_FILE
+from tools.patient_store import is_valid_patient_id
+from tools.rule_only import rule_only_diagnosis
+
+logger = logging.getLogger("medical_expert_asgi")
+
+TURN_LIMITER = TurnLimiter(
+    max_in_flight=app_config.get("asgi_max_concurrent_turns", 64),
+    queue_timeout=app_config.get("asgi_queue_timeout_seconds", 30)
+)
+SESSION_LOCKS = SessionLocks()
+
+app = FastAPI(title="Medical Expert API (ASGI)", version=app_config.get("version", "1.0.0"))
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+async def _json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _error(message, status_code, **extra):
+    return JSONResponse({"status": "error", "message": message, **extra}, status_code=status_code)
+
+
+@app.post("/api/session/new")
+async def create_session(request: Request):
+    """Crée une nouvelle session et retourne ses identifiants."""
+    data = await _json_body(request)
+    user_id = data.get("user_id", generate_user_id())
+    session_id = data.get("session_id", generate_session_id())
+    try:
+        await run_in_threadpool(SESSION_SERVICE.create_session, app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    except ValueError as e:
+        return _error(str(e), 409)
+    SESSION_TRACKER.touch(session_id, user_id)
+    logger.info(f"Nouvelle session API créée : session_id={session_id} user_id={user_id}")
+    return {
+        "status": "success",
+        "user_id": user_id,
+        "session_id": session_id,
+        "message": "Session créée avec succès"
+    }
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    """Point d'entrée principal pour la conversation avec l'agent."""
+    data = await _json_body(request)
+    if "message" not in data:
+        return _error("Le paramètre 'message' est requis", 400)
+
+    # Accès SQLite : dans le pool de threads, pas sur la boucle d'événements
+    user_id, session_id, created = await run_in_threadpool(ensure_session, data.get("user_id"), data.get("session_id"))
+    if created:
+        logger.info(f"Nouvelle session API implicite : session_id={session_id} user_id={user_id}")
+
+    message = data.get("message", "")
+    logger.info(f"API User({user_id}) [{session_id}] : {sanitize_for_logging(message)}",
+                extra=log_context(session_id, user_id))
+    content = Content(role="user", parts=[Part(text=message)])
+    SESSION_TRACKER.touch(session_id, user_id)
+
+    response_text = ""
+    started = time.perf_counter()
+    trace = start_trace(session_id, user_id, "asgi")
+    try:
+        async with SESSION_LOCKS.hold(session_id), TURN_LIMITER.slot():
+            await run_in_threadpool(SESSION_SERVICE.warm, app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            with track_turn("asgi") as turn:
+                async for event in RUNNER.run_async(user_id=user_id, session_id=session_id, new_message=content):
+                    turn.event(event)
+                    trace.event(event)
+                    if event.is_final_response():
+                        response_text = event.content.parts[0].text
+        SESSION_TRACKER.record_turn(session_id)
+        with trace.span("sanitize_for_logging + logger.info", "logging", chars=len(response_text)):
+            logger.info(f"API Agent [{session_id}] : {sanitize_for_logging(response_text)}",
+                        extra=log_context(session_id, user_id, started))
+        return {
+            "status": "success",
+            "user_id": user_id,
+            "session_id": session_id,
+            "response": response_text
+        }
+    except TurnLimitExceeded:
+        trace.set_error("Serveur saturé")
+        logger.warning(f"Capacité maximale atteinte, requête rejetée pour session={session_id}")
+        return JSONResponse({
+            "status": "error",
+            "user_id": user_id,
+            "session_id": session_id,
+            "error": "Serveur saturé, réessayez plus tard"
+        }, status_code=503)
+    except Exception as e:
+        error_msg = str(e)
+        trace.set_error(error_msg)
+        logger.error(f"Erreur lors du traitement de la requête pour session={session_id}: {error_msg}")
+        return JSONResponse({
+            "status": "error",
+            "user_id": user_id,
+            "session_id": session_id,
+            "error": error_msg
+        }, status_code=500)
+    finally:
+        trace.finish()
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: Request):
+    """Variante de /api/chat en Server-Sent Events (voir services/streaming.py)."""
+    data = await _json_body(request)
+    if "message" not in data:
+        return _error("Le paramètre 'message' est requis", 400)
+
+    # Accès SQLite : dans le pool de threads, pas sur la boucle d'événements
+    user_id, session_id, created = await run_in_threadpool(ensure_session, data.get("user_id"), data.get("session_id"))
+    if created:
+        logger.info(f"Nouvelle session API implicite : session_id={session_id} user_id={user_id}")
+
+    message = data.get("message", "")
+    logger.info(f"API User({user_id}) [{session_id}] : {sanitize_for_logging(message)}",
+                extra=log_context(session_id, user_id))
+    content = Content(role="user", parts=[Part(text=message)])
+    SESSION_TRACKER.touch(session_id, user_id)
+
+    async def generate():
+        stream = TurnStream()
+        started = time.perf_counter()
+        yield format_sse("session", {"user_id": user_id, "session_id": session_id})
+        try:
+            async with SESSION_LOCKS.hold(session_id), TURN_LIMITER.slot():
+                await run_in_threadpool(SESSION_SERVICE.warm, app_name=APP_NAME, user_id=user_id,
+                                        session_id=session_id)
+                with track_turn("asgi_stream") as turn:
+                    async for event in RUNNER.run_async(user_id=user_id, session_id=session_id,
+                                                        new_message=content, run_config=STREAMING_RUN_CONFIG):
+                        turn.event(event)
+                        for chunk in stream.translate(event):
+                            yield chunk
+            SESSION_TRACKER.record_turn(session_id)
+            logger.info(f"API Agent [{session_id}] : {sanitize_for_logging(stream.final_text)}",
+                        extra=log_context(session_id, user_id, started))
+        except TurnLimitExceeded:
+            logger.warning(f"Capacité maximale atteinte, requête rejetée pour session={session_id}")
+            yield format_sse("error", {"error": "Serveur saturé, réessayez plus tard"})
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de la requête pour session={session_id}: {str(e)}")
+            yield format_sse("error", {"error": str(e)})
+        yield format_sse("done", {})
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.post("/api/diagnose")
+async def diagnose_direct(request: Request):
+    """Diagnostic déterministe par le moteur de règles, sans appel au modèle."""
+    data = await _json_body(request)
+    symptoms = data.get("symptoms")
+    if not isinstance(symptoms, dict):
+        return _error("Le paramètre 'symptoms' (objet) est requis", 400)
+    try:
+        top_k = int(data.get("top_k", 1))
+    except (TypeError, ValueError):
+        return _error("Le paramètre 'top_k' doit être un entier", 400)
+    patient_id = data.get("patient_id")
+    if patient_id is not None and not is_valid_patient_id(patient_id):
+        return _error("Le paramètre 'patient_id' est invalide (lettres, chiffres, '_' ou '-')", 400)
+
+    # Lecture de fichiers (textes, historique) : hors de la boucle d'événements
+    result = await run_in_threadpool(rule_only_diagnosis, symptoms, data.get("patient_id"), top_k)
+    logger.info(f"Diagnostic direct : patient={data.get('patient_id')} diagnostic={result.get('diagnosis')}")
+    return result
+
+
+@app.post("/api/diagnose/batch")
+async def diagnose_batch(request: Request):
+    """
+    Diagnostic en masse par le moteur de règles (sans LLM), comme la route Flask :
+    le corps brut (JSONL/CSV) est recopié sur disque par blocs, puis les
+    résultats sont renvoyés en flux NDJSON.
+    """
+    params = request.query_params
+    try:
+        # Le client peut réduire le nombre de processus, pas dépasser la limite du serveur
+        workers = min(int(params.get("workers", BATCH_MAX_WORKERS)), BATCH_MAX_WORKERS)
+        chunk_size = int(params.get("chunk_size", app_config.get("batch_chunk_size", 1000)))
+        top_k = int(params.get("top_k", 3))
+        check_batch_params(workers, chunk_size, top_k)
+    except ValueError:
+        return _error("Paramètres workers/chunk_size/top_k invalides", 400)
+    fmt = params.get("format") or detect_format(params.get("filename", ""),
+                                                default="csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+
+    # Écritures disque dans le pool de threads : seule la réception du corps reste sur la boucle
+    fd, tmp_path = await run_in_threadpool(tempfile.mkstemp, prefix="batch_", suffix=".input")
+    tmp = os.fdopen(fd, "wb")
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        await run_in_threadpool(tmp.close)
+        os.remove(tmp_path)
+        raise
+    await run_in_threadpool(tmp.close)
+    logger.info(f"Diagnostic batch : format={fmt} workers={workers} chunk_size={chunk_size}")
+
+    def generate():
+        try:
+            with open(tmp_path, "r", encoding="utf-8", newline="") as src:
+                results = score_records(iter_records(src, fmt), RULES_FILE,
+                                        workers=workers, chunk_size=chunk_size, top_k=top_k,
+                                        match_threshold=app_config.get("symptom_match_threshold", 0.6))
+                yield from iter_jsonl_lines(results)
+        finally:
+            os.remove(tmp_path)
+
+    # Itérateur synchrone : Starlette le consomme dans son pool de threads
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.get("/api/history")
+async def get_history(user_id: str = None, session_id: str = None):
+    """Récupère l'historique de conversation d'une session spécifique."""
+    if not user_id or not session_id:
+        return _error("Les paramètres user_id et session_id sont requis", 400)
+    return {
+        "status": "success",
+        "message": "Fonctionnalité d'historique pas encore implémentée. Vous devriez stocker l'historique côté client ou implémenter un stockage persistant."
+    }
+
+
+@app.post("/api/session/end")
+async def end_session(request: Request):
+    """Termine une session existante."""
+    data = await _json_body(request)
+    if "session_id" not in data:
+        return _error("Le paramètre 'session_id' est requis", 400)
+    session_id = data["session_id"]
+    user_id = await run_in_threadpool(terminate_session, session_id, data.get("user_id"))
+    if user_id is None:
+        return _error("Le paramètre 'user_id' est requis pour cette session", 400)
+    logger.info(f"Fin session API : session_id={session_id} user_id={user_id}")
+    return {
+        "status": "success",
+        "message": "Session terminée avec succès"
+    }
+
+
+@app.get("/api/health")
+async def health_check():
+    """Vérifie si l'API est en cours d'exécution."""
+    payload = await run_in_threadpool(health_payload)
+    payload["turns"] = TURN_LIMITER.stats()
+    payload["session_locks"] = len(SESSION_LOCKS)
+    return payload
+
+
+@app.get("/api/debug/trace/{session_id}")
+async def debug_trace(session_id: str, format: str = None):
+    """Traces des derniers tours d'une session (voir la route Flask)."""
+    store = trace_store()
+    if store is None:
+        return _error("Traçage désactivé (tracing_enabled)", 404)
+    traces = store.for_session(session_id)
+    if format == "chrome":
+        return to_chrome_trace(traces)
+    return {"status": "success", "session_id": session_id, "traces": traces}
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Métriques au format texte Prometheus (outils, tours d'agent, sessions)."""
+    return PlainTextResponse(METRICS_REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("API_PORT", app_config.get("api_port", 8000)))
+    host = os.environ.get("API_HOST", app_config.get("api_host", "0.0.0.0"))
+    print(f"=== Démarrage du serveur ASGI Medical Expert sur {host}:{port} ===")
+    uvicorn.run(app, host=host, port=port)
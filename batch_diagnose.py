@@ -0,0 +1,48 @@
+"""
+Diagnostic en masse hors ligne (sans LLM) à partir de fichiers JSONL/CSV.
+
+Exemple :
+    python batch_diagnose.py data/campagne.csv data/campagne_resultats.jsonl --workers 8 --top-k 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from tools.batch import check_batch_params, score_file
+from utils.config import get_app_config
+
+
+def main(argv=None):
+    app_config = get_app_config()
+    default_rules = os.path.join(app_config.get("data_dir", "data/"), "disease_rules.json")
+
+    parser = argparse.ArgumentParser(description="Diagnostic en masse par le moteur de règles.")
+    parser.add_argument("input", help="Fichier d'entrée (.jsonl ou .csv)")
+    parser.add_argument("output", help="Fichier de sortie (.jsonl)")
+    parser.add_argument("--rules", default=default_rules, help="Fichier de règles (disease_rules.json)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="Format d'entrée (déduit de l'extension par défaut)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Enregistrements par bloc")
+    parser.add_argument("--top-k", type=int, default=3, help="Nombre de candidats classés par enregistrement")
+    args = parser.parse_args(argv)
+
+    try:
+        check_batch_params(args.workers, args.chunk_size, args.top_k)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    count = score_file(
+        args.input, args.output, args.rules, fmt=args.format,
+        workers=args.workers, chunk_size=args.chunk_size, top_k=args.top_k,
+        match_threshold=app_config.get("symptom_match_threshold", 0.6)
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{count} enregistrements traités en {elapsed:.2f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Compare, sur des bases de règles synthétiques de taille réaliste, le
+diagnostic par :
+- la boucle Python d'origine (une comparaison par symptôme et par maladie) ;
+- `ScoringEngine` (masques de bits) ;
+- Experta avec un moteur réutilisé (`reset()` + nouveaux faits) ;
+- Experta avec un moteur neuf par appel (compilation du réseau Rete à chaque fois).
+
+Les scores d'Experta sont vérifiés contre ceux de la boucle d'origine.
+
+Lancement (depuis la racine du projet) :
+    python benchmarks/bench_experta.py
+    python benchmarks/bench_experta.py --diseases 50 200 1000 --symptoms 300 --queries 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.experta_adapter import build_engine_class
+from tools.scoring import ScoringEngine
+
+
+def legacy_diagnose(rules, symptoms):
+    """Boucle d'origine de `diagnose` (référence)."""
+    best_match = None
+    max_score = -1
+    for disease, rule_symptoms in rules.items():
+        score = 0
+        for symptom, expected in rule_symptoms.items():
+            if symptoms.get(symptom, "").lower() == expected.lower():
+                score += 1
+        if score > max_score:
+            max_score = score
+            best_match = disease
+    return best_match, max_score
+
+
+def synthetic_rules(rng, n_diseases, n_symptoms, per_rule):
+    vocabulary = [f"symptom_{i:04d}" for i in range(n_symptoms)]
+    return {
+        f"disease_{d:05d}": {s: rng.choice(("yes", "no")) for s in rng.sample(vocabulary, per_rule)}
+        for d in range(n_diseases)
+    }, vocabulary
+
+
+def synthetic_queries(rng, vocabulary, count, answered):
+    return [{s: rng.choice(("yes", "no", "Oui", "NO")) for s in rng.sample(vocabulary, answered)}
+            for _ in range(count)]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Boucle Python vs bitsets vs Experta (Rete)")
+    parser.add_argument("--diseases", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--symptoms", type=int, default=300, help="Taille du vocabulaire")
+    parser.add_argument("--per-rule", type=int, default=12, help="Symptômes par règle")
+    parser.add_argument("--answered", type=int, default=10, help="Réponses par patient")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--fresh-queries", type=int, default=10,
+                        help="Appels mesurés avec un moteur neuf (coûteux)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    print(f"{'maladies':>8} {'boucle':>10} {'bitsets':>10} {'experta':>10} {'experta neuf':>13}   (ms/appel)")
+    for n_diseases in args.diseases:
+        rules, vocabulary = synthetic_rules(rng, n_diseases, args.symptoms, args.per_rule)
+        queries = synthetic_queries(rng, vocabulary, args.queries, args.answered)
+        scoring = ScoringEngine(rules)
+        engine_class = build_engine_class(scoring)
+        engine = engine_class()
+
+        loop_ms, expected = timed(lambda q: legacy_diagnose(rules, q), queries)
+        bits_ms, _ = timed(scoring.best, queries)
+        pooled_ms, got = timed(engine.diagnose, queries)
+        # Comparaison sur les scores : l'ordre à égalité est aussi celui du fichier
+        assert got == expected, "Experta et la boucle d'origine divergent"
+        fresh_ms, _ = timed(lambda q: engine_class().diagnose(q), queries[:args.fresh_queries])
+        print(f"{n_diseases:>8} {loop_ms:>10.3f} {bits_ms:>10.3f} {pooled_ms:>10.3f} {fresh_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare le chargement de la base de règles par N workers (processus forkés,
+comme sous un serveur préforké) :
+- depuis les fichiers JSON (chaque worker parse et compile sa copie) ;
+- depuis l'index binaire projeté en mémoire (`tools/rule_index.py`).
+
+Pour chaque mode : temps de chargement moyen par worker, temps moyen d'un
+diagnostic, et mémoire privée (USS, `/proc/<pid>/smaps_rollup`, Linux
+uniquement) ajoutée par le chargement et les diagnostics. Les classements sont
+vérifiés identiques dans les deux modes.
+
+Lancement (depuis la racine du projet) :
+    python benchmarks/bench_rule_index.py --diseases 20000 --symptoms 1000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import generate_dataset, symptom_names
+from tools.rule_base import RuleBase
+from tools.rule_index import build_rule_index
+
+
+def private_kb():
+    """Mémoire privée du processus (Ko), ou None hors Linux."""
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    return sum(int(fields[k].split()[0]) for k in ("Private_Clean", "Private_Dirty") if k in fields)
+
+
+def load_worker(args):
+    paths, index_path, queries = args
+    before = private_kb()
+    start = time.perf_counter()
+    snapshot = RuleBase(*paths, index_path=index_path).snapshot()
+    engine = snapshot.scoring_engine()
+    elapsed = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    ranks = [engine.rank(q, 3) for q in queries]
+    query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    after = private_kb()
+    return elapsed, (after - before) if before is not None else None, ranks, query_ms
+
+
+def run(paths, index_path, workers, queries):
+    with get_context("fork").Pool(workers) as pool:
+        results = pool.map(load_worker, [(paths, index_path, queries)] * workers)
+    load_ms = sum(r[0] for r in results) / workers
+    query_ms = sum(r[3] for r in results) / workers
+    memory = [r[1] for r in results if r[1] is not None]
+    return load_ms, query_ms, (sum(memory) / len(memory) if memory else None), results[0][2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chargement JSON vs index binaire partagé")
+    parser.add_argument("--diseases", type=int, default=10000)
+    parser.add_argument("--symptoms", type=int, default=1000)
+    parser.add_argument("--per-rule", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="medical_index_")
+    try:
+        generate_dataset(workdir, args.diseases, args.symptoms, args.per_rule, patients=0, history=0,
+                         text_words=1, seed=args.seed)
+        paths = tuple(os.path.join(workdir, name)
+                      for name in ("disease_rules.json", "disease_symptoms.json", "symptom_questions.json"))
+        index_path = os.path.join(workdir, "disease_rules.idx")
+        start = time.perf_counter()
+        build_rule_index(paths[0], paths[2], index_path)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(args.seed)
+        vocabulary = symptom_names(args.symptoms)
+        queries = [{s: rng.choice(("yes", "no")) for s in rng.sample(vocabulary, 8)} for _ in range(20)]
+
+        json_ms, json_query_ms, json_kb, json_ranks = run(paths, None, args.workers, queries)
+        index_ms, index_query_ms, index_kb, index_ranks = run(paths, index_path, args.workers, queries)
+        assert json_ranks == index_ranks, "classements différents entre JSON et index"
+
+        print(f"{args.diseases} maladies, {args.symptoms} symptômes, {args.workers} workers")
+        print(f"index : {os.path.getsize(index_path) / 1024:.0f} Ko, compilé en {build_ms:.0f} ms")
+        print(f"{'mode':<8} {'chargement/worker':>18} {'diagnostic':>12} {'mémoire privée/worker':>22}")
+        for name, ms, query_ms, kb in (("json", json_ms, json_query_ms, json_kb),
+                                       ("index", index_ms, index_query_ms, index_kb)):
+            memory = f"{kb / 1024:.1f} Mo" if kb is not None else "n/d"
+            print(f"{name:<8} {ms:>15.1f} ms {query_ms:>9.2f} ms {memory:>22}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
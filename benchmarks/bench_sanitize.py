@@ -0,0 +1,77 @@
+"""
+Compare `sanitize_for_logging` à l'implémentation d'origine (remplacements
+successifs puis concaténation caractère par caractère) : vérifie que les
+sorties sont identiques, puis mesure les temps sur des réponses de plusieurs Ko.
+
+Lancement (depuis la racine du projet) :
+    python benchmarks/bench_sanitize.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.utils import _EMOJI_REPLACEMENTS, sanitize_for_logging
+
+
+def legacy_sanitize_for_logging(text):
+    """Implémentation d'origine, conservée comme référence."""
+    for emoji, replacement in dict(_EMOJI_REPLACEMENTS).items():
+        text = text.replace(emoji, replacement)
+    cleaned_text = ''
+    for char in text:
+        if ord(char) < 128:
+            cleaned_text += char
+        else:
+            try:
+                char.encode('cp1252')
+                cleaned_text += char
+            except UnicodeEncodeError:
+                cleaned_text += '?'
+    return cleaned_text
+
+
+ALPHABET = (
+    "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJ.,;:!?\n0123456789"
+    "éèêàçùôîœ€«»’–—" "αβγ中文✓☺️"
+    + "".join(_EMOJI_REPLACEMENTS)
+)
+
+
+def random_text(rng, size):
+    return "".join(rng.choice(ALPHABET) for _ in range(size))
+
+
+def check_identical(rng, cases=2000):
+    samples = [random_text(rng, rng.randint(0, 300)) for _ in range(cases)]
+    samples += ["", "☺️", "☺", "️", "☺️☺️😀", "Bonjour, j'ai de la fièvre 🤔"]
+    for text in samples:
+        expected = legacy_sanitize_for_logging(text)
+        got = sanitize_for_logging(text)
+        assert got == expected, (text, expected, got)
+    return len(samples)
+
+
+def bench(label, text, number):
+    legacy = timeit.timeit(lambda: legacy_sanitize_for_logging(text), number=number) / number
+    current = timeit.timeit(lambda: sanitize_for_logging(text), number=number) / number
+    print(f"{label:<28} {len(text):>7} car.  ancien {legacy * 1e6:10.1f} µs  "
+          f"nouveau {current * 1e6:8.1f} µs  x{legacy / current:6.1f}")
+
+
+def main():
+    rng = random.Random(42)
+    print(f"Sorties identiques sur {check_identical(rng)} textes")
+    french = ("Selon vos symptômes, il pourrait s'agir d'une grippe. Reposez-vous, "
+              "buvez beaucoup d'eau et consultez un médecin si la fièvre persiste. 🙂\n")
+    for size in (1_000, 8_000, 32_000):
+        bench("réponse en français", (french * (size // len(french) + 1))[:size], 200)
+        bench("texte aléatoire", random_text(rng, size), 100)
+    bench("ASCII pur", ("Fever and cough. " * 500), 500)
+
+
+if __name__ == "__main__":
+    main()
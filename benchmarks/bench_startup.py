@@ -0,0 +1,82 @@
+"""
+Temps d'import des points d'entrée, mesuré avec `python -X importtime` dans
+un processus neuf (moyenne de plusieurs lancements). Sert à repérer une
+régression : un import lourd (google.adk, google.genai…) qui redevient
+immédiat sur un chemin qui n'en a pas besoin.
+
+Lancement (depuis la racine du projet) :
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --budget tools.rule_only=200
+    python benchmarks/bench_startup.py --top 10 main
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules qui ne doivent pas charger google.adk à l'import
+DEFAULT_MODULES = ("main", "batch_diagnose", "tools.rule_only", "tools.diagnosis_tools", "agents", "services")
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module):
+    """Retourne ({module: µs cumulées}, total µs) pour un import à froid."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} a échoué :\n{result.stderr[-2000:]}")
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative, cumulative.get(module, 0)
+
+
+def heavy_imports(profile):
+    return sorted(name for name in ("google.adk", "google.genai") if name in profile)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temps de démarrage (import) des points d'entrée")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=3, help="Lancements par module (moyenne)")
+    parser.add_argument("--top", type=int, default=0, help="Afficher les N imports les plus coûteux")
+    parser.add_argument("--budget", action="append", default=[],
+                        help="module=ms : échec (code 1) si le temps moyen dépasse le budget")
+    args = parser.parse_args(argv)
+    budgets = {name: float(ms) for name, ms in (b.split("=", 1) for b in args.budget)}
+
+    failed = False
+    for module in args.modules:
+        totals = []
+        per_module = defaultdict(int)
+        for _ in range(args.runs):
+            profile, total = import_profile(module)
+            totals.append(total)
+            for name, us in profile.items():
+                per_module[name] += us
+        mean_ms = sum(totals) / len(totals) / 1000
+        heavy = heavy_imports(per_module)
+        status = ""
+        if module in budgets and mean_ms > budgets[module]:
+            status = f"  DÉPASSE le budget de {budgets[module]:.0f} ms"
+            failed = True
+        print(f"{module:<28} {mean_ms:9.1f} ms  lourds: {', '.join(heavy) or '-'}{status}")
+        if args.top:
+            ranked = sorted(per_module.items(), key=lambda item: item[1], reverse=True)
+            for name, us in ranked[1:args.top + 1]:
+                print(f"    {name:<40} {us / args.runs / 1000:9.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Suite de benchmarks des outils de l'agent sur un jeu de données synthétique
+(voir `synthetic.py`) : latence par appel (moyenne, p50, p95) et mémoire
+(pic `tracemalloc` pendant les appels), pour `diagnose`, `list_symptoms`,
+`suggest_questions`, `explain_disease`, `save_patient_interaction`,
+`get_patient_history` et `sanitize_for_logging`.
+
+Les résultats peuvent être enregistrés comme référence, puis comparés à
+chaque lancement (code de sortie 1 en cas de régression au-delà de la
+tolérance) :
+
+    python benchmarks/bench_suite.py --diseases 10000 --symptoms 1000 --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --diseases 10000 --symptoms 1000 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import generate_dataset, symptom_names, disease_names
+
+REPLY = ("Selon vos symptômes, il pourrait s'agir d'une grippe saisonnière. Reposez-vous, "
+         "buvez beaucoup d'eau et consultez un médecin si la fièvre dépasse 39 °C. 🙂 ")
+
+
+def prepare_environment(workdir, args):
+    """Génère les données et pointe la configuration de l'application dessus."""
+    data_dir = os.path.join(workdir, "data") + os.sep
+    started = time.perf_counter()
+    info = generate_dataset(data_dir, args.diseases, args.symptoms, args.per_rule,
+                            args.patients, args.history, seed=args.seed)
+    info["generation_s"] = round(time.perf_counter() - started, 2)
+
+    with open(os.path.join(ROOT, "config", "app_config.json"), "r", encoding="utf-8") as f:
+        app_config = json.load(f)
+    app_config["data_dir"] = data_dir
+    config_path = os.path.join(workdir, "app_config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(app_config, f)
+    # À faire avant d'importer les outils : leurs chemins sont lus à l'import
+    os.environ["APP_CONFIG_PATH"] = config_path
+    return info
+
+
+def measure(fn, iterations, memory_iterations):
+    """Latences (ms) puis pic mémoire (Ko) d'une série d'appels `fn(i)`."""
+    fn(0)  # échauffement (chargements paresseux)
+    samples = []
+    for i in range(1, iterations + 1):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for i in range(iterations + 1, iterations + 1 + memory_iterations):
+        fn(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+
+def measure_load(tools):
+    """Chargement et compilation de la base de règles (une seule fois)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    base = tools.current_rule_base()
+    base.scoring_engine()
+    base.question_planner()
+    elapsed = (time.perf_counter() - start) * 1000
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mean_ms": round(elapsed, 4), "p50_ms": round(elapsed, 4), "p95_ms": round(elapsed, 4),
+            "peak_kb": round(peak / 1024, 1), "retained_kb": round(current / 1024, 1)}
+
+
+def build_cases(tools, sanitize, info, args):
+    rng = random.Random(args.seed + 1)
+    symptoms = symptom_names(info["symptoms"])
+    diseases = disease_names(info["diseases"])
+    answers = lambda n: {s: rng.choice(("yes", "no")) for s in rng.sample(symptoms, min(n, len(symptoms)))}
+    queries = [answers(args.answered) for _ in range(args.iterations * 2 + 2)]
+    partial = [answers(3) for _ in range(args.iterations * 2 + 2)]
+    reply = (REPLY * (args.reply_kb * 1024 // len(REPLY) + 1))[:args.reply_kb * 1024]
+    big_patient = info["patients"][0]
+    writer = info["patients"][-1]
+
+    return {
+        "diagnose": lambda i: tools.diagnose(queries[i]),
+        "diagnose_top5": lambda i: tools.diagnose(queries[-1 - i], top_k=5),
+        "diagnose_cache_hit": lambda i: tools.diagnose(queries[0]),
+        "list_symptoms": lambda i: tools.list_symptoms(),
+        "suggest_questions": lambda i: tools.suggest_questions(partial[i]),
+        "explain_disease": lambda i: tools.explain_disease(diseases[i * 7919 % len(diseases)]),
+        "save_patient_interaction": lambda i: tools.save_patient_interaction(
+            writer, {"symptoms": queries[i], "diagnosis": diseases[i % len(diseases)], "score": 3}),
+        "get_patient_history": lambda i: tools.get_patient_history(big_patient),
+        f"sanitize_for_logging_{args.reply_kb}kb": lambda i: sanitize(reply),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms=0.05, min_delta_kb=64):
+    """
+    Liste des régressions : métrique au-delà de baseline * (1 + tolérance) et
+    d'un écart absolu minimal (les mesures de quelques µs sont trop bruitées).
+    """
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "peak_kb"):
+            old, new = reference.get(key), metrics.get(key)
+            min_delta = min_delta_kb if key == "peak_kb" else min_delta_ms
+            if old and new is not None and new > old * (1 + tolerance) and new - old > min_delta:
+                regressions.append(f"{name}.{key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des outils sur données synthétiques")
+    parser.add_argument("--diseases", type=int, default=1000)
+    parser.add_argument("--symptoms", type=int, default=200)
+    parser.add_argument("--per-rule", type=int, default=12, help="Symptômes par règle")
+    parser.add_argument("--patients", type=int, default=3)
+    parser.add_argument("--history", type=int, default=5000, help="Entrées par historique patient")
+    parser.add_argument("--answered", type=int, default=8, help="Réponses par requête de diagnostic")
+    parser.add_argument("--reply-kb", type=int, default=4, help="Taille des réponses à nettoyer")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--memory-iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Écrire les résultats (JSON) dans ce fichier")
+    parser.add_argument("--save-baseline", help="Enregistrer les résultats comme référence")
+    parser.add_argument("--baseline", help="Comparer à cette référence (échec si régression)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Écart relatif toléré (0.25 = +25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Écart absolu minimal (ms) d'une régression")
+    parser.add_argument("--min-delta-kb", type=float, default=64, help="Écart absolu minimal (Ko) d'une régression")
+    parser.add_argument("--keep", action="store_true", help="Conserver le dossier de données généré")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="medical_bench_")
+    try:
+        info = prepare_environment(workdir, args)
+        from tools import diagnosis_tools as tools
+        from utils.utils import sanitize_for_logging
+
+        results = {"load_rule_base": measure_load(tools)}
+        for name, fn in build_cases(tools, sanitize_for_logging, info, args).items():
+            results[name] = measure(fn, args.iterations, args.memory_iterations)
+        tools.PATIENT_LOG.flush()
+    finally:
+        if args.keep:
+            print(f"Données conservées dans {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{info['diseases']} maladies, {info['symptoms']} symptômes, "
+          f"{info['history']} entrées d'historique (génération : {info['generation_s']} s)")
+    print(f"{'benchmark':<30} {'moyenne':>10} {'p50':>10} {'p95':>10} {'pic mém.':>12}")
+    for name, m in results.items():
+        print(f"{name:<30} {m['mean_ms']:>8.3f}ms {m['p50_ms']:>8.3f}ms {m['p95_ms']:>8.3f}ms {m['peak_kb']:>9.1f} Ko")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items()
+                       if k not in ("output", "save_baseline", "baseline", "keep", "tolerance",
+                                    "min_delta_ms", "min_delta_kb")}
+        },
+        "results": results
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Résultats écrits dans {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != report["meta"]["params"]:
+            print("ATTENTION: paramètres différents de ceux de la référence")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.min_delta_kb)
+        if regressions:
+            print("RÉGRESSIONS :")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"Aucune régression (tolérance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Générateur de données synthétiques (reproductible via `seed`) au format du
+dossier `data/` : règles, symptômes caractéristiques, questions, textes de
+description et de traitement, historiques patients (JSONL).
+
+Utilisable seul :
+    python benchmarks/synthetic.py /tmp/synth --diseases 10000 --symptoms 1000 --history 5000
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+WORDS = (
+    "fièvre douleur fatigue toux nausée repos hydratation consultation traitement "
+    "symptôme infection inflammation chronique aigu surveillance médecin examen "
+    "analyse sanguine antibiotique antalgique régime prévention vaccin contagion "
+    "incubation durée sévère léger modéré complication hospitalisation"
+).split()
+
+
+def symptom_names(count):
+    return [f"symptom_{i:04d}" for i in range(count)]
+
+
+def disease_names(count):
+    return [f"disease_{i:05d}" for i in range(count)]
+
+
+def _paragraph(rng, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def generate_rules(rng, diseases, symptoms, per_rule):
+    vocabulary = symptom_names(symptoms)
+    per_rule = min(per_rule, symptoms)
+    return {
+        disease: {s: rng.choice(("yes", "no")) for s in rng.sample(vocabulary, per_rule)}
+        for disease in disease_names(diseases)
+    }
+
+
+def generate_history(rng, entries, symptoms):
+    vocabulary = symptom_names(symptoms)
+    start = datetime(2024, 1, 1)
+    for n in range(entries):
+        yield {
+            "symptoms": {s: rng.choice(("yes", "no")) for s in rng.sample(vocabulary, min(6, symptoms))},
+            "diagnosis": f"disease_{rng.randrange(10000):05d}",
+            "score": rng.randint(1, 6),
+            "timestamp": (start + timedelta(minutes=17 * n)).isoformat()
+        }
+
+
+def generate_dataset(root, diseases=1000, symptoms=200, per_rule=12, patients=5, history=2000,
+                     text_words=120, seed=42):
+    """
+    Écrit un jeu de données complet sous `root` (même arborescence que `data/`).
+
+    Returns:
+        dict: chemins et paramètres du jeu généré
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    rules = generate_rules(rng, diseases, symptoms, per_rule)
+
+    with open(os.path.join(root, "disease_rules.json"), "w", encoding="utf-8") as f:
+        json.dump(rules, f, ensure_ascii=False)
+    with open(os.path.join(root, "disease_symptoms.json"), "w", encoding="utf-8") as f:
+        json.dump({d: [s for s, v in r.items() if v == "yes"] for d, r in rules.items()}, f, ensure_ascii=False)
+    with open(os.path.join(root, "symptom_questions.json"), "w", encoding="utf-8") as f:
+        json.dump({s: f"Avez-vous ce symptôme : {s} ? (oui/non)" for s in symptom_names(symptoms)},
+                  f, ensure_ascii=False)
+
+    for folder in ("disease_descriptions", "disease_treatments"):
+        directory = os.path.join(root, folder)
+        os.makedirs(directory, exist_ok=True)
+        for disease in rules:
+            with open(os.path.join(directory, f"{disease}.txt"), "w", encoding="utf-8") as f:
+                f.write(_paragraph(rng, text_words))
+
+    patients_dir = os.path.join(root, "patients")
+    os.makedirs(patients_dir, exist_ok=True)
+    patient_ids = [f"patient_{i:04d}" for i in range(patients)]
+    for patient_id in patient_ids:
+        with open(os.path.join(patients_dir, f"{patient_id}.jsonl"), "w", encoding="utf-8") as f:
+            for entry in generate_history(rng, history, symptoms):
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    return {
+        "root": root,
+        "diseases": diseases,
+        "symptoms": symptoms,
+        "per_rule": per_rule,
+        "patients": patient_ids,
+        "history": history,
+        "seed": seed
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un jeu de données synthétique")
+    parser.add_argument("root", help="Dossier de sortie")
+    parser.add_argument("--diseases", type=int, default=1000)
+    parser.add_argument("--symptoms", type=int, default=200)
+    parser.add_argument("--per-rule", type=int, default=12)
+    parser.add_argument("--patients", type=int, default=5)
+    parser.add_argument("--history", type=int, default=2000, help="Entrées par historique patient")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    info = generate_dataset(args.root, args.diseases, args.symptoms, args.per_rule,
+                            args.patients, args.history, seed=args.seed)
+    print(json.dumps({k: v for k, v in info.items() if k != "patients"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import os
-import json
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from tools.content_store import refresh_pack
+from tools.rule_store import atomic_write_json, get_rule_store
+
 # Chemins vers les fichiers JSON et dossiers
 dir_script = os.path.dirname(os.path.abspath(__file__))
 dir_data = os.path.join(dir_script, 'data')
@@ -16,18 +18,13 @@ dir_treat = os.path.join(dir_data, 'disease_treatments')
 os.makedirs(dir_desc, exist_ok=True)
 os.makedirs(dir_treat, exist_ok=True)
 
-# Charger ou initialiser les données JSON
+# Initialiser les fichiers JSON manquants
 for path in (file_rules, file_symptoms, file_questions):
     if not os.path.exists(path):
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump({}, f, indent=2, ensure_ascii=False)
+        atomic_write_json(path, {})
 
-with open(file_rules, 'r', encoding='utf-8') as f:
-    disease_rules = json.load(f)
-with open(file_symptoms, 'r', encoding='utf-8') as f:
-    disease_symptoms = json.load(f)
-with open(file_questions, 'r', encoding='utf-8') as f:
-    symptom_questions = json.load(f)
+# Écritures atomiques et regroupées (voir tools/rule_store.py)
+rule_store = get_rule_store(file_rules, file_symptoms, file_questions)
 
 class ExpertApp(tk.Tk):
     def __init__(self):
@@ -74,7 +71,7 @@ class ExpertApp(tk.Tk):
         for w in self.symp_frame.winfo_children():
             w.destroy()
         # Checkbuttons
-        for i, (symp, q) in enumerate(symptom_questions.items()):
+        for i, (symp, q) in enumerate(rule_store.snapshot().questions.items()):
             var = tk.BooleanVar()
             chk = ttk.Checkbutton(self.symp_frame, text=symp.replace('_', ' '), variable=var)
             chk.grid(row=i//3, column=i%3, sticky='w', padx=5, pady=2)
@@ -90,19 +87,17 @@ class ExpertApp(tk.Tk):
         # Symptômes sélectionnés
         sel = [s for s, v in self.symp_vars.items() if v.get()]
         # Construire rule
-        rule = {s: ('yes' if s in sel else 'no') for s in symptom_questions}
+        rule = {s: ('yes' if s in sel else 'no') for s in rule_store.snapshot().questions}
         # Sauvegarder JSON
-        disease_rules[name] = rule
-        disease_symptoms[name] = sel
-        with open(file_rules, 'w', encoding='utf-8') as f:
-            json.dump(disease_rules, f, indent=2, ensure_ascii=False)
-        with open(file_symptoms, 'w', encoding='utf-8') as f:
-            json.dump(disease_symptoms, f, indent=2, ensure_ascii=False)
+        rule_store.update(rules={name: rule}, disease_symptoms={name: sel})
         # Fichiers txt
         with open(os.path.join(dir_desc, f"{name}.txt"), 'w', encoding='utf-8') as f:
             f.write(desc)
         with open(os.path.join(dir_treat, f"{name}.txt"), 'w', encoding='utf-8') as f:
             f.write(treat)
+        # Reconstruire les packs de textes s'ils sont utilisés
+        refresh_pack(dir_desc)
+        refresh_pack(dir_treat)
         messagebox.showinfo("Succès", f"Maladie '{name}' enregistrée.")
         # Réinitialiser
         self.entry_name.delete(0, 'end')
@@ -127,18 +122,11 @@ class ExpertApp(tk.Tk):
         if not key or not q:
             messagebox.showerror("Erreur", "Clé et question obligatoires.")
             return
-        if key in symptom_questions:
+        if key in rule_store.snapshot().questions:
             messagebox.showerror("Erreur", "Symptôme existant.")
             return
-        # Mise à jour questions JSON
-        symptom_questions[key] = q
-        with open(file_questions, 'w', encoding='utf-8') as f:
-            json.dump(symptom_questions, f, indent=2, ensure_ascii=False)
-        # Ajouter dans rules par défaut no
-        for d in disease_rules:
-            disease_rules[d][key] = 'no'
-        with open(file_rules, 'w', encoding='utf-8') as f:
-            json.dump(disease_rules, f, indent=2, ensure_ascii=False)
+        # Mise à jour questions JSON, et ajout dans rules par défaut no
+        rule_store.update(questions={key: q}, add_to_all_rules={key: 'no'})
         messagebox.showinfo("Succès", f"Symptôme '{key}' ajouté.")
         # Réinitialiser et rafraîchir
         self.entry_symp_key.delete(0, 'end')
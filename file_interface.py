@@ -1,69 +1,192 @@
 import os
-import time
 import threading
-import json
+import time
 import logging
 from agents.medical_agent import medical_agent
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from concurrent.futures import ThreadPoolExecutor
 from google.genai.types import Content, Part
+from services.session_service import create_session_service
+from utils.config import get_app_config
+from utils.logging_setup import setup_logging
+from utils.metrics import track_turn
+from utils.tracing import export_session_trace, start_trace
+from services.file_watch import FileCheckpoint, FolderWatcher, ProgressManifest, file_digest, head_digest
 
-def get_config():
-    config_path = os.environ.get("APP_CONFIG_PATH", "config/app_config.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-app_config = get_config()
+app_config = get_app_config()
 
-import logging.config
-logging_config = json.load(open("config/logging.json", "r", encoding="utf-8"))
-logging.config.dictConfig(logging_config)
+setup_logging(os.environ.get("LOG_CONFIG_PATH", "config/logging.json"))
 logger = logging.getLogger("file_interface")
 
 DATA_DIR = app_config["input_files_dir"]
 RESPONSE_DIR = app_config["output_files_dir"]
 os.makedirs(RESPONSE_DIR, exist_ok=True)
-SESSION_SERVICE = InMemorySessionService()
+SESSION_SERVICE = create_session_service(app_config)
 APP_NAME = app_config["app_name"]
+# Runner unique partagé par tous les fichiers : il ne porte aucun état de session
+RUNNER = Runner(agent=medical_agent, app_name=APP_NAME, session_service=SESSION_SERVICE)
+MANIFEST = ProgressManifest(os.path.join(RESPONSE_DIR, ".progress_manifest.json"))
+
+def _checkpoint_for(file_path):
+    return FileCheckpoint(os.path.join(RESPONSE_DIR, f".response_{os.path.basename(file_path)}.checkpoint.json"))
+
+def _fresh_session_id(file_path):
+    """Session d'un fichier remplacé : nom du fichier + empreinte de son nouveau début."""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return f"{stem}-{head_digest(file_path, os.path.getsize(file_path))[:12]}"
 
-def process_file(file_path, user_id):
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    session_id = os.path.splitext(os.path.basename(file_path))[0]
-    runner = Runner(agent=medical_agent, app_name=APP_NAME, session_service=SESSION_SERVICE)
-    responses = []
-    for line in lines:
-        if not line.strip():
-            continue
-        prefix, msg = line.split(":", 1) if ":" in line else ("send_by_patient", line)
-        if prefix.strip().lower().startswith("send_by_patient"):
-            content = Content(role="user", parts=[Part(text=msg.strip())])
-            last_reply = ""
-            for event in runner.run(user_id=user_id, session_id=session_id, new_message=content):
-                if event.is_final_response():
-                    last_reply = event.content.parts[0].text
-                    responses.append(f"reply_by_agent:{last_reply}")
-        elif prefix.strip().lower().startswith("send_by_doctor"):
-            responses.append(f"note_by_doctor:{msg.strip()}")
+def _reply_lines(line, user_id, session_id):
+    """Réponses produites pour une ligne du fichier source."""
+    if not line.strip():
+        return []
+    prefix, msg = line.split(":", 1) if ":" in line else ("send_by_patient", line)
+    if prefix.strip().lower().startswith("send_by_patient"):
+        content = Content(role="user", parts=[Part(text=msg.strip())])
+        replies = []
+        trace = start_trace(session_id, user_id, "file")
+        try:
+            with track_turn("file") as turn:
+                for event in RUNNER.run(user_id=user_id, session_id=session_id, new_message=content):
+                    turn.event(event)
+                    trace.event(event)
+                    if event.is_final_response():
+                        replies.append(f"reply_by_agent:{event.content.parts[0].text}")
+        except Exception as e:
+            trace.set_error(e)
+            raise
+        finally:
+            trace.finish()
+        return replies
+    if prefix.strip().lower().startswith("send_by_doctor"):
+        return [f"note_by_doctor:{msg.strip()}"]
+    return []
+
+def process_file(file_path, user_id, settle_seconds=None):
+    """
+    Traite les lignes du fichier non encore traitées, en reprenant au point de
+    reprise. Chaque réponse est ajoutée et vidée sur disque dès qu'elle est
+    produite, puis le point de reprise avance : un arrêt brutal ne coûte au
+    plus que la ligne en cours. Un fichier qui grandit n'est relu qu'à partir
+    de la dernière position.
+
+    Une dernière ligne sans retour à la ligne peut être encore en cours
+    d'écriture : elle n'est traitée que si le fichier n'a pas bougé depuis
+    `settle_seconds`.
+
+    Returns:
+        tuple: (fichier de réponse, True si tout le fichier a été traité)
+    """
+    if settle_seconds is None:
+        settle_seconds = app_config.get("file_interface_settle_seconds", 2)
     response_file = os.path.join(RESPONSE_DIR, f"response_{os.path.basename(file_path)}")
-    with open(response_file, "w", encoding="utf-8") as f:
-        for r in responses:
-            f.write(r + "\n")
-    logger.info(f"Réponses écrites dans : {response_file}")
+    checkpoint = _checkpoint_for(file_path)
+    session_id = checkpoint.session_id or os.path.splitext(os.path.basename(file_path))[0]
+    if not checkpoint.matches(file_path):
+        logger.info(f"Fichier remplacé, retraitement depuis le début : {file_path}")
+        # Le nouveau contenu ne doit pas hériter de l'historique (ni de l'état) de l'ancien ;
+        # sa propre session, si un traitement interrompu l'a déjà créée, repart aussi de zéro
+        checkpoint.reset()
+        fresh_session_id = _fresh_session_id(file_path)
+        for stale in {session_id, fresh_session_id}:
+            SESSION_SERVICE.delete_session(app_name=APP_NAME, user_id=user_id, session_id=stale)
+        session_id = fresh_session_id
+
+    SESSION_SERVICE.ensure_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+
+    complete = True
+    processed = 0
+    with open(file_path, "rb") as src, open(response_file, "a+b") as out:
+        # Réponses écrites après le dernier point de reprise : la ligne sera rejouée
+        out.truncate(checkpoint.response_size)
+        src.seek(checkpoint.offset)
+        offset = checkpoint.offset
+        for raw in iter(src.readline, b""):
+            if not raw.endswith(b"\n"):
+                stable = time.time() - os.fstat(src.fileno()).st_mtime >= settle_seconds
+                if not stable:
+                    complete = False
+                    break
+            for reply in _reply_lines(raw.decode("utf-8"), user_id, session_id):
+                out.write((reply + "\n").encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            offset += len(raw)
+            processed += 1
+            checkpoint.save(file_path, offset, out.tell(), session_id)
+    if processed:
+        logger.info(f"{processed} ligne(s) traitée(s), réponses dans : {response_file}")
+        export_session_trace(session_id, os.path.join(RESPONSE_DIR, f".trace_{os.path.basename(file_path)}.json"))
+    return response_file, complete
+
+class FileDispatcher:
+    """
+    Répartit les fichiers signalés sur un pool de threads borné. Un même
+    fichier n'est jamais traité par deux threads à la fois : une modification
+    reçue pendant son traitement le fait simplement repasser à la fin.
+    """
+
+    def __init__(self, user_id, workers, settle_seconds=2):
+        self.user_id = user_id
+        self.settle_seconds = settle_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file_worker")
+        self._lock = threading.Lock()
+        self._running = set()
+        self._rerun = set()
+
+    def submit(self, file_path):
+        with self._lock:
+            if file_path in self._running:
+                self._rerun.add(file_path)
+                return
+            self._running.add(file_path)
+        self.executor.submit(self._work, file_path)
+
+    def _work(self, file_path):
+        while True:
+            try:
+                self._process_once(file_path)
+            except Exception as e:
+                logger.error(f"Erreur sur {file_path} : {e}")
+            with self._lock:
+                if file_path not in self._rerun:
+                    self._running.discard(file_path)
+                    return
+                self._rerun.discard(file_path)
+
+    def _process_once(self, file_path):
+        if not os.path.exists(file_path):
+            return
+        digest = file_digest(file_path)
+        if MANIFEST.is_done(file_path, digest):
+            logger.info(f"Déjà traité, ignoré : {file_path}")
+            return
+        response_file, complete = process_file(file_path, user_id=self.user_id,
+                                               settle_seconds=self.settle_seconds)
+        if complete:
+            MANIFEST.mark_done(file_path, digest, response_file=response_file)
+        else:
+            # Dernière ligne encore incomplète : on repasse une fois le fichier stabilisé
+            timer = threading.Timer(self.settle_seconds, self.submit, args=(file_path,))
+            timer.daemon = True
+            timer.start()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
 
 def monitor_folder(input_folder, user_id="file_user"):
-    already_processed = set()
-    logger.info(f"Monitoring : {input_folder}")
-    while True:
-        files = [f for f in os.listdir(input_folder) if f.endswith(".txt")]
-        for fname in files:
-            full_path = os.path.join(input_folder, fname)
-            if full_path not in already_processed:
-                try:
-                    process_file(full_path, user_id=user_id)
-                    already_processed.add(full_path)
-                except Exception as e:
-                    logger.error(f"Erreur : {e}")
-        time.sleep(3)
+    workers = app_config.get("file_interface_workers", 4)
+    dispatcher = FileDispatcher(user_id, workers,
+                                settle_seconds=app_config.get("file_interface_settle_seconds", 2))
+    watcher = FolderWatcher(input_folder, dispatcher.submit,
+                            poll_interval=app_config.get("file_interface_poll_interval_seconds", 3))
+    logger.info(f"Monitoring : {input_folder} (mode={watcher.mode}, workers={workers})")
+    try:
+        watcher.run_forever()
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        dispatcher.shutdown()
 
 if __name__ == "__main__":
-    monitor_folder(DATA_DIR)
\ No newline at end of file
+    monitor_folder(DATA_DIR)
@@ -1,31 +1,26 @@
 import os
 import sys
 import json
+import argparse
 import logging
 import uuid
 import datetime
-from agents.medical_agent import medical_agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai.types import Content, Part
 import dotenv
 
+from utils.config import get_app_config, load_json_config
 from utils.utils import sanitize_for_logging
+from utils.logging_setup import setup_logging
+from utils.metrics import track_turn
+from utils.tracing import export_session_trace, start_trace
+from tools.rule_only import rule_only_diagnosis
 
 dotenv.load_dotenv()
 
 # === CONFIG ===
-APP_CONFIG_PATH = os.environ.get("APP_CONFIG_PATH", "config/app_config.json")
 LOG_CONFIG_PATH = os.environ.get("LOG_CONFIG_PATH", "config/logging.json")
 
-def load_json_config(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-app_config = load_json_config(APP_CONFIG_PATH)
-logging_config = load_json_config(LOG_CONFIG_PATH)
-import logging.config
-logging.config.dictConfig(logging_config)
+app_config = get_app_config()
+setup_logging(LOG_CONFIG_PATH)
 logger = logging.getLogger("medical_expert_cli")
 
 # Créer dossiers essentiels dynamiquement
@@ -33,7 +28,6 @@ for d in [app_config["logs_dir"], app_config["sessions_dir"], os.path.join(app_c
     os.makedirs(d, exist_ok=True)
 
 APP_NAME = app_config.get("app_name", "medical_expert_adk")
-SESSION_SERVICE = InMemorySessionService()
 
 def get_user_id():
     uid = input("Identifiant utilisateur (laisser vide pour générer aléatoirement) : ").strip()
@@ -49,35 +43,80 @@ def get_session_id():
     return sid
 
 def main():
+    # Imports lourds (google.adk, modèle) réservés au mode conversationnel
+    from agents.medical_agent import medical_agent
+    from google.adk.runners import Runner
+    from google.genai.types import Content, Part
+    from services.session_service import create_session_service
+
     print("=== Système Expert Médical (ADK) ===")
+    session_service = create_session_service(app_config)
     user_id = get_user_id()
     session_id = get_session_id()
     logger.info(f"Démarrage session : session_id={session_id} user_id={user_id}")
 
-    runner = Runner(agent=medical_agent, app_name=APP_NAME, session_service=SESSION_SERVICE)
-    # >>>> AJOUT ICI <<<<
-    SESSION_SERVICE.create_session(app_name=APP_NAME,user_id=user_id, session_id=session_id)
+    runner = Runner(agent=medical_agent, app_name=APP_NAME, session_service=session_service)
+    # Reprendre la session si elle existe déjà (sessions persistantes), sinon la créer
+    if not session_service.ensure_session(app_name=APP_NAME, user_id=user_id, session_id=session_id):
+        logger.info(f"Reprise de la session existante : session_id={session_id}")
     print("Tapez vos symptômes/questions (ou 'exit' pour quitter) :")
     while True:
         user_input = input("> ").strip()
         if user_input.lower() in ("quit", "exit"):
             logger.info(f"Fin session : session_id={session_id} user_id={user_id}")
+            trace_path = export_session_trace(
+                session_id, os.path.join(app_config["logs_dir"], f"trace_{session_id}.json"))
+            if trace_path:
+                print(f"Traces du tour (format Chrome) : {trace_path}")
             break
         if not user_input:
             continue
-        safe_user_input = sanitize_for_logging(user_input)
-        logger.info(f"User({user_id}) [{session_id}] : {safe_user_input}")
+        trace = start_trace(session_id, user_id, "cli")
+        with trace.span("sanitize_for_logging", "logging", chars=len(user_input)):
+            safe_user_input = sanitize_for_logging(user_input)
+        with trace.span("logger.info", "logging"):
+            logger.info(f"User({user_id}) [{session_id}] : {safe_user_input}")
         content = Content(role="user", parts=[Part(text=user_input)])
         response = ""
-        for event in runner.run(user_id=user_id, session_id=session_id, new_message=content):
-            if event.is_final_response():
-                response = event.content.parts[0].text
+        try:
+            with track_turn("cli") as turn:
+                for event in runner.run(user_id=user_id, session_id=session_id, new_message=content):
+                    turn.event(event)
+                    trace.event(event)
+                    if event.is_final_response():
+                        response = event.content.parts[0].text
+        except Exception as e:
+            trace.set_error(e)
+            raise
+        finally:
+            trace.finish()
         print(response)
         logger.info(f"Agent [{session_id}] : {response}")
 
+def rule_only_main(symptoms_arg, patient_id=None, top_k=1):
+    """Mode sans LLM : diagnostic direct d'un dictionnaire de symptômes (JSON ou @fichier.json)."""
+    if symptoms_arg.startswith("@"):
+        symptoms = load_json_config(symptoms_arg[1:])
+    else:
+        symptoms = json.loads(symptoms_arg)
+    result = rule_only_diagnosis(symptoms, patient_id=patient_id, top_k=top_k)
+    logger.info(f"Diagnostic direct : patient={patient_id} diagnostic={result.get('diagnosis')}")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Système Expert Médical (ADK)")
+    parser.add_argument("--symptoms", help="Diagnostic direct sans LLM : JSON {symptôme: yes/no} ou @fichier.json")
+    parser.add_argument("--patient-id", help="Sauvegarder le diagnostic direct dans l'historique de ce patient")
+    parser.add_argument("--top-k", type=int, default=1, help="Nombre de maladies candidates à classer")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        main()
+        if args.symptoms:
+            rule_only_main(args.symptoms, patient_id=args.patient_id, top_k=args.top_k)
+        else:
+            main()
     except Exception as e:
         logger.exception(f"Erreur fatale dans le CLI : {e}")
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,20 @@
+# services/__init__.py
+# Services d'infrastructure partagés par les interfaces (CLI, API, fichiers).
+# Imports paresseux : `services.session_service` tire google.adk, inutile
+# pour les modules qui n'en dépendent pas (surveillance de fichiers, etc.).
+import importlib
+
+_EXPORTS = {
+    "SqliteSessionService": ".session_service",
+    "create_session_service": ".session_service",
+    "SessionTracker": ".session_tracker",
+    "FolderWatcher": ".file_watch",
+    "ProgressManifest": ".file_watch",
+    "file_digest": ".file_watch",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,78 @@
+"""
+Primitives de concurrence asyncio pour le serveur ASGI :
+
+- `TurnLimiter` plafonne le nombre de tours d'agent en cours dans le processus.
+  Un tour enchaîne ses appels au modèle l'un après l'autre, ce qui borne donc
+  aussi les appels au modèle en vol.
+- `SessionLocks` sérialise les tours d'une même session (les messages d'une
+  consultation sont traités dans l'ordre), sans retenir de verrou pour les
+  sessions inactives.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class TurnLimitExceeded(Exception):
+    """Aucune place libre avant l'expiration du délai d'attente."""
+
+
+class TurnLimiter:
+    """
+    Args:
+        max_in_flight (int): nombre maximal de tours simultanés
+        queue_timeout (float): attente maximale (s) d'une place libre ; None = illimitée
+    """
+
+    def __init__(self, max_in_flight=64, queue_timeout=30.0):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            # Créé paresseusement pour être lié à la boucle du serveur
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise TurnLimitExceeded()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "max_in_flight": self.max_in_flight}
+
+
+class SessionLocks:
+    """Verrous par session, supprimés dès que plus personne ne les attend."""
+
+    def __init__(self):
+        self._locks = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id):
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    def __len__(self):
+        return len(self._locks)
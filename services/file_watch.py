@@ -0,0 +1,218 @@
+"""
+Surveillance de dossier et suivi persistant des fichiers traités, pour
+l'interface par fichiers.
+
+- `FolderWatcher` utilise les notifications du système (inotify, FSEvents,
+  ReadDirectoryChangesW via `watchdog`, si installé : `pip install watchdog`)
+  et se replie sur un balayage périodique (mtime/taille) sinon.
+- `ProgressManifest` garde sur disque, par chemin, l'empreinte SHA-256 du
+  contenu déjà traité : après un redémarrage, les fichiers inchangés ne sont
+  pas retraités.
+- `FileCheckpoint` mémorise, pour un fichier en cours, la position atteinte
+  (octets lus dans la source, octets écrits dans la réponse) et la session :
+  le traitement reprend là où il s'était arrêté.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+def file_digest(path, chunk_size=1 << 16):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProgressManifest:
+    """
+    Manifeste JSON {chemin: {"sha256", "processed_at", ...}}, réécrit de façon
+    atomique (fichier temporaire puis renommage) à chaque mise à jour.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"ERREUR: manifeste illisible {path}, il sera recréé: {str(e)}")
+
+    def is_done(self, file_path, digest):
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(file_path))
+            return entry is not None and entry.get("sha256") == digest
+
+    def mark_done(self, file_path, digest, **info):
+        with self._lock:
+            self._entries[os.path.abspath(file_path)] = {
+                "sha256": digest,
+                "processed_at": datetime.utcnow().isoformat(),
+                **info
+            }
+            _write_json_atomic(self.path, self._entries)
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def head_digest(path, length, head_size=1024):
+    """Empreinte des premiers octets déjà lus : détecte un fichier remplacé."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(min(length, head_size))).hexdigest()
+
+
+class FileCheckpoint:
+    """
+    Point de reprise d'un fichier source, dans un fichier JSON à part :
+    {"offset", "response_size", "session_id", "head"}.
+
+    `offset` ne compte que des lignes complètes dont la réponse est déjà écrite
+    (et vidée sur disque) ; `response_size` permet de tronquer une réponse
+    écrite après le dernier point de reprise, pour ne pas la dupliquer.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.response_size = 0
+        self.session_id = None
+        self.head = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.offset = data.get("offset", 0)
+                self.response_size = data.get("response_size", 0)
+                self.session_id = data.get("session_id")
+                self.head = data.get("head")
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"ERREUR: point de reprise illisible {path}, reprise au début: {str(e)}")
+
+    def matches(self, source_path):
+        """Vrai si la source contient toujours ce qui a déjà été traité."""
+        if self.offset == 0:
+            return True
+        if os.path.getsize(source_path) < self.offset:
+            return False
+        return head_digest(source_path, self.offset) == self.head
+
+    def reset(self):
+        """Source remplacée : repart du début, sans reprendre la session de l'ancien contenu."""
+        self.offset = 0
+        self.response_size = 0
+        self.session_id = None
+        self.head = None
+
+    def save(self, source_path, offset, response_size, session_id):
+        if self.offset < 1024 or self.head is None:
+            self.head = head_digest(source_path, offset)
+        self.offset = offset
+        self.response_size = response_size
+        self.session_id = session_id
+        _write_json_atomic(self.path, {
+            "offset": offset,
+            "response_size": response_size,
+            "session_id": session_id,
+            "head": self.head
+        })
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher._notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher._notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher._notify(event.dest_path)
+
+
+class FolderWatcher:
+    """
+    Appelle `on_change(chemin)` pour chaque fichier existant au démarrage,
+    puis pour chaque fichier créé ou modifié.
+
+    Args:
+        folder (str): dossier surveillé
+        on_change (callable): rappel, appelé depuis le thread de surveillance
+        suffix (str): extension des fichiers à suivre
+        poll_interval (float): période (s) du balayage de repli
+        use_events (bool): utiliser les notifications système si disponibles
+    """
+
+    def __init__(self, folder, on_change, suffix=".txt", poll_interval=3.0, use_events=True):
+        self.folder = folder
+        self.on_change = on_change
+        self.suffix = suffix
+        self.poll_interval = poll_interval
+        self.use_events = use_events and Observer is not None
+        self._stop = threading.Event()
+        self._seen = {}
+
+    @property
+    def mode(self):
+        return "events" if self.use_events else "polling"
+
+    def _notify(self, path):
+        if path.endswith(self.suffix) and os.path.isfile(path):
+            self.on_change(path)
+
+    def _scan(self):
+        """Un balayage : signale les fichiers nouveaux ou dont mtime/taille a changé."""
+        current = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(self.suffix):
+                    continue
+                st = entry.stat()
+                current[entry.path] = (st.st_mtime_ns, st.st_size)
+        for path, stamp in current.items():
+            if self._seen.get(path) != stamp:
+                self.on_change(path)
+        self._seen = current
+
+    def run_forever(self):
+        self._scan()
+        if not self.use_events:
+            while not self._stop.wait(self.poll_interval):
+                self._scan()
+            return
+        observer = Observer()
+        observer.schedule(_Handler(self), self.folder, recursive=False)
+        observer.start()
+        try:
+            while not self._stop.wait(1.0):
+                if not observer.is_alive():
+                    break
+        finally:
+            observer.stop()
+            observer.join()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,106 @@
+"""
+Objets partagés par les serveurs HTTP (`api_server.py` en Flask et
+`asgi_server.py` en ASGI) : configuration, logging, service de sessions,
+Runner unique et suivi borné des sessions.
+"""
+
+import datetime
+import os
+import uuid
+
+import dotenv
+from google.adk.runners import Runner
+
+from agents.medical_agent import medical_agent
+from tools.diagnosis_tools import TOOL_CACHE
+from services.session_service import create_session_service
+from services.session_tracker import SessionTracker
+from utils.config import get_app_config
+from utils.logging_setup import setup_logging
+from utils.metrics import ACTIVE_SESSIONS
+
+# Charger les variables d'environnement
+dotenv.load_dotenv()
+
+# === CONFIG ===
+LOG_CONFIG_PATH = os.environ.get("LOG_CONFIG_PATH", "config/logging.json")
+
+
+app_config = get_app_config()
+LOG_QUEUE_HANDLER = setup_logging(LOG_CONFIG_PATH)
+
+# Créer dossiers essentiels dynamiquement
+for d in [app_config["logs_dir"], app_config["sessions_dir"], os.path.join(app_config["data_dir"], "patients")]:
+    os.makedirs(d, exist_ok=True)
+
+APP_NAME = app_config.get("app_name", "medical_expert_adk")
+SESSION_SERVICE = create_session_service(app_config)
+
+# Runner unique partagé : il ne porte aucun état propre à une session
+RUNNER = Runner(agent=medical_agent, app_name=APP_NAME, session_service=SESSION_SERVICE)
+
+# Suivi borné des sessions actives (taille et inactivité)
+SESSION_TRACKER = SessionTracker(
+    maxsize=app_config.get("session_tracker_max_size", 10000),
+    ttl=app_config.get("session_timeout_minutes", 60) * 60
+)
+ACTIVE_SESSIONS.set_function(lambda: len(SESSION_TRACKER))
+
+# Nombre maximal de processus d'un diagnostic batch (plafond des requêtes HTTP)
+BATCH_MAX_WORKERS = app_config.get("batch_workers", os.cpu_count() or 1)
+
+
+def generate_session_id():
+    """Génère un identifiant de session unique."""
+    dt = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"session_{dt}_{uuid.uuid4().hex[:4]}"
+
+
+def generate_user_id():
+    """Génère un identifiant utilisateur unique."""
+    return f"user_{uuid.uuid4().hex[:8]}"
+
+
+def ensure_session(user_id, session_id):
+    """
+    Garantit l'existence de la session : si l'un des identifiants est manquant,
+    ou si la session a expiré, une nouvelle session est créée.
+
+    Returns:
+        tuple: (user_id, session_id, créée ou non)
+    """
+    user_id = user_id or generate_user_id()
+    session_id = session_id or generate_session_id()
+    # Get-or-create atomique : deux requêtes concurrentes ne recréent pas la même session
+    created = SESSION_SERVICE.ensure_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    return user_id, session_id, created
+
+
+def terminate_session(session_id, user_id=None):
+    """
+    Termine la session : suppression de son état et de ses événements dans le
+    service de sessions, et fin du suivi. Sans `user_id`, celui enregistré par
+    le suivi est utilisé.
+
+    Returns:
+        str: user_id de la session, ou None s'il est inconnu (rien n'est supprimé)
+    """
+    info = SESSION_TRACKER.discard(session_id)
+    user_id = user_id or (info or {}).get("user_id")
+    if user_id:
+        SESSION_SERVICE.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    return user_id
+
+
+def health_payload():
+    return {
+        "status": "ok",
+        "message": "Medical Expert API is running",
+        "version": app_config.get("version", "1.0.0"),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "runners": 1,
+        "sessions": SESSION_TRACKER.stats(),
+        "session_cache": SESSION_SERVICE.cache_size_current(),
+        "tool_cache": TOOL_CACHE.stats(),
+        "logs_dropped": LOG_QUEUE_HANDLER.dropped if LOG_QUEUE_HANDLER else 0
+    }
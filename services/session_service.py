@@ -0,0 +1,444 @@
+"""
+Service de sessions ADK persistant, adossé à SQLite (mode WAL).
+
+- Les sessions et leurs événements survivent aux redémarrages.
+- Un LRU borné garde en mémoire les sessions « chaudes ». Une lecture en
+  cache coûte un `PRAGMA data_version` (aucune lecture de table) tant que
+  personne n'a écrit dans la base ; après une écriture (de ce processus ou
+  d'un autre worker sur la même base), l'entrée est revalidée une fois contre
+  `last_update_time` (requête sur la clé primaire) : une session modifiée ou
+  supprimée ailleurs est relue, jamais servie périmée.
+- Lectures et écritures ont chacune leur connexion (WAL : une lecture n'attend
+  jamais un écrivain). Le verrou du cache (`_lock`) n'est jamais tenu pendant
+  une transaction d'écriture, qui peut attendre jusqu'au délai `busy_timeout`.
+- Appelé depuis une boucle asyncio (`Runner.run_async` appelle le service de
+  façon synchrone ; `Runner.run` l'exécute dans un thread), `append_event` met
+  à jour la copie en mémoire et confie l'écriture SQLite à un thread d'écriture
+  unique (ordre conservé) : la boucle n'attend pas le disque. Les lectures
+  voient ces écritures en attente (copie en mémoire, ou attente si évincée).
+  Hors boucle, l'écriture reste synchrone.
+- Un thread de balayage supprime les sessions inactives depuis plus de
+  `session_timeout_minutes`, pour que la mémoire et la base restent bornées.
+
+L'état est stocké par session (les préfixes `app:` / `user:` ne sont pas
+partagés entre sessions ; les clés `temp:` ne sont jamais persistées).
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig, ListEventsResponse, ListSessionsResponse
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE INDEX IF NOT EXISTS sessions_last_update ON sessions (last_update_time);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id, seq);
+"""
+
+
+def _persistent_state(state):
+    return {k: v for k, v in state.items() if not k.startswith("temp:")}
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    Args:
+        db_path (str): fichier SQLite
+        timeout_minutes (float): durée d'inactivité avant suppression (0 = jamais)
+        cache_size (int): nombre maximal de sessions gardées en mémoire
+        sweep_interval (float): période (s) du thread de balayage
+    """
+
+    def __init__(self, db_path, timeout_minutes=60, cache_size=1000, sweep_interval=60.0):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.timeout_seconds = timeout_minutes * 60 if timeout_minutes else 0
+        self.cache_size = cache_size
+        self.sweep_interval = sweep_interval
+        # `_lock` : cache, écritures en attente et connexion de lecture (jamais bloquée en WAL)
+        # `_write_lock` : connexion d'écriture, tenue pendant les transactions
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._cache = OrderedDict()
+        # Clés revalidées depuis la dernière écriture vue dans la base (`PRAGMA data_version`)
+        self._fresh = set()
+        self._data_version = None
+        # Écritures en cours ou différées : {clé: dernière écriture en attente}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-writer")
+        self._pending = {}
+        self._write_conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_conn.executescript(_SCHEMA)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._stop = threading.Event()
+        self._sweeper = None
+        if self.timeout_seconds:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    # --- cache -----------------------------------------------------------
+
+    def _cache_put(self, key, session):
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._fresh.discard(evicted)
+
+    @contextmanager
+    def _write_transaction(self):
+        """Transaction `BEGIN IMMEDIATE` sur la connexion d'écriture ; ROLLBACK si une erreur SQLite survient."""
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def cache_size_current(self):
+        with self._lock:
+            return len(self._cache)
+
+    # --- interface ADK ---------------------------------------------------
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        now = time.time()
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=_persistent_state(state or {}),
+            last_update_time=now,
+        )
+        with self._write_lock:
+            try:
+                self._write_conn.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(session.state), now, now),
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"La session '{session_id}' existe déjà pour l'utilisateur '{user_id}'") from None
+        with self._lock:
+            self._cache_put((app_name, user_id, session_id), session)
+        return session.model_copy(deep=True)
+
+    def ensure_session(self, *, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Crée la session (état vide) si elle n'existe pas, sans la charger.
+        Atomique, y compris entre processus partageant la base (INSERT OR IGNORE).
+
+        Returns:
+            bool: True si la session vient d'être créée
+        """
+        now = time.time()
+        with self._write_lock:
+            created = self._write_conn.execute(
+                "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, "{}", now, now),
+            ).rowcount == 1
+        if created:
+            with self._lock:
+                self._cache.pop((app_name, user_id, session_id), None)
+        return created
+
+    @staticmethod
+    def _stored_update_time(conn, key):
+        row = conn.execute(
+            "SELECT last_update_time FROM sessions WHERE app_name=? AND user_id=? AND session_id=?", key
+        ).fetchone()
+        return row[0] if row else None
+
+    def _load(self, app_name, user_id, session_id):
+        row = self._conn.execute(
+            "SELECT state, last_update_time FROM sessions WHERE app_name=? AND user_id=? AND session_id=?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        events = [
+            Event.model_validate_json(payload)
+            for (payload,) in self._conn.execute(
+                "SELECT event FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq",
+                (app_name, user_id, session_id),
+            )
+        ]
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=json.loads(row[0]),
+            events=events,
+            last_update_time=row[1],
+        )
+
+    def _with_session(self, key, use):
+        """
+        Appelle `use(session)` sous `_lock` avec la copie en mémoire à jour de la
+        session (chargée si besoin) et retourne son résultat, ou None si la session n'existe pas.
+        """
+        while True:
+            pending = self._pending.get(key)
+            if pending is not None and key not in self._cache:
+                # Évincée du cache avant la fin de ses écritures : la base doit les contenir avant relecture
+                pending.result()
+            with self._lock:
+                if key in self._cache or key not in self._pending:
+                    session = self._hot_session(key)
+                    return None if session is None else use(session)
+
+    def _hot_session(self, key):
+        """Copie en mémoire à jour de la session (chargée si besoin), ou None. Appelant : sous `_lock`."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            # Écriture dans la base depuis la dernière lecture : chaque entrée sera revalidée une fois
+            self._data_version = version
+            self._fresh.clear()
+        session = self._cache.get(key)
+        if (session is not None and key not in self._pending and key not in self._fresh
+                and session.last_update_time != self._stored_update_time(self._conn, key)):
+            # Modifiée ou supprimée par un autre processus
+            del self._cache[key]
+            session = None
+        if session is None:
+            session = self._load(*key)
+            if session is None:
+                return None
+            self._cache_put(key, session)
+        else:
+            self._cache.move_to_end(key)
+        self._fresh.add(key)
+        return session
+
+    def warm(self, *, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Charge la session dans le cache sans la copier. À appeler dans un thread
+        avant `Runner.run_async`, pour que sa lecture sur la boucle soit un accès mémoire.
+
+        Returns:
+            bool: True si la session existe
+        """
+        return self._with_session((app_name, user_id, session_id), lambda session: True) is not None
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        copy = self._with_session((app_name, user_id, session_id), lambda session: session.model_copy(deep=True))
+        if copy is None:
+            return None
+        if config:
+            if config.num_recent_events:
+                copy.events = copy.events[-config.num_recent_events:]
+            elif config.after_timestamp:
+                copy.events = [e for e in copy.events if e.timestamp > config.after_timestamp]
+        return copy
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, state, last_update_time FROM sessions WHERE app_name=? AND user_id=?",
+                (app_name, user_id),
+            ).fetchall()
+        sessions = [
+            Session(app_name=app_name, user_id=user_id, id=sid, state=json.loads(state), last_update_time=ts)
+            for sid, state, ts in rows
+        ]
+        return ListSessionsResponse(sessions=sessions)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        pending = self._pending.get((app_name, user_id, session_id))
+        if pending is not None:
+            # Sinon une écriture en attente pourrait viser une session recréée sous le même identifiant
+            pending.result()
+        with self._write_transaction() as conn:
+            conn.execute(
+                "DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?",
+                (app_name, user_id, session_id),
+            )
+            conn.execute(
+                "DELETE FROM sessions WHERE app_name=? AND user_id=? AND session_id=?",
+                (app_name, user_id, session_id),
+            )
+        with self._lock:
+            self._cache.pop((app_name, user_id, session_id), None)
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        session = self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        return ListEventsResponse(events=session.events if session else [])
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        state = _persistent_state(session.state)
+        row = (event.timestamp, event.model_dump_json(exclude_none=True), json.dumps(state))
+        with self._lock:
+            cached = self._cache.get(key)
+            expected = None
+            if cached is not None:
+                expected = cached.last_update_time
+                cached.events.append(event)
+                cached.state = state
+                cached.last_update_time = event.timestamp
+            on_loop = _on_event_loop()
+            # Hors boucle aussi, l'écriture est déclarée en attente : la copie en mémoire,
+            # déjà à jour, ne doit pas être revalidée contre la base avant le COMMIT
+            future = self._writer.submit(self._persist, key, row, expected) if on_loop else Future()
+            self._pending[key] = future
+        if not on_loop:
+            try:
+                self._persist(key, row, expected)
+            finally:
+                future.set_result(None)
+        future.add_done_callback(lambda f: self._write_done(key, f))
+        return event
+
+    def _write_done(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def _persist(self, key, row, expected):
+        """Écrit un événement et l'état de la session ; `expected` : version en base attendue."""
+        timestamp, payload, state = row
+        conn = self._write_conn
+        with self._write_lock:
+            try:
+                # IMMEDIATE : la version lue reste valable jusqu'au COMMIT, même entre processus
+                conn.execute("BEGIN IMMEDIATE")
+                stored = self._stored_update_time(conn, key)
+                if stored is None:
+                    # Session supprimée entre-temps (fin de session, expiration)
+                    conn.execute("ROLLBACK")
+                else:
+                    conn.execute(
+                        "INSERT INTO events (app_name, user_id, session_id, timestamp, event) VALUES (?, ?, ?, ?, ?)",
+                        (*key, timestamp, payload),
+                    )
+                    conn.execute(
+                        "UPDATE sessions SET state=?, last_update_time=? WHERE app_name=? AND user_id=? AND session_id=?",
+                        (state, timestamp, *key),
+                    )
+                    conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                print(f"ERREUR lors de l'enregistrement d'un événement de session: {str(e)}")
+                stored = None
+        if stored is None or stored != expected:
+            # Session supprimée, ou copie en mémoire en retard sur la base (autre processus, échec) :
+            # relue à la prochaine lecture
+            with self._lock:
+                self._cache.pop(key, None)
+
+    # --- expiration ------------------------------------------------------
+
+    def sweep(self, now=None):
+        """Supprime les sessions inactives depuis plus que le délai configuré."""
+        if not self.timeout_seconds:
+            return 0
+        cutoff = (now or time.time()) - self.timeout_seconds
+        # Une seule transaction, un seul prédicat : une session rafraîchie entre-temps
+        # (par un autre processus) n'est ni listée, ni vidée de ses événements, ni supprimée
+        with self._write_transaction() as conn:
+            expired = conn.execute(
+                "SELECT app_name, user_id, session_id FROM sessions WHERE last_update_time < ?", (cutoff,)
+            ).fetchall()
+            if expired:
+                conn.execute(
+                    "DELETE FROM events WHERE EXISTS (SELECT 1 FROM sessions s WHERE s.app_name = events.app_name"
+                    " AND s.user_id = events.user_id AND s.session_id = events.session_id"
+                    " AND s.last_update_time < ?)",
+                    (cutoff,),
+                )
+                conn.execute("DELETE FROM sessions WHERE last_update_time < ?", (cutoff,))
+        with self._lock:
+            for key in expired:
+                self._cache.pop(tuple(key), None)
+        return len(expired)
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except sqlite3.Error as e:
+                print(f"ERREUR lors du balayage des sessions: {str(e)}")
+
+    def close(self):
+        self._stop.set()
+        self._writer.shutdown(wait=True)
+        with self._write_lock:
+            self._write_conn.close()
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_service(app_config):
+    """Construit le service de sessions à partir de la configuration applicative."""
+    db_path = app_config.get(
+        "session_db_path", os.path.join(app_config.get("sessions_dir", "sessions/"), "sessions.db")
+    )
+    return SqliteSessionService(
+        db_path,
+        timeout_minutes=app_config.get("session_timeout_minutes", 60),
+        cache_size=app_config.get("session_cache_size", 1000),
+        sweep_interval=app_config.get("session_sweep_interval_seconds", 60),
+    )
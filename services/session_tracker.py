@@ -0,0 +1,57 @@
+"""
+Suivi borné (taille et durée de vie) des sessions actives d'un serveur.
+
+Remplace les dictionnaires par session qui ne se vidaient que sur appel
+explicite de fin de session : les entrées expirent après `ttl` secondes
+d'inactivité et les plus anciennes sont évincées au-delà de `maxsize`.
+"""
+
+import threading
+import time
+
+from cachetools import TTLCache
+
+
+class SessionTracker:
+    """
+    Args:
+        maxsize (int): nombre maximal de sessions suivies
+        ttl (float): durée (s) d'inactivité avant expiration
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def touch(self, session_id, user_id):
+        """Enregistre une activité sur la session et retourne ses métadonnées."""
+        now = time.time()
+        with self._lock:
+            info = self._entries.get(session_id)
+            if info is None:
+                info = {"user_id": user_id, "created_at": now, "turns": 0}
+            info["last_seen"] = now
+            # Réinsertion pour repousser l'expiration
+            self._entries[session_id] = info
+            return info
+
+    def record_turn(self, session_id):
+        with self._lock:
+            info = self._entries.get(session_id)
+            if info is not None:
+                info["turns"] += 1
+
+    def discard(self, session_id):
+        """Oublie la session ; retourne ses métadonnées (ou None si elle n'était pas suivie)."""
+        with self._lock:
+            return self._entries.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            self._entries.expire()
+            return len(self._entries)
+
+    def stats(self):
+        return {"tracked": len(self), "max": self.maxsize, "ttl_seconds": self.ttl}
@@ -0,0 +1,49 @@
+"""
+Traduction des événements ADK d'un tour d'agent en Server-Sent Events.
+
+Messages émis (champ `event:` SSE, données JSON) :
+- `session`    : identifiants de la session, envoyé immédiatement
+- `token`      : fragment de texte partiel du modèle
+- `tool_start` : appel d'outil demandé par le modèle (nom, arguments)
+- `tool_end`   : résultat d'outil (nom, statut)
+- `final`      : réponse finale complète
+- `error`      : erreur pendant le tour
+- `done`       : fin du flux
+"""
+
+import json
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+
+STREAMING_RUN_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(event_name, data):
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event_name}\ndata: {payload}\n\n"
+
+
+class TurnStream:
+    """Traduit les événements d'un tour et retient le texte de la réponse finale."""
+
+    def __init__(self):
+        self.final_text = ""
+
+    def translate(self, event):
+        """Retourne la liste des messages SSE correspondant à un événement ADK."""
+        messages = []
+        for call in event.get_function_calls():
+            messages.append(format_sse("tool_start", {"id": call.id, "name": call.name, "args": call.args}))
+        for response in event.get_function_responses():
+            status = (response.response or {}).get("status")
+            messages.append(format_sse("tool_end", {"id": response.id, "name": response.name, "status": status}))
+        if event.partial:
+            text = "".join(part.text for part in (event.content.parts if event.content else []) if part.text)
+            if text:
+                messages.append(format_sse("token", {"text": text}))
+        elif event.is_final_response() and event.content and event.content.parts:
+            self.final_text = event.content.parts[0].text or ""
+            messages.append(format_sse("final", {"text": self.final_text}))
+        return messages
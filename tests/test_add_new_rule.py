@@ -0,0 +1,58 @@
+"""
+`add_new_rule` : les noms en français sont normalisés comme pour `diagnose`,
+un symptôme nouveau au format des clés du moteur enrichit le vocabulaire,
+seules les réponses autres que oui/non (et les noms libres inconnus) sont refusées.
+
+Lancement (depuis la racine du projet) :
+    python -m pytest tests
+"""
+
+import os
+import shutil
+
+import pytest
+
+from tools import diagnosis_tools
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture(autouse=True)
+def data(tmp_path, monkeypatch):
+    """Copie des fichiers de règles : le test ne modifie pas `data/`."""
+    for name in ("disease_rules.json", "disease_symptoms.json", "symptom_questions.json"):
+        shutil.copy(os.path.join(DATA_DIR, name), tmp_path / name)
+    monkeypatch.setattr(diagnosis_tools, "RULES_FILE", str(tmp_path / "disease_rules.json"))
+    monkeypatch.setattr(diagnosis_tools, "SYMPTOMS_FILE", str(tmp_path / "disease_symptoms.json"))
+    monkeypatch.setattr(diagnosis_tools, "QUESTIONS_FILE", str(tmp_path / "symptom_questions.json"))
+    monkeypatch.setattr(diagnosis_tools, "RULE_INDEX_PATH", None)
+
+
+def test_french_names_are_normalized():
+    result = diagnosis_tools.add_new_rule("Maladie A", {"fièvre": "oui", "toux": "non"})
+    assert result["status"] == "success" and result["new_symptoms"] == []
+    assert diagnosis_tools.current_rule_base().rules["Maladie A"] == {"fever": "yes", "cough": "no"}
+
+
+def test_new_snake_case_symptom_extends_the_vocabulary():
+    assert "night_sweats" not in diagnosis_tools.current_rule_base().symptoms
+    result = diagnosis_tools.add_new_rule("Maladie B", {"fever": "yes", "night_sweats": "oui"})
+    assert result["status"] == "success"
+    assert result["new_symptoms"] == ["night_sweats"]
+    base = diagnosis_tools.current_rule_base()
+    assert base.rules["Maladie B"] == {"fever": "yes", "night_sweats": "yes"}
+    assert "night_sweats" in base.symptoms
+    assert diagnosis_tools.diagnose({"night_sweats": "yes", "fever": "yes"})["diagnosis"] == "Maladie B"
+
+
+def test_invalid_answers_are_rejected():
+    result = diagnosis_tools.add_new_rule("Maladie C", {"fever": "peut-être", "night_sweats": "souvent"})
+    assert result["status"] == "error"
+    assert result["invalid_answers"] == ["fever", "night_sweats"]
+    assert "Maladie C" not in diagnosis_tools.current_rule_base().rules
+
+
+def test_unknown_free_text_names_are_rejected():
+    result = diagnosis_tools.add_new_rule("Maladie D", {"Sueurs Nocturnes!": "oui"})
+    assert result["status"] == "error"
+    assert result["unrecognized_symptoms"] == ["Sueurs Nocturnes!"]
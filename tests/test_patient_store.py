@@ -0,0 +1,61 @@
+"""
+Historique patient (`tools/patient_store.py`) : identifiants refusés avant
+tout accès disque, journal JSONL.
+
+Lancement (depuis la racine du projet) :
+    python -m pytest tests
+"""
+
+import os
+
+import pytest
+
+from tools.patient_store import PatientLog, is_valid_patient_id
+
+
+@pytest.fixture
+def log(tmp_path):
+    directory = tmp_path / "patients"
+    directory.mkdir()
+    return PatientLog(str(directory), fsync_interval=60)
+
+
+@pytest.mark.parametrize("patient_id", [
+    "../../victim", "../disease_rules", "a/b", "a\\b", "..", ".", "", "pa tient", "é", None, 42, "x" * 129,
+])
+def test_invalid_ids_are_rejected_before_any_file_access(log, tmp_path, patient_id):
+    victim = tmp_path / "victim.json"
+    victim.write_text("[1]")
+    assert not is_valid_patient_id(patient_id)
+    with pytest.raises(ValueError):
+        log.append(patient_id, {"a": 1})
+    with pytest.raises(ValueError):
+        log.read(patient_id)
+    assert victim.read_text() == "[1]"
+    assert sorted(os.listdir(tmp_path)) == ["patients", "victim.json"]
+
+
+def test_append_and_read(log):
+    assert log.read("patient_0001") is None
+    log.append("patient_0001", {"diagnosis": "Covid"})
+    log.append("patient_0001", {"diagnosis": "Grippe"})
+    assert log.read("patient_0001") == [{"diagnosis": "Covid"}, {"diagnosis": "Grippe"}]
+
+
+def test_legacy_array_is_migrated(log, tmp_path):
+    legacy = tmp_path / "patients" / "patient_0002.json"
+    legacy.write_text('[{"diagnosis": "Covid"}]')
+    log.append("patient_0002", {"diagnosis": "Grippe"})
+    assert log.read("patient_0002") == [{"diagnosis": "Covid"}, {"diagnosis": "Grippe"}]
+    assert not legacy.exists()
+    assert (tmp_path / "patients" / "patient_0002.json.migrated").exists()
+
+
+@pytest.mark.parametrize("content", ['{"rules": []}', '"texte"', "pas du json", "42"])
+def test_non_array_json_is_left_alone(log, tmp_path, content):
+    legacy = tmp_path / "patients" / "config.json"
+    legacy.write_text(content)
+    log.append("config", {"diagnosis": "Covid"})
+    assert log.read("config") == [{"diagnosis": "Covid"}]
+    assert legacy.read_text() == content
+    assert not (tmp_path / "patients" / "config.json.migrated").exists()
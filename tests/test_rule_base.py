@@ -0,0 +1,41 @@
+"""
+Base de règles en mode index (`tools/rule_base.py`) : une règle ajoutée dans
+le processus ne doit pas désactiver l'index projeté en mémoire.
+
+Lancement (depuis la racine du projet) :
+    python -m pytest tests
+"""
+
+import os
+import shutil
+
+import pytest
+
+from tools.rule_base import RuleBase
+from tools.rule_store import RuleStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture
+def base(tmp_path):
+    paths = []
+    for name in ("disease_rules.json", "disease_symptoms.json", "symptom_questions.json"):
+        shutil.copy(os.path.join(DATA_DIR, name), tmp_path / name)
+        paths.append(str(tmp_path / name))
+    return RuleBase(*paths, index_path=str(tmp_path / "rules.idx"))
+
+
+def test_index_is_back_after_an_in_process_edit(base):
+    assert base.snapshot().index is not None
+    store = RuleStore(base, flush_delay=60)
+    assert store.add_rule("Maladie de test", {"fever": "yes", "new_symptom": "yes"})
+    published = base.snapshot()
+    assert published.index is None and "Maladie de test" in published.rules
+    store.flush()
+    reloaded = base.snapshot()
+    assert reloaded.index is not None
+    assert reloaded.version > published.version
+    assert reloaded.rules["Maladie de test"] == {"fever": "yes", "new_symptom": "yes"}
+    assert "new_symptom" in reloaded.symptoms
+    assert base.snapshot() is reloaded
@@ -0,0 +1,78 @@
+"""
+`sanitize_for_logging` doit rester strictement équivalent à l'implémentation
+d'origine (remplacements successifs des emojis, puis filtrage caractère par
+caractère) : mêmes sorties sur un corpus fixe et sur des textes aléatoires.
+
+Lancement (depuis la racine du projet) :
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from utils.utils import _EMOJI_REPLACEMENTS, sanitize_for_logging
+
+
+def legacy_sanitize_for_logging(text):
+    """Implémentation d'origine, référence du comportement attendu."""
+    for emoji, replacement in dict(_EMOJI_REPLACEMENTS).items():
+        text = text.replace(emoji, replacement)
+    cleaned_text = ''
+    for char in text:
+        if ord(char) < 128:
+            cleaned_text += char
+        else:
+            try:
+                char.encode('cp1252')
+                cleaned_text += char
+            except UnicodeEncodeError:
+                cleaned_text += '?'
+    return cleaned_text
+
+
+CORPUS = [
+    "",
+    "Fever and cough since yesterday.",
+    "Bonjour, j'ai de la fièvre et mal à la gorge depuis 3 jours.",
+    "Selon vos symptômes, il pourrait s'agir d'une grippe 🙂\nReposez-vous.",
+    "Prix : 12 € — « consultation » recommandée…",
+    "Œdème, cœur, naïve, où, ç, ù, ô",
+    "αβγ 中文 ✓ ☺",
+    "☺️",
+    "☺",
+    "️",
+    "☺️☺️😀",
+    "Hmm 🤔🤔 je ne sais pas 😅",
+    "Émoji inconnu : 🦠 et 💊",
+    "\t\r\n\x00\x7f",
+    "".join(_EMOJI_REPLACEMENTS),
+]
+
+ALPHABET = (
+    "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJ.,;:!?\n0123456789"
+    "éèêàçùôîœ€«»’–—" "αβγ中文✓☺️"
+    + "".join(_EMOJI_REPLACEMENTS)
+)
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_matches_legacy_on_corpus(text):
+    assert sanitize_for_logging(text) == legacy_sanitize_for_logging(text)
+
+
+def test_matches_legacy_on_random_texts():
+    rng = random.Random(42)
+    for _ in range(2000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 300)))
+        assert sanitize_for_logging(text) == legacy_sanitize_for_logging(text), text
+
+
+def test_output_is_cp1252_encodable():
+    for text in CORPUS:
+        sanitize_for_logging(text).encode("cp1252")
+
+
+def test_ascii_text_is_returned_unchanged():
+    text = "Fever and cough. " * 100
+    assert sanitize_for_logging(text) is text
@@ -0,0 +1,58 @@
+"""
+État de diagnostic incrémental (`tools/session_scorer.py`) : mêmes scores
+qu'un rescoring complet, y compris quand le cache des scores du processus est
+vidé ou que l'état est relu depuis la base (JSON) ; l'état ne contient pas les
+tableaux de scores.
+
+Lancement (depuis la racine du projet) :
+    python -m pytest tests
+"""
+
+import json
+import random
+
+from tools import session_scorer
+from tools.diagnosis_tools import current_rule_base
+from tools.session_scorer import STATE_KEY, session_scores
+
+
+def _consultation(rng, symptoms, steps=12):
+    answers = {}
+    for _ in range(steps):
+        op = rng.random()
+        if op < 0.6 or not answers:
+            answers[rng.choice(symptoms)] = rng.choice(["yes", "no"])
+        elif op < 0.8:
+            answers.pop(rng.choice(list(answers)))
+        else:
+            answers[rng.choice(list(answers))] = rng.choice(["yes", "no"])
+        yield dict(answers)
+
+
+def test_incremental_scores_match_full_rescoring():
+    base = current_rule_base()
+    engine = base.scoring_engine()
+    symptoms = sorted(engine.symptom_bits)
+    rng = random.Random(7)
+    for _ in range(100):
+        state = {}
+        for answers in _consultation(rng, symptoms):
+            if rng.random() < 0.2:
+                session_scorer._SCORES.clear()
+            if rng.random() < 0.2:
+                state = json.loads(json.dumps(state))
+            scores, remaining = session_scores(state, base, answers)
+            assert list(scores) == engine.scores(answers)
+            expected = engine.all_diseases
+            for symptom, value in answers.items():
+                expected &= ~base.question_planner().contradicted(symptom, value)
+            assert remaining == expected
+
+
+def test_state_holds_answers_and_remaining_only():
+    base = current_rule_base()
+    symptom = sorted(base.scoring_engine().symptom_bits)[0]
+    state = {}
+    session_scores(state, base, {symptom: "yes"})
+    assert set(state[STATE_KEY]) == {"rules", "session", "answers", "remaining"}
+    assert state[STATE_KEY]["answers"] == {symptom: "yes"}
@@ -0,0 +1,134 @@
+"""
+Service de sessions SQLite (`services/session_service.py`) : expiration,
+revalidation entre connexions (plusieurs workers sur la même base), conflit
+à la création, annulation des transactions en erreur.
+
+Lancement (depuis la racine du projet) :
+    python -m pytest tests
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from google.adk.events import Event, EventActions
+
+from services.session_service import SqliteSessionService
+
+APP = "app"
+
+
+def _event(timestamp=None, **delta):
+    return Event(author="user", invocation_id="inv", actions=EventActions(state_delta=delta),
+                 timestamp=timestamp if timestamp is not None else time.time())
+
+
+def _count(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+@pytest.fixture
+def service(db_path):
+    # sweep_interval élevé : les tests appellent `sweep` eux-mêmes
+    svc = SqliteSessionService(db_path, timeout_minutes=1, sweep_interval=3600)
+    yield svc
+    svc.close()
+
+
+@pytest.fixture
+def other(db_path, service):
+    """Second service sur la même base, comme un autre worker."""
+    svc = SqliteSessionService(db_path, timeout_minutes=1, sweep_interval=3600)
+    yield svc
+    svc.close()
+
+
+def test_sweep_evicts_inactive_sessions_and_their_events(service, db_path):
+    now = time.time()
+    old = service.create_session(app_name=APP, user_id="u", session_id="old")
+    service.append_event(old, _event(timestamp=now - 120, step=1))
+    recent = service.create_session(app_name=APP, user_id="u", session_id="recent")
+    service.append_event(recent, _event(timestamp=now, step=1))
+
+    assert service.sweep(now=now) == 1
+    assert service.get_session(app_name=APP, user_id="u", session_id="old") is None
+    assert service.get_session(app_name=APP, user_id="u", session_id="recent").state == {"step": 1}
+    assert service.cache_size_current() == 1
+    assert _count(db_path, "sessions") == 1
+    assert _count(db_path, "events") == 1
+    assert service.sweep(now=now) == 0
+
+
+def test_sweep_is_disabled_without_timeout(db_path):
+    svc = SqliteSessionService(db_path, timeout_minutes=0)
+    try:
+        session = svc.create_session(app_name=APP, user_id="u", session_id="s")
+        svc.append_event(session, _event(timestamp=0, step=1))
+        assert svc.sweep() == 0
+        assert svc.get_session(app_name=APP, user_id="u", session_id="s") is not None
+    finally:
+        svc.close()
+
+
+def test_cached_session_is_revalidated_across_connections(service, other):
+    service.create_session(app_name=APP, user_id="u", session_id="s", state={"step": 0})
+    assert service.get_session(app_name=APP, user_id="u", session_id="s").state == {"step": 0}
+
+    session = other.get_session(app_name=APP, user_id="u", session_id="s")
+    other.append_event(session, _event(step=1))
+    refreshed = service.get_session(app_name=APP, user_id="u", session_id="s")
+    assert refreshed.state == {"step": 1}
+    assert len(refreshed.events) == 1
+
+    other.delete_session(app_name=APP, user_id="u", session_id="s")
+    assert service.get_session(app_name=APP, user_id="u", session_id="s") is None
+
+
+def test_unchanged_cached_session_is_served_without_table_reads(service):
+    service.create_session(app_name=APP, user_id="u", session_id="s")
+    service.get_session(app_name=APP, user_id="u", session_id="s")
+    statements = []
+    service._conn.set_trace_callback(statements.append)
+    try:
+        for _ in range(3):
+            service.get_session(app_name=APP, user_id="u", session_id="s")
+    finally:
+        service._conn.set_trace_callback(None)
+    assert statements and all(s.startswith("PRAGMA data_version") for s in statements)
+
+
+def test_duplicate_create_raises_conflict(service, other):
+    service.create_session(app_name=APP, user_id="u", session_id="s")
+    with pytest.raises(ValueError):
+        service.create_session(app_name=APP, user_id="u", session_id="s")
+    with pytest.raises(ValueError):
+        other.create_session(app_name=APP, user_id="u", session_id="s")
+    assert not other.ensure_session(app_name=APP, user_id="u", session_id="s")
+    assert other.ensure_session(app_name=APP, user_id="u", session_id="s2")
+
+
+def test_failed_sweep_and_delete_roll_back(service, db_path):
+    session = service.create_session(app_name=APP, user_id="u", session_id="s")
+    service.append_event(session, _event(timestamp=0, step=1))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TRIGGER no_delete BEFORE DELETE ON sessions BEGIN SELECT RAISE(ABORT, 'refus'); END")
+
+    with pytest.raises(sqlite3.Error):
+        service.sweep()
+    with pytest.raises(sqlite3.Error):
+        service.delete_session(app_name=APP, user_id="u", session_id="s")
+    assert not service._write_conn.in_transaction
+    assert _count(db_path, "events") == 1
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP TRIGGER no_delete")
+    service.delete_session(app_name=APP, user_id="u", session_id="s")
+    assert _count(db_path, "sessions") == 0
+    assert _count(db_path, "events") == 0
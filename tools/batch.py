@@ -0,0 +1,219 @@
+"""
+Diagnostic en masse : lecture en flux de fichiers JSONL/CSV d'enregistrements
+{symptôme: 'yes'/'no'}, scoring par blocs dans un pool de processus et
+écriture incrémentale des résultats classés.
+
+La mémoire reste bornée quelle que soit la taille de l'entrée : seuls
+`max_pending` blocs sont en vol à un instant donné, et les résultats sont
+émis dans l'ordre d'entrée dès que le bloc le plus ancien est prêt.
+
+Formats d'entrée :
+- JSONL : une ligne par enregistrement, soit directement {symptôme: réponse},
+  soit {"id": ..., "symptoms": {symptôme: réponse}}.
+- CSV : une colonne par symptôme (cellules vides ignorées) et une colonne
+  optionnelle "id".
+
+Les noms de symptômes et les réponses sont normalisés comme pour `diagnose`
+(français, synonymes, oui/non ; voir `symptom_normalizer.py`) par chaque worker.
+"""
+
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .scoring import ScoringEngine
+from .symptom_normalizer import SymptomNormalizer, load_synonyms
+
+ID_FIELDS = ("id", "record_id")
+
+_worker_engine = None
+_worker_normalizer = None
+
+
+def _record_from_dict(obj, line_no):
+    record_id = obj.get("id", obj.get("record_id", line_no))
+    if isinstance(obj.get("symptoms"), dict):
+        return record_id, obj["symptoms"]
+    return record_id, {k: v for k, v in obj.items() if k not in ID_FIELDS}
+
+
+def detect_format(path, default="jsonl"):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return default
+
+
+def iter_records(stream, fmt="jsonl"):
+    """
+    Itère paresseusement sur (id, {symptôme: réponse}) depuis un flux texte.
+    Les lignes JSON invalides sont signalées par un symptôme None.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for line_no, row in enumerate(reader, start=1):
+            symptoms = {k: v for k, v in row.items() if k and k not in ID_FIELDS and v not in (None, "")}
+            record_id = row.get("id") or row.get("record_id") or line_no
+            yield record_id, symptoms
+        return
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, None
+            continue
+        if not isinstance(obj, dict):
+            yield line_no, None
+            continue
+        yield _record_from_dict(obj, line_no)
+
+
+def _score_record(engine, normalizer, record_id, symptoms, top_k):
+    if symptoms is None:
+        return {"id": record_id, "status": "error", "message": "Enregistrement invalide."}
+    symptoms, unrecognized = normalizer.normalize(symptoms)
+    ranked = [c for c in engine.rank(symptoms, top_k) if c["score"] > 0]
+    if not ranked:
+        result = {
+            "id": record_id,
+            "status": "error",
+            "message": "Aucune maladie détectée avec confiance à partir des symptômes fournis."
+        }
+    else:
+        result = {
+            "id": record_id,
+            "status": "success",
+            "diagnosis": ranked[0]["disease"],
+            "score": ranked[0]["score"],
+            "candidates": ranked
+        }
+    if unrecognized:
+        result["unrecognized_symptoms"] = unrecognized
+    return result
+
+
+def _load_json(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _init_worker(rules_file, questions_file=None, synonyms_file=None, match_threshold=0.6):
+    global _worker_engine, _worker_normalizer
+    rules = _load_json(rules_file)
+    questions = _load_json(questions_file)
+    _worker_engine = ScoringEngine(rules)
+    vocabulary = {s for rule in rules.values() for s in rule}
+    vocabulary.update(questions)
+    _worker_normalizer = SymptomNormalizer(vocabulary, questions, load_synonyms(synonyms_file), match_threshold)
+
+
+def _score_chunk(chunk, top_k):
+    return [_score_record(_worker_engine, _worker_normalizer, rid, symptoms, top_k) for rid, symptoms in chunk]
+
+
+def _chunks(records, chunk_size):
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size doit être >= 1 (reçu : {chunk_size})")
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def check_batch_params(workers, chunk_size, top_k):
+    """Lève ValueError si un paramètre du batch est hors limites."""
+    if workers is not None and workers < 0:
+        raise ValueError(f"workers doit être >= 0 (reçu : {workers})")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size doit être >= 1 (reçu : {chunk_size})")
+    if top_k < 1:
+        raise ValueError(f"top_k doit être >= 1 (reçu : {top_k})")
+
+
+def score_records(records, rules_file, workers=None, chunk_size=1000, top_k=3, max_pending=None,
+                  questions_file=None, synonyms_file=None, match_threshold=0.6):
+    """
+    Génère les résultats (dans l'ordre d'entrée) pour un itérable de
+    (id, symptômes).
+
+    Args:
+        records: itérable de (id, {symptôme: réponse})
+        rules_file (str): chemin de disease_rules.json
+        workers (int): taille du pool ; 0 ou 1 = scoring dans le processus courant
+        chunk_size (int): nombre d'enregistrements par bloc envoyé à un worker (>= 1)
+        top_k (int): nombre de candidats classés par enregistrement (>= 1)
+        max_pending (int): nombre maximal de blocs en vol (défaut : 2 × workers)
+        questions_file (str): symptom_questions.json (défaut : à côté de rules_file)
+        synonyms_file (str): symptom_synonyms.json (défaut : à côté de rules_file)
+        match_threshold (float): seuil des correspondances approchées de noms de symptômes
+    Raises:
+        ValueError: paramètres hors limites (avant tout calcul)
+    """
+    check_batch_params(workers, chunk_size, top_k)
+    return _score_records(records, rules_file, workers, chunk_size, top_k, max_pending,
+                          questions_file, synonyms_file, match_threshold)
+
+
+def _score_records(records, rules_file, workers, chunk_size, top_k, max_pending,
+                   questions_file, synonyms_file, match_threshold):
+    data_dir = os.path.dirname(rules_file)
+    initargs = (
+        rules_file,
+        questions_file or os.path.join(data_dir, "symptom_questions.json"),
+        synonyms_file or os.path.join(data_dir, "symptom_synonyms.json"),
+        match_threshold
+    )
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        _init_worker(*initargs)
+        for chunk in _chunks(records, chunk_size):
+            yield from _score_chunk(chunk, top_k)
+        return
+
+    max_pending = max_pending or 2 * workers
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+    pending = deque()
+    try:
+        for chunk in _chunks(records, chunk_size):
+            pending.append(executor.submit(_score_chunk, chunk, top_k))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_jsonl_lines(results):
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def score_file(input_path, output_path, rules_file, fmt=None, **kwargs):
+    """
+    Score un fichier JSONL/CSV et écrit les résultats en JSONL au fil de l'eau.
+
+    Returns:
+        int: nombre d'enregistrements traités
+    """
+    fmt = fmt or detect_format(input_path)
+    count = 0
+    with open(input_path, "r", encoding="utf-8", newline="") as src, \
+            open(output_path, "w", encoding="utf-8") as dst:
+        for line in iter_jsonl_lines(score_records(iter_records(src, fmt), rules_file, **kwargs)):
+            dst.write(line)
+            count += 1
+    return count
@@ -0,0 +1,173 @@
+"""
+Stockage des textes de maladies (descriptions, traitements).
+
+Les fichiers `<maladie>.txt` sont lus paresseusement et gardés dans un cache
+LRU, invalidé quand le mtime ou la taille du fichier change. Une étape de
+construction optionnelle regroupe tous les textes d'un dossier dans un seul
+fichier indexé (`<dossier>.pack`), ouvert en `mmap` : une maladie présente
+dans le pack est servie sans aucun appel système par fichier. Le fichier
+`<maladie>.txt` reste la source de repli pour les maladies absentes du pack.
+
+Le pack n'est pas revalidé fichier par fichier : il doit être reconstruit après
+modification des textes (`refresh_pack`, appelé par `config_interface.py`), ou
+à la main :
+    python -m tools.content_store data/disease_descriptions data/disease_treatments
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+PACK_MAGIC = b"MEDTXT1\n"
+_HEADER = struct.Struct("<8sQ")
+
+
+def pack_path_for(directory):
+    return os.path.normpath(directory) + ".pack"
+
+
+def _decode(raw):
+    # Certains textes historiques sont en Windows-1252 et non en UTF-8
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")
+
+
+def build_pack(directory, pack_path=None):
+    """
+    Regroupe tous les `.txt` d'un dossier dans un fichier indexé.
+    Écriture dans un fichier temporaire puis renommage atomique.
+
+    Returns:
+        int: nombre de textes packés
+    """
+    pack_path = pack_path or pack_path_for(directory)
+    index = {}
+    blobs = []
+    offset = 0
+    for fname in sorted(os.listdir(directory)):
+        if not fname.endswith(".txt"):
+            continue
+        with open(os.path.join(directory, fname), "rb") as f:
+            data = _decode(f.read()).strip().encode("utf-8")
+        index[fname[:-4]] = [offset, len(data)]
+        blobs.append(data)
+        offset += len(data)
+    header = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    tmp_path = f"{pack_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(PACK_MAGIC, len(header)))
+        f.write(header)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, pack_path)
+    return len(index)
+
+
+def refresh_pack(directory):
+    """Reconstruit le pack d'un dossier s'il existe déjà."""
+    if os.path.exists(pack_path_for(directory)):
+        build_pack(directory)
+
+
+class _Pack:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _HEADER.unpack_from(self.mm, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"Pack invalide : {path}")
+        start = _HEADER.size
+        self.index = json.loads(self.mm[start:start + header_len].decode("utf-8"))
+        self.data_start = start + header_len
+
+    def get(self, name):
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        start = self.data_start + offset
+        return self.mm[start:start + length].decode("utf-8")
+
+
+class TextStore:
+    """
+    Args:
+        directory (str): dossier contenant les `<maladie>.txt`
+        cache_size (int): nombre de textes gardés dans le LRU
+        pack_check_interval (float): délai minimal (s) entre deux vérifications du pack
+    """
+
+    def __init__(self, directory, cache_size=256, pack_check_interval=2.0):
+        self.directory = directory
+        self.pack_path = pack_path_for(directory)
+        self.cache_size = cache_size
+        self.pack_check_interval = pack_check_interval
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pack = None
+        self._pack_stat = None
+        self._pack_checked_at = 0.0
+
+    def _current_pack(self):
+        now = time.monotonic()
+        if now - self._pack_checked_at < self.pack_check_interval:
+            return self._pack
+        with self._lock:
+            self._pack_checked_at = now
+            try:
+                st = os.stat(self.pack_path)
+                stat = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stat = None
+            if stat != self._pack_stat:
+                self._pack_stat = stat
+                try:
+                    self._pack = _Pack(self.pack_path) if stat else None
+                except (OSError, ValueError) as e:
+                    print(f"ERREUR lors du chargement du pack {self.pack_path}: {str(e)}")
+                    self._pack = None
+            return self._pack
+
+    def get(self, name):
+        """Retourne le texte (sans espaces de bord) ou None s'il n'existe pas."""
+        pack = self._current_pack()
+        if pack is not None:
+            text = pack.get(name)
+            if text is not None:
+                return text
+
+        path = os.path.join(self.directory, f"{name}.txt")
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == stamp:
+                self._cache.move_to_end(name)
+                return cached[1]
+        try:
+            with open(path, "rb") as f:
+                text = _decode(f.read()).strip()
+        except OSError:
+            return None
+        with self._lock:
+            self._cache[name] = (stamp, text)
+            self._cache.move_to_end(name)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+
+if __name__ == "__main__":
+    for folder in sys.argv[1:]:
+        count = build_pack(folder)
+        print(f"{count} textes packés dans {pack_path_for(folder)}")
@@ -1,169 +1,258 @@
-import json
 import os
-from google.adk.tools import ToolContext
+import re
 from datetime import datetime
+from typing import TYPE_CHECKING
 
-def get_config():
-    config_path = os.environ.get("APP_CONFIG_PATH", "config/app_config.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+from utils.config import get_app_config
 
-app_config = get_config()
+from .content_store import TextStore
+from .patient_store import PatientLog
+from .rule_base import get_rule_base
+from .rule_store import get_rule_store
+from .session_scorer import session_scores
+from .symptom_normalizer import get_normalizer, normalize_answer
+from .tool_cache import ToolCache
+
+if TYPE_CHECKING:
+    # google.adk est lourd à importer : inutile pour le chemin sans LLM
+    from google.adk.tools import ToolContext
+
+app_config = get_app_config()
 DATA_DIR = app_config.get("data_dir", "data/")
 RULES_FILE = os.path.join(DATA_DIR, "disease_rules.json")
 SYMPTOMS_FILE = os.path.join(DATA_DIR, "disease_symptoms.json")
 QUESTIONS_FILE = os.path.join(DATA_DIR, "symptom_questions.json")
+SYNONYMS_FILE = os.path.join(DATA_DIR, "symptom_synonyms.json")
 DESCRIPTIONS_DIR = os.path.join(DATA_DIR, "disease_descriptions")
 TREATMENTS_DIR = os.path.join(DATA_DIR, "disease_treatments")
 PATIENT_HISTORY_DIR = os.path.join(DATA_DIR, "patients")
-os.makedirs(PATIENT_HISTORY_DIR, exist_ok=True)
+SUGGESTED_QUESTIONS_LIMIT = app_config.get("suggested_questions_limit", 3)
+# Index binaire partagé par mmap entre les workers (recompilé quand les JSON changent)
+RULE_INDEX_PATH = (app_config.get("rule_index_path", os.path.join(DATA_DIR, "disease_rules.idx"))
+                   if app_config.get("use_rule_index", False) else None)
+# Forme des clés du moteur (`sore_throat`) : seule forme acceptée pour un symptôme nouveau
+_SYMPTOM_KEY = re.compile(r"[a-z0-9]+(?:_[a-z0-9]+)*")
 
-# Au début du fichier, après avoir défini les chemins
-required_files = [RULES_FILE, SYMPTOMS_FILE, QUESTIONS_FILE]
-required_dirs = [DESCRIPTIONS_DIR, TREATMENTS_DIR, PATIENT_HISTORY_DIR]
+_data_layout_checked = False
 
-for file_path in required_files:
-    if not os.path.exists(file_path):
-        print(f"ERREUR: Fichier requis manquant: {file_path}")
+def _ensure_data_layout():
+    """Vérifie les fichiers requis et crée les répertoires manquants, au premier usage."""
+    global _data_layout_checked
+    if _data_layout_checked:
+        return
+    required_files = [RULES_FILE, SYMPTOMS_FILE, QUESTIONS_FILE]
+    required_dirs = [DESCRIPTIONS_DIR, TREATMENTS_DIR, PATIENT_HISTORY_DIR]
 
-for dir_path in required_dirs:
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path, exist_ok=True)
-        print(f"INFO: Répertoire créé: {dir_path}")
+    for file_path in required_files:
+        if not os.path.exists(file_path):
+            print(f"ERREUR: Fichier requis manquant: {file_path}")
 
+    for dir_path in required_dirs:
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+            print(f"INFO: Répertoire créé: {dir_path}")
+    _data_layout_checked = True
 
-def _load_json(filepath):
-    try:
-        if not os.path.exists(filepath):
-            print(f"ERREUR: Fichier introuvable: {filepath}")
-            return {}
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        print(f"ERREUR: Format JSON invalide dans {filepath}")
-        return {}
-    except Exception as e:
-        print(f"ERREUR lors du chargement de {filepath}: {str(e)}")
-        return {}
-
-def _save_json(filepath, data):
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def current_rule_base():
+    """Version courante (`RuleBaseSnapshot`) de la base de règles de l'application."""
+    _ensure_data_layout()
+    return get_rule_base(RULES_FILE, SYMPTOMS_FILE, QUESTIONS_FILE, RULE_INDEX_PATH).snapshot()
+
+def _normalizer(base=None):
+    return get_normalizer(base or current_rule_base(), SYNONYMS_FILE,
+                          app_config.get("symptom_match_threshold", 0.6))
+
+def normalize_symptoms(symptoms, base=None):
+    """Clés en français, synonymes, fautes de frappe, oui/non -> ({clé: 'yes'/'no'}, [non reconnus])."""
+    return _normalizer(base).normalize(symptoms)
+
+def _rule_store():
+    _ensure_data_layout()
+    return get_rule_store(RULES_FILE, SYMPTOMS_FILE, QUESTIONS_FILE,
+                          flush_delay=app_config.get("rule_flush_delay_seconds", 0.5),
+                          index_path=RULE_INDEX_PATH)
+
+# Cache des outils en lecture seule, vidé à chaque changement de la base de règles
+TOOL_CACHE = ToolCache(
+    maxsize=app_config.get("tool_cache_size", 4096),
+    version_fn=lambda: current_rule_base().version
+)
+
+DESCRIPTIONS = TextStore(DESCRIPTIONS_DIR)
+TREATMENTS = TextStore(TREATMENTS_DIR)
 
 def _get_description(disease):
-    path = os.path.join(DESCRIPTIONS_DIR, f"{disease}.txt")
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
+    text = DESCRIPTIONS.get(disease)
+    if text is not None:
+        return text
     return "Description indisponible pour cette maladie."
 
 def _get_treatment(disease):
-    path = os.path.join(TREATMENTS_DIR, f"{disease}.txt")
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
+    text = TREATMENTS.get(disease)
+    if text is not None:
+        return text
     return "Conseils ou traitements indisponibles pour cette maladie."
 
-def _patient_history_path(patient_id):
-    return os.path.join(PATIENT_HISTORY_DIR, f"{patient_id}.json")
+PATIENT_LOG = PatientLog(PATIENT_HISTORY_DIR, fsync_interval=app_config.get("patient_fsync_interval_seconds", 1.0))
 
-def diagnose(symptoms: dict, tool_context: ToolContext = None) -> dict:
-    """
-    Diagnostique une maladie probable selon les symptômes fournis.
-    Args:
-        symptoms (dict): Dictionnaire {symptôme: 'oui'/'non'}
-    Returns:
-        dict: status, diagnosis, score, description, treatment
-    """
-    rules = _load_json(RULES_FILE)
-    best_match = None
-    max_score = -1
-    for disease, rule in rules.items():
-        score = sum(
-            (symptoms.get(k, "").lower() == v.lower())
-            for k, v in rule.items()
-        )
-        if score > max_score:
-            max_score = score
-            best_match = disease
+def _diagnosis_result(base, scores, top_k, unrecognized):
+    """Résultat dérivé des seules règles (mémoïsable) : les textes sont ajoutés par `_with_texts`."""
+    engine = base.scoring_engine()
+    best_match, max_score = engine.best_of(scores)
 
     if best_match and max_score > 0:
-        desc = _get_description(best_match)
-        treat = _get_treatment(best_match)
-        return {
+        result = {
             "status": "success",
             "diagnosis": best_match,
-            "score": max_score,
-            "description": desc,
-            "treatment": treat
+            "score": max_score
         }
+        if top_k and top_k > 1:
+            result["candidates"] = [c for c in engine.rank_of(scores, top_k) if c["score"] > 0]
     else:
-        return {
+        result = {
             "status": "error",
             "message": "Aucune maladie détectée avec confiance à partir des symptômes fournis."
         }
+    if unrecognized:
+        result["unrecognized_symptoms"] = unrecognized
+    return result
+
+def _with_texts(result):
+    # Hors cache : un texte modifié est servi sans attendre un changement de version des règles
+    if result.get("status") != "success":
+        return result
+    disease = result["diagnosis"]
+    head = {k: result.pop(k) for k in ("status", "diagnosis", "score")}
+    return {**head, "description": _get_description(disease), "treatment": _get_treatment(disease), **result}
+
+@TOOL_CACHE.memoize
+def _cached_diagnose(symptoms: dict, top_k: int = 1) -> dict:
+    base = current_rule_base()
+    symptoms, unrecognized = normalize_symptoms(symptoms, base)
+    return _diagnosis_result(base, base.scoring_engine().scores(symptoms), top_k, unrecognized)
 
-def list_symptoms(tool_context: ToolContext = None) -> dict:
+def diagnose(symptoms: dict, tool_context: "ToolContext" = None, top_k: int = 1) -> dict:
     """
-    Retourne la liste des symptômes connus du système.
+    Diagnostique une maladie probable selon les symptômes fournis.
+    Args:
+        symptoms (dict): Dictionnaire {symptôme: 'oui'/'non'} ; les noms en français
+            ou synonymes (ex: 'toux', 'mal de tête') sont reconnus
+        top_k (int): Nombre de maladies candidates à classer (1 = meilleure seulement)
+    Returns:
+        dict: status, diagnosis, score, description, treatment
+              (+ candidates [{disease, score, margin}] si top_k > 1)
+              (+ unrecognized_symptoms si certains noms n'ont pas été reconnus)
     """
-    rules = _load_json(RULES_FILE)
-    all_symptoms = set()
-    for rule in rules.values():
-        all_symptoms.update(rule.keys())
+    if tool_context is None:
+        return _with_texts(_cached_diagnose(symptoms, top_k=top_k))
+    # Consultation en cours : seules les réponses nouvelles ou modifiées sont rescorées.
+    # Hors cache : l'état de la session doit être mis à jour à chaque appel.
+    base = current_rule_base()
+    symptoms, unrecognized = normalize_symptoms(symptoms, base)
+    scores, _ = session_scores(tool_context.state, base, symptoms)
+    return _with_texts(_diagnosis_result(base, scores, top_k, unrecognized))
+
+@TOOL_CACHE.memoize
+def _cached_list_symptoms() -> dict:
     return {
         "status": "success",
-        "symptoms": sorted(list(all_symptoms))
+        "symptoms": list(current_rule_base().symptoms)
     }
 
-def suggest_questions(symptoms: dict = {}, tool_context: ToolContext = None) -> dict:
+def list_symptoms(tool_context: "ToolContext" = None) -> dict:
     """
-    Suggère les prochaines questions les plus discriminantes à poser à l'utilisateur.
+    Retourne la liste des symptômes connus du système.
     """
-    questions = _load_json(QUESTIONS_FILE)
-    rules = _load_json(RULES_FILE)
-    # Priorité : symptômes non encore renseignés, les plus discriminants (présents dans le plus de maladies)
-    all_symptoms = set()
-    for rule in rules.values():
-        all_symptoms.update(rule.keys())
-    already_asked = set(symptoms.keys()) if symptoms else set()
-    to_ask = [s for s in all_symptoms if s not in already_asked]
-    # Tri par "fréquence" d'apparition dans les règles (les plus partagés en premier)
-    freq = {s: 0 for s in to_ask}
-    for rule in rules.values():
-        for s in to_ask:
-            if s in rule:
-                freq[s] += 1
-    suggestions = sorted(to_ask, key=lambda s: -freq[s])
-    questions_out = [questions.get(s, f"Présentez-vous ce symptôme : {s} ? (oui/non)") for s in suggestions]
-    return {
+    return _cached_list_symptoms()
+
+def _suggestions_result(base, symptoms, unrecognized, max_questions, candidates=None, scores=None):
+    questions = base.questions
+    limit = max_questions if max_questions and max_questions > 0 else SUGGESTED_QUESTIONS_LIMIT
+    plan, remaining = base.question_planner().plan(symptoms, limit, candidates, scores)
+    suggestions = [s for s, _ in plan]
+    questions_out = [questions.get(s, f"Présentez-vous ce symptôme : {s} ? (oui/non)") for s in suggestions]
+    result = {
         "status": "success",
-        "questions": questions_out
+        "questions": questions_out,
+        "symptoms": suggestions,
+        "remaining_candidates": remaining
     }
+    if unrecognized:
+        result["unrecognized_symptoms"] = unrecognized
+    return result
+
+@TOOL_CACHE.memoize
+def _cached_suggest_questions(symptoms: dict, max_questions: int = 0) -> dict:
+    base = current_rule_base()
+    symptoms, unrecognized = normalize_symptoms(symptoms, base)
+    return _suggestions_result(base, symptoms, unrecognized, max_questions)
 
-def add_new_rule(disease: str, symptoms: dict, tool_context: ToolContext = None) -> dict:
+def suggest_questions(symptoms: dict = {}, tool_context: "ToolContext" = None, max_questions: int = 0) -> dict:
+    """
+    Suggère les prochaines questions les plus discriminantes à poser à l'utilisateur.
+    Les maladies contredites par les réponses déjà données sont écartées, puis les
+    symptômes restants sont classés par gain d'information sur les candidats restants.
+    Args:
+        symptoms (dict): Réponses déjà connues {symptôme: 'oui'/'non'} (noms en français acceptés)
+        max_questions (int): Nombre maximal de questions (0 = valeur de la configuration)
+    Returns:
+        dict: status, questions, symptoms (clés correspondantes), remaining_candidates
+              (+ unrecognized_symptoms si certains noms n'ont pas été reconnus)
+    """
+    if tool_context is None:
+        return _cached_suggest_questions(symptoms, max_questions=max_questions)
+    # Hors cache, comme `diagnose` : met à jour l'état incrémental de la session
+    base = current_rule_base()
+    symptoms, unrecognized = normalize_symptoms(symptoms, base)
+    scores, candidates = session_scores(tool_context.state, base, symptoms)
+    return _suggestions_result(base, symptoms, unrecognized, max_questions, candidates, scores)
+
+def add_new_rule(disease: str, symptoms: dict, tool_context: "ToolContext" = None) -> dict:
     """
     Permet à l'agent d'ajouter une nouvelle règle de diagnostic (si besoin, sur validation humaine).
+    Un symptôme encore inconnu du système est ajouté au vocabulaire s'il est nommé
+    comme les clés existantes : minuscules, chiffres et '_' (ex: 'night_sweats').
     Args:
         disease (str): Nom de la maladie
-        symptoms (dict): Dictionnaire {symptôme: 'oui'/'non'}
+        symptoms (dict): Dictionnaire {symptôme: 'oui'/'non'} (noms en français acceptés)
     Returns:
-        dict: status, message
+        dict: status, message, new_symptoms (+ unrecognized_symptoms / invalid_answers si la règle est refusée)
     """
-    rules = _load_json(RULES_FILE)
-    if disease in rules:
+    # Une clé déjà au format du moteur qui n'existe pas encore (sans correspondance exacte)
+    # est un symptôme nouveau : ne pas la rapprocher d'un symptôme voisin par similarité
+    normalizer = _normalizer()
+    new_symptoms = sorted(
+        name for name in (symptoms or {})
+        if isinstance(name, str) and _SYMPTOM_KEY.fullmatch(name) and normalizer.resolve_exact(name) is None
+    )
+    # Même normalisation que `diagnose` pour le reste : la règle est stockée avec les clés et réponses du moteur
+    rule, unrecognized = normalizer.normalize({k: v for k, v in (symptoms or {}).items() if k not in new_symptoms})
+    rule.update((name, normalize_answer(symptoms[name])) for name in new_symptoms)
+    invalid = sorted(s for s, v in rule.items() if v not in ("yes", "no") and s not in unrecognized)
+    if unrecognized or invalid:
+        result = {
+            "status": "error",
+            "message": "Règle refusée : symptômes non reconnus (un symptôme nouveau doit être nommé "
+                       "comme 'night_sweats') ou réponses autres que oui/non."
+        }
+        if unrecognized:
+            result["unrecognized_symptoms"] = unrecognized
+        if invalid:
+            result["invalid_answers"] = invalid
+        return result
+    if not _rule_store().add_rule(disease, rule):
         return {
             "status": "error",
             "message": f"La maladie '{disease}' existe déjà."
         }
-    rules[disease] = symptoms
-    _save_json(RULES_FILE, rules)
     return {
         "status": "success",
-        "message": f"Nouvelle maladie '{disease}' ajoutée avec succès."
+        "message": f"Nouvelle maladie '{disease}' ajoutée avec succès.",
+        "new_symptoms": new_symptoms
     }
 
-def explain_disease(disease: str, tool_context: ToolContext = None) -> dict:
+def explain_disease(disease: str, tool_context: "ToolContext" = None) -> dict:
     """
     Donne une explication complète sur une maladie (description + traitement).
     """
@@ -176,39 +265,37 @@ def explain_disease(disease: str, tool_context: ToolContext = None) -> dict:
         "treatment": treat
     }
 
-def get_patient_history(patient_id: str, tool_context: ToolContext = None) -> dict:
+def get_patient_history(patient_id: str, tool_context: "ToolContext" = None) -> dict:
     """
     Récupère tout l'historique patient (diagnostics, symptômes, dates...).
     """
-    path = _patient_history_path(patient_id)
-    if not os.path.exists(path):
+    _ensure_data_layout()
+    try:
+        data = PATIENT_LOG.read(patient_id)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if data is None:
         return {
             "status": "error",
             "message": f"Aucun historique trouvé pour l'identifiant patient {patient_id}."
         }
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
     return {
         "status": "success",
         "history": data
     }
 
-def save_patient_interaction(patient_id: str, interaction: dict, tool_context: ToolContext = None) -> dict:
+def save_patient_interaction(patient_id: str, interaction: dict, tool_context: "ToolContext" = None) -> dict:
     """
     Sauvegarde une interaction (symptômes, résultats, timestamp) dans l'historique patient.
     """
-    path = _patient_history_path(patient_id)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = []
     timestamp = datetime.utcnow().isoformat()
     interaction['timestamp'] = timestamp
-    data.append(interaction)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    _ensure_data_layout()
+    try:
+        PATIENT_LOG.append(patient_id, interaction)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
     return {
         "status": "success",
         "message": f"Interaction sauvegardée pour {patient_id}."
-    }
\ No newline at end of file
+    }
@@ -1,74 +1,163 @@
 """
-Adapter Experta pour l'intégrer comme outil dans ADK :
+Adapter Experta pour l'intégrer comme outil dans ADK :
 permet de réutiliser ou d'interfacer la logique experta dans le nouveau système.
+
+Les règles Experta sont générées depuis `disease_rules.json` : une règle par
+couple (symptôme, réponse), qui incrémente le score de toutes les maladies
+attendant cette réponse. Le diagnostic passe donc par le réseau Rete
+(`Fact(symptom=..., value=...)` déclarés pour chaque réponse du patient) et
+donne les mêmes scores que `ScoringEngine`.
+
+La classe du moteur est construite une fois par version de la base de règles,
+et les moteurs sont réutilisés (`reset()` puis nouveaux faits) via un pool :
+le réseau n'est compilé qu'une fois par moteur, seuls les faits changent.
 """
 
 try:
     from experta import KnowledgeEngine, Fact, Rule, DefFacts, MATCH, W, NOT
 except ImportError:
-    raise ImportError("Experta doit être installé pour utiliser l'adapter : pip install experta")
+    raise ImportError("Experta doit être installé pour utiliser l'adapter : pip install experta")
 
-import os
 import json
+import threading
+from contextlib import contextmanager
+
+from .diagnosis_tools import current_rule_base, normalize_symptoms
+from .scoring import ScoringEngine, _normalize_value
+
 
-# Si tu veux migrer/adapter les règles experta, tu peux t'inspirer de ce squelette.
 class MedicalExpertEngine(KnowledgeEngine):
-    def __init__(self, rules_path="data/disease_rules.json"):
-        super().__init__()
-        self.rules = self._load_rules(rules_path)
-        self.facts_memory = []
+    """
+    Base commune des moteurs générés par `build_engine_class` : la sous-classe
+    porte les règles et le `ScoringEngine` de la version correspondante.
 
-    def _load_rules(self, path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    Instancier directement `MedicalExpertEngine()` reste possible (ancienne
+    API) : on obtient un moteur compilé pour la base de règles courante, ou
+    pour le fichier `rules_path` s'il est donné. Pour des diagnostics répétés,
+    préférer `ENGINE_POOL.engine()`, qui réutilise les moteurs.
+    """
 
-    @DefFacts()
-    def base(self):
-        yield Fact(findDisease="true")
+    scoring = None
 
-    # Pour chaque symptôme, on peut générer dynamiquement une méthode ask_XXX
-    # ou les coder à la main, voir ton code d'origine.
+    def __new__(cls, rules_path=None):
+        if cls.scoring is None:
+            if rules_path is None:
+                cls = ENGINE_POOL.current_class()
+            else:
+                with open(rules_path, "r", encoding="utf-8") as f:
+                    cls = build_engine_class(ScoringEngine(json.load(f)))
+        return super().__new__(cls)
 
-    # Règles de diagnostic (simplification)
-    # On peut itérer sur self.rules pour générer dynamiquement les règles.
+    def __init__(self, rules_path=None):
+        super().__init__()
+        self.scores = []
 
-    # Exemples :
-    # @Rule(Fact(findDisease="true"), ...)
-    # def disease_X(self):
-    #     self.declare(Fact(disease="Covid"))
-    # ...etc.
+    @DefFacts()
+    def base(self):
+        yield Fact(findDisease="true")
 
-    # Pour la démo, on va juste implémenter un diagnostic simple :
-    def diagnose(self, symptoms):
+    def diagnose(self, symptoms, top_k=None):
         """
         Utilise la logique experta pour diagnostiquer selon les symptômes fournis.
+        Sans top_k : (maladie, score) de la meilleure correspondance.
+        Avec top_k : liste classée [{disease, score, margin}].
         """
-        best = None
-        max_score = -1
-        for disease, rule in self.rules.items():
-            score = sum(
-                (symptoms.get(k, "").lower() == v.lower())
-                for k, v in rule.items()
-            )
-            if score > max_score:
-                max_score = score
-                best = disease
-        return best, max_score
+        self.reset()
+        self.scores = [0] * len(self.scoring.diseases)
+        known = self.scoring.symptom_bits
+        for symptom, answer in (symptoms or {}).items():
+            if symptom in known:
+                self.declare(Fact(symptom=symptom, value=_normalize_value(answer)))
+        self.run()
+        if top_k:
+            return self.scoring.rank_of(self.scores, top_k)
+        return self.scoring.best_of(self.scores)
+
+
+def _column_rule(symptom, value, disease_indices):
+    @Rule(Fact(symptom=symptom, value=value))
+    def column(self):
+        scores = self.scores
+        for i in disease_indices:
+            scores[i] += 1
+    return column
+
+
+def build_engine_class(scoring):
+    """
+    Génère la sous-classe de `MedicalExpertEngine` correspondant à un
+    `ScoringEngine` : une règle par colonne (symptôme, réponse).
+    """
+    attrs = {"scoring": scoring}
+    for n, ((symptom, value), mask) in enumerate(sorted(scoring.columns.items())):
+        disease_indices = tuple(i for i in range(len(scoring.diseases)) if mask >> i & 1)
+        attrs[f"rule_{n}"] = _column_rule(symptom, value, disease_indices)
+    return type("CompiledMedicalExpertEngine", (MedicalExpertEngine,), attrs)
+
+
+class EnginePool:
+    """
+    Moteurs Experta prêts à l'emploi pour la version courante de la base de
+    règles. Un changement de version remplace la classe et vide le pool.
+
+    Args:
+        max_idle (int): nombre maximal de moteurs conservés au repos
+    """
+
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._version = None
+        self._engine_class = None
+        self._idle = []
+
+    def current_class(self):
+        """Classe de moteur compilée pour la version courante de la base de règles."""
+        snapshot = current_rule_base()
+        with self._lock:
+            if snapshot.version != self._version:
+                self._engine_class = build_engine_class(snapshot.scoring_engine())
+                self._version = snapshot.version
+                self._idle = []
+            return self._engine_class
+
+    @contextmanager
+    def engine(self):
+        engine_class = self.current_class()
+        with self._lock:
+            engine = self._idle.pop() if self._idle else None
+        if engine is None:
+            engine = engine_class()
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                if type(engine) is self._engine_class and len(self._idle) < self.max_idle:
+                    self._idle.append(engine)
+
+
+ENGINE_POOL = EnginePool()
+
 
 # Fonction ADK Tool pour utiliser Experta
-def experta_diagnose(symptoms: dict, tool_context=None) -> dict:
+def experta_diagnose(symptoms: dict, tool_context=None, top_k: int = 1) -> dict:
     """
     Diagnostiquer via Experta (backend règles)
     """
-    engine = MedicalExpertEngine()
-    disease, score = engine.diagnose(symptoms)
+    symptoms, _ = normalize_symptoms(symptoms)
+    with ENGINE_POOL.engine() as engine:
+        disease, score = engine.diagnose(symptoms)
+        candidates = engine.scoring.rank_of(engine.scores, top_k) if top_k and top_k > 1 else None
     if disease and score > 0:
-        return {
+        result = {
             "status": "success",
             "diagnosis": disease,
             "score": score
         }
+        if candidates is not None:
+            result["candidates"] = [c for c in candidates if c["score"] > 0]
+        return result
     return {
         "status": "error",
         "message": "Aucune maladie détectée via Experta."
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,216 @@
+"""
+Historique patient en journal append-only (JSONL).
+
+Chaque interaction est une ligne ajoutée à `<patient>.jsonl` sous verrou de
+fichier (`flock`) : une sauvegarde coûte O(1) quelle que soit la taille de
+l'historique, et deux sessions concurrentes ne peuvent plus s'écraser. Les
+`fsync` sont regroupés par un thread d'arrière-plan, qui se charge aussi du
+compactage (réécriture sans les lignes tronquées par un arrêt brutal).
+
+Les anciens fichiers `<patient>.json` (tableau JSON) sont migrés au premier
+accès et conservés sous le nom `<patient>.json.migrated`. Un `<patient>.json`
+qui n'est pas un tableau JSON n'est pas un ancien historique : il est signalé
+et laissé tel quel.
+
+L'identifiant patient sert de nom de fichier : il est restreint à
+`[A-Za-z0-9_-]+` (pas de séparateur ni de `..`), quel que soit l'appelant
+(routes HTTP, outils appelés par le modèle).
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrouillage limité au processus courant
+    fcntl = None
+
+_PATIENT_ID = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+def is_valid_patient_id(patient_id):
+    """True si l'identifiant peut servir de nom de fichier (lettres, chiffres, '_' et '-')."""
+    return isinstance(patient_id, str) and _PATIENT_ID.fullmatch(patient_id) is not None
+
+
+def check_patient_id(patient_id):
+    """Lève ValueError si l'identifiant patient n'est pas valide."""
+    if not is_valid_patient_id(patient_id):
+        raise ValueError(f"Identifiant patient invalide : {patient_id!r} (attendu : lettres, chiffres, '_' ou '-')")
+
+
+class PatientLog:
+    """
+    Args:
+        directory (str): dossier des historiques patients
+        fsync_interval (float): délai maximal (s) avant qu'une écriture soit synchronisée sur disque
+    """
+
+    def __init__(self, directory, fsync_interval=1.0):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self._thread_locks = [threading.Lock() for _ in range(64)]
+        self._state_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._state_lock)
+        self._dirty = set()
+        self._to_compact = set()
+        self._not_migrated = set()
+        self._worker = None
+
+    def log_path(self, patient_id):
+        check_patient_id(patient_id)
+        return os.path.join(self.directory, f"{patient_id}.jsonl")
+
+    def legacy_path(self, patient_id):
+        check_patient_id(patient_id)
+        return os.path.join(self.directory, f"{patient_id}.json")
+
+    def exists(self, patient_id):
+        return os.path.exists(self.log_path(patient_id)) or os.path.exists(self.legacy_path(patient_id))
+
+    @contextmanager
+    def _locked(self, path):
+        """Ouvre `path` en ajout et le verrouille (processus et threads)."""
+        with self._thread_locks[hash(path) % len(self._thread_locks)]:
+            while True:
+                fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # Le fichier a pu être remplacé (compactage) entre open et flock
+                try:
+                    same = os.fstat(fd).st_ino == os.stat(path).st_ino
+                except OSError:
+                    same = False
+                if same:
+                    break
+                os.close(fd)
+            try:
+                yield fd
+            finally:
+                os.close(fd)  # libère aussi le flock
+
+    def _rewrite(self, path, lines):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _migrate(self, patient_id):
+        legacy = self.legacy_path(patient_id)
+        if legacy in self._not_migrated or not os.path.exists(legacy):
+            return
+        path = self.log_path(patient_id)
+        with self._locked(path):
+            if not os.path.exists(legacy):
+                return
+            try:
+                with open(legacy, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                reason = None if isinstance(entries, list) else f"contenu de type {type(entries).__name__}"
+            except (ValueError, UnicodeDecodeError) as e:
+                reason = str(e)
+            if reason is not None:
+                # Pas un ancien historique (tableau JSON) : on n'y touche pas
+                self._not_migrated.add(legacy)
+                print(f"ERREUR: {legacy} n'est pas un historique au format tableau JSON, migration ignorée ({reason})")
+                return
+            with open(path, "r", encoding="utf-8") as f:
+                existing = f.readlines()
+            lines = [json.dumps(e, ensure_ascii=False) + "\n" for e in entries]
+            self._rewrite(path, lines + existing)
+            os.replace(legacy, legacy + ".migrated")
+
+    def append(self, patient_id, record):
+        """Ajoute un enregistrement à l'historique (O(1)). Raises: ValueError (identifiant invalide)"""
+        self._migrate(patient_id)
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        path = self.log_path(patient_id)
+        with self._locked(path) as fd:
+            size = os.fstat(fd).st_size
+            if size:
+                # Ne jamais coller une ligne à une fin de fichier tronquée
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    data = b"\n" + data
+            os.write(fd, data)
+        self._schedule(self._dirty, path)
+
+    def read(self, patient_id):
+        """
+        Retourne la liste des enregistrements, ou None si le patient est inconnu.
+        Raises: ValueError (identifiant invalide)
+        """
+        self._migrate(patient_id)
+        path = self.log_path(patient_id)
+        if not os.path.exists(path):
+            return None
+        entries = []
+        torn = False
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    torn = True
+        if torn:
+            self._schedule(self._to_compact, path)
+        return entries
+
+    def compact(self, path):
+        """Réécrit le journal sans les lignes vides ou tronquées."""
+        with self._locked(path):
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            kept = []
+            for line in lines:
+                try:
+                    json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kept.append(line if line.endswith("\n") else line + "\n")
+            if len(kept) != len(lines):
+                self._rewrite(path, kept)
+
+    def _schedule(self, bucket, path):
+        with self._wakeup:
+            bucket.add(path)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="patient-log", daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+            if bucket is self._to_compact:
+                self._wakeup.notify()
+
+    def flush(self):
+        """Synchronise sur disque les journaux modifiés et lance les compactages en attente."""
+        with self._wakeup:
+            dirty, self._dirty = self._dirty, set()
+            to_compact, self._to_compact = self._to_compact, set()
+        for path in dirty:
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                print(f"ERREUR lors de la synchronisation de {path}: {str(e)}")
+        for path in to_compact:
+            try:
+                self.compact(path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"ERREUR lors du compactage de {path}: {str(e)}")
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                self._wakeup.wait(self.fsync_interval)
+            self.flush()
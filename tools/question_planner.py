@@ -0,0 +1,127 @@
+"""
+Planificateur de questions par gain d'information.
+
+Les réponses déjà données éliminent les maladies qui les contredisent ; les
+symptômes restants sont ensuite classés selon la réduction d'entropie
+attendue sur les candidats encore possibles (a priori uniforme). Seules les
+N meilleures questions sont retournées, et le plan est mis en cache pour
+chaque état de réponses partielles.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+from .scoring import _normalize_value, _popcount
+
+
+class QuestionPlanner:
+    """
+    Args:
+        engine (ScoringEngine): base de règles compilée
+        cache_size (int): nombre d'états de réponses gardés en cache
+    """
+
+    def __init__(self, engine, cache_size=1024):
+        self.engine = engine
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Pour chaque symptôme : [(réponse, masque des maladies)] et masque des maladies qui le citent
+        self._partitions = {}
+        for (symptom, value), mask in engine.columns.items():
+            self._partitions.setdefault(symptom, []).append((value, mask))
+        # Ordre fixe des réponses : le gain ne dépend pas de l'ordre de compilation des colonnes
+        for parts in self._partitions.values():
+            parts.sort()
+        self._covered = {
+            symptom: _union(mask for _, mask in parts)
+            for symptom, parts in self._partitions.items()
+        }
+
+    def _state(self, answers):
+        """Forme canonique des réponses connues (symptômes et réponses reconnus)."""
+        state = []
+        for symptom, answer in (answers or {}).items():
+            if symptom in self._partitions:
+                state.append((symptom, _normalize_value(answer)))
+        return frozenset(state)
+
+    def contradicted(self, symptom, value):
+        """Masque des maladies dont la règle attend une autre réponse à `symptom`."""
+        expected = self.engine.columns.get((symptom, value))
+        if expected is None:
+            # Réponse inconnue pour ce symptôme : on ne peut rien éliminer
+            return 0
+        return self._covered[symptom] & ~expected
+
+    def candidates(self, state, remaining=None, scores=None):
+        """
+        Masque des maladies compatibles avec toutes les réponses reconnues.
+        `remaining` et `scores` peuvent être fournis s'ils sont déjà connus
+        (état incrémental de la session, voir `session_scorer.py`).
+        """
+        if remaining is None:
+            remaining = self.engine.all_diseases
+            for symptom, value in state:
+                remaining &= ~self.contradicted(symptom, value)
+        if not remaining:
+            # Aucune maladie ne colle parfaitement : on garde les meilleurs scores
+            if scores is None:
+                scores = self.engine.scores(dict(state))
+            top = max(scores, default=0)
+            for i, score in enumerate(scores):
+                if score == top:
+                    remaining |= 1 << i
+        return remaining
+
+    def _gain(self, symptom, remaining, n):
+        uncovered = _popcount(remaining & ~self._covered[symptom])
+        expected = (uncovered / n) * math.log2(n) if uncovered else 0.0
+        for _, mask in self._partitions[symptom]:
+            n_v = _popcount(remaining & mask)
+            if n_v:
+                expected += (n_v / n) * math.log2(n_v + uncovered)
+        return math.log2(n) - expected
+
+    def plan(self, answers, limit=3, remaining=None, scores=None):
+        """
+        Args:
+            remaining, scores: candidats et scores déjà calculés pour `answers` (optionnels)
+        Returns:
+            tuple: (liste [(symptôme, gain)] triée, nombre de candidats restants)
+        """
+        state = self._state(answers)
+        key = (state, limit)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        asked = set(answers or {})
+        remaining = self.candidates(state, remaining, scores)
+        n = _popcount(remaining)
+        ranked = []
+        if n > 1:
+            for symptom in self.engine.symptoms:
+                if symptom in asked:
+                    continue
+                gain = self._gain(symptom, remaining, n)
+                if gain > 1e-12:
+                    ranked.append((symptom, gain))
+            ranked.sort(key=lambda item: -item[1])
+        result = (ranked[:limit], n)
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+def _union(masks):
+    out = 0
+    for mask in masks:
+        out |= mask
+    return out
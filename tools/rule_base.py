@@ -0,0 +1,226 @@
+"""
+Base de règles compilée en mémoire, partagée par tout le processus.
+
+Les fichiers `disease_rules.json`, `disease_symptoms.json` et
+`symptom_questions.json` ne sont parsés qu'une seule fois ; le vocabulaire des
+symptômes et leur fréquence sont précalculés. Un simple `os.stat` par appel
+suffit ensuite à détecter une modification (mtime ou taille) : la base est
+alors rechargée et remplacée d'un bloc, si bien que les fichiers modifiés
+par un autre processus sont pris en compte sans redémarrage.
+
+Les modifications faites dans le processus passent par `RuleStore`
+(`rule_store.py`) : la nouvelle version est publiée en mémoire via `publish()`
+et les fichiers sont réécrits ensuite, sans déclencher de rechargement.
+
+Avec `index_path` (`use_rule_index`), les règles et les questions sont lues
+dans un index binaire projeté en mémoire (`rule_index.py`), partagé entre les
+workers d'un serveur préforké au lieu d'être parsé par chacun d'eux. Une
+version publiée en mémoire n'a pas d'index : une fois les fichiers réécrits,
+la base est rechargée depuis l'index recompilé.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from collections.abc import Mapping
+
+from .question_planner import QuestionPlanner
+from .rule_index import load_rule_index
+from .scoring import ScoringEngine
+
+
+class RuleBaseSnapshot:
+    """
+    Vue figée (à ne pas modifier) de la base de règles à un instant donné.
+
+    Attributes:
+        rules (dict): {maladie: {symptôme: 'yes'/'no'}}
+        disease_symptoms (dict): {maladie: [symptômes caractéristiques]}
+        questions (dict): {symptôme: question}
+        symptoms (tuple): vocabulaire trié de tous les symptômes des règles
+        symptom_frequency (dict): {symptôme: nombre de règles qui le citent}
+        version (int): incrémenté à chaque rechargement
+        index (RuleIndex ou None): index binaire dont proviennent `rules` et `questions`
+    """
+
+    __slots__ = ("rules", "disease_symptoms", "questions", "symptoms", "symptom_frequency", "version", "index",
+                 "_engine", "_planner")
+
+    def __init__(self, rules, disease_symptoms, questions, version, index=None):
+        self._engine = None
+        self._planner = None
+        self.rules = rules
+        self.disease_symptoms = disease_symptoms
+        self.questions = questions
+        self.index = index
+        if index is not None:
+            self.symptom_frequency = index.symptom_frequency()
+            self.symptoms = index.symptoms
+        else:
+            frequency = Counter()
+            for rule in rules.values():
+                frequency.update(rule.keys())
+            self.symptom_frequency = dict(frequency)
+            self.symptoms = tuple(sorted(frequency))
+        self.version = version
+
+    def scoring_engine(self):
+        """Moteur de scoring par masques de bits, compilé au premier besoin."""
+        if self._engine is None:
+            if self.index is not None:
+                self._engine = self.index.scoring_engine()
+            else:
+                self._engine = ScoringEngine(self.rules)
+        return self._engine
+
+    def question_planner(self):
+        """Planificateur de questions (avec son cache) propre à cette version."""
+        if self._planner is None:
+            self._planner = QuestionPlanner(self.scoring_engine())
+        return self._planner
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _parse_json(path, previous):
+    """Parse un fichier JSON ; en cas d'erreur on garde la version précédente."""
+    if not os.path.exists(path):
+        print(f"ERREUR: Fichier introuvable: {path}")
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"ERREUR: Format JSON invalide dans {path}")
+    except Exception as e:
+        print(f"ERREUR lors du chargement de {path}: {str(e)}")
+    return previous if previous is not None else {}
+
+
+class _LazyJsonFile(Mapping):
+    """Fichier JSON parsé au premier accès (inutile au diagnostic en mode index)."""
+
+    def __init__(self, path):
+        self._path = path
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            self._data = _parse_json(self._path, None)
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+class RuleBase:
+    """
+    Base de règles rechargée uniquement quand un des fichiers sources change.
+
+    Args:
+        index_path (str): si fourni, index binaire projeté en mémoire (recompilé au besoin)
+    """
+
+    def __init__(self, rules_file, symptoms_file, questions_file, index_path=None):
+        self.paths = (rules_file, symptoms_file, questions_file)
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._stats = None
+        self._snapshot = None
+        self._pinned = False
+
+    def _current_stats(self):
+        return tuple(_file_stat(p) for p in self.paths)
+
+    def snapshot(self):
+        """Retourne la base à jour (rechargée si un fichier a changé)."""
+        snap = self._snapshot
+        if snap is not None and self._pinned:
+            return snap
+        stats = self._current_stats()
+        if snap is not None and stats == self._stats:
+            return snap
+        with self._lock:
+            if self._snapshot is None or stats != self._stats:
+                self._reload(stats)
+            return self._snapshot
+
+    def _reload(self, stats):
+        previous = self._snapshot
+        rules_file, symptoms_file, questions_file = self.paths
+        version = previous.version + 1 if previous else 1
+        if self.index_path:
+            try:
+                index = load_rule_index(self.index_path, rules_file, questions_file)
+                self._snapshot = RuleBaseSnapshot(index.rules, _LazyJsonFile(symptoms_file), index.questions,
+                                                  version, index)
+                self._stats = stats
+                return
+            except Exception as e:
+                print(f"ERREUR lors du chargement de l'index {self.index_path}, lecture des JSON: {str(e)}")
+        rules = _parse_json(rules_file, previous and previous.rules)
+        disease_symptoms = _parse_json(symptoms_file, previous and previous.disease_symptoms)
+        questions = _parse_json(questions_file, previous and previous.questions)
+        # Publication atomique : les lecteurs voient l'ancienne ou la nouvelle base, jamais un mélange.
+        self._snapshot = RuleBaseSnapshot(rules, disease_symptoms, questions, version)
+        self._stats = stats
+
+    def publish(self, rules, disease_symptoms, questions):
+        """
+        Publie une version construite en mémoire (copie sur écriture). Jusqu'à
+        `written()`, les fichiers ne sont plus consultés : la version publiée fait foi.
+        """
+        with self._lock:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = RuleBaseSnapshot(rules, disease_symptoms, questions, version)
+            self._pinned = True
+            return self._snapshot
+
+    def written(self, snapshot):
+        """
+        Les fichiers contiennent `snapshot` : reprend la surveillance sans
+        recharger, sauf en mode index où le prochain accès recompile et
+        projette l'index (la version publiée n'en a pas).
+        """
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._stats = None if self.index_path else self._current_stats()
+                self._pinned = False
+
+    def invalidate(self):
+        """Force un rechargement au prochain accès."""
+        with self._lock:
+            self._stats = None
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_rule_base(rules_file, symptoms_file, questions_file, index_path=None):
+    """
+    Retourne l'instance unique (par jeu de fichiers) de la base de règles.
+    `index_path` n'est pris en compte qu'à la création de l'instance.
+    """
+    key = (os.path.abspath(rules_file), os.path.abspath(symptoms_file), os.path.abspath(questions_file))
+    base = _instances.get(key)
+    if base is None:
+        with _instances_lock:
+            base = _instances.get(key)
+            if base is None:
+                base = RuleBase(rules_file, symptoms_file, questions_file, index_path)
+                _instances[key] = base
+    return base
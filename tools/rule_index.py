@@ -0,0 +1,383 @@
+"""
+Index binaire de la base de règles, partagé entre processus par `mmap`.
+
+Sous un serveur préforké (N workers), chaque worker parsait sa propre copie de
+`disease_rules.json` : temps de démarrage et mémoire croissaient avec N.
+L'index compile `disease_rules.json` et `symptom_questions.json` en un seul
+fichier binaire que chaque worker projette en lecture seule : les pages sont
+partagées par le système, et le chargement se réduit à relire les tables.
+
+Format (petit-boutiste), en sections alignées sur 8 octets :
+
+    en-tête     MAGIC, version du format, nombres de symptômes / maladies /
+                réponses / questions, taille (mots de 64 bits) des vecteurs,
+                (mtime_ns, taille) des deux fichiers sources, table des sections
+    symptoms    table de chaînes (ordre trié, bit i = symptôme i)
+    diseases    table de chaînes (ordre du fichier de règles)
+    values      table de chaînes ('no', 'yes', ...)
+    frequency   u32 par symptôme : nombre de règles qui le citent
+    rows        par maladie et par réponse : vecteur des symptômes attendus
+    columns     par symptôme et par réponse : vecteur des maladies concernées
+    q_keys      table de chaînes triée (recherche dichotomique)
+    q_texts     table de chaînes (même ordre que q_keys)
+
+Une table de chaînes est un tableau u32 de n + 1 positions suivi des chaînes
+UTF-8 concaténées. L'index est recompilé (écriture atomique) dès que les
+(mtime, taille) enregistrés ne correspondent plus aux fichiers sources.
+
+Le moteur de scoring (`MappedScoringEngine`) lit ses masques directement dans
+la projection : un diagnostic ne lit que les colonnes des réponses données,
+et seuls les noms de symptômes et de maladies sont en mémoire privée. Le
+planificateur de questions, lui, garde ses partitions (un entier par colonne)
+en mémoire privée, construites à la première suggestion.
+
+Compilation manuelle, par exemple avant de lancer les workers :
+    python -m tools.rule_index data/disease_rules.json data/symptom_questions.json data/disease_rules.idx
+"""
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping, Sequence
+
+from .scoring import ScoringEngine, _normalize_value, _popcount, _positions
+
+MAGIC = b"MEDRIDX1"
+FORMAT_VERSION = 1
+SECTIONS = ("symptoms", "diseases", "values", "frequency", "rows", "columns", "q_keys", "q_texts")
+HEADER = struct.Struct(f"<8s6I4q{len(SECTIONS)}Q")
+_U32 = struct.Struct("<I")
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _words(count):
+    return max(1, (count + 63) // 64)
+
+
+def _string_table(strings):
+    blobs = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(blobs)
+
+
+def _vectors(masks, words):
+    size = words * 8
+    return b"".join(mask.to_bytes(size, "little") for mask in masks)
+
+
+def build_rule_index(rules_file, questions_file, index_path):
+    """
+    Compile les fichiers JSON en index binaire (fichier temporaire puis renommage :
+    des workers qui recompilent en même temps produisent le même fichier).
+    """
+    stats = _source_stat(rules_file) + _source_stat(questions_file)
+    with open(rules_file, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    with open(questions_file, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    engine = ScoringEngine(rules)
+    values = sorted({value for row in engine.rows for value in row})
+    symptom_words = _words(len(engine.symptoms))
+    disease_words = _words(len(engine.diseases))
+    symptom_position = {s: i for i, s in enumerate(engine.symptoms)}
+    frequency = [0] * len(engine.symptoms)
+    for (symptom, _), mask in engine.columns.items():
+        frequency[symptom_position[symptom]] += _popcount(mask)
+    question_keys = sorted(questions)
+
+    sections = {
+        "symptoms": _string_table(engine.symptoms),
+        "diseases": _string_table(engine.diseases),
+        "values": _string_table(values),
+        "frequency": struct.pack(f"<{len(frequency)}I", *frequency),
+        "rows": _vectors((row.get(v, 0) for row in engine.rows for v in values), symptom_words),
+        "columns": _vectors((engine.columns.get((s, v), 0) for s in engine.symptoms for v in values), disease_words),
+        "q_keys": _string_table(question_keys),
+        "q_texts": _string_table(str(questions[k]) for k in question_keys),
+    }
+    offsets = []
+    position = HEADER.size
+    body = []
+    for name in SECTIONS:
+        padding = -position % 8
+        body.append(b"\0" * padding)
+        position += padding
+        offsets.append(position)
+        body.append(sections[name])
+        position += len(sections[name])
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(engine.symptoms), len(engine.diseases), len(values),
+                         len(question_keys), symptom_words, *stats, *offsets)
+
+    directory = os.path.dirname(os.path.abspath(index_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(index_path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.writelines(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return index_path
+
+
+class _StringTable:
+    """Table de chaînes lue directement dans la projection mémoire."""
+
+    def __init__(self, buffer, offset, count):
+        self._buffer = buffer
+        self._count = count
+        self._positions = offset
+        self._data = offset + (count + 1) * 4
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        start, = _U32.unpack_from(self._buffer, self._positions + i * 4)
+        end, = _U32.unpack_from(self._buffer, self._positions + (i + 1) * 4)
+        return str(self._buffer[self._data + start:self._data + end], "utf-8")
+
+    def all(self):
+        return tuple(self[i] for i in range(self._count))
+
+
+class IndexedQuestions(Mapping):
+    """{symptôme: question} lu à la demande (recherche dichotomique sur les clés triées)."""
+
+    def __init__(self, keys, texts):
+        self._keys = keys
+        self._texts = texts
+
+    def __getitem__(self, symptom):
+        i = bisect.bisect_left(self._keys, symptom)
+        if i < len(self._keys) and self._keys[i] == symptom:
+            return self._texts[i]
+        raise KeyError(symptom)
+
+    def __iter__(self):
+        return (self._keys[i] for i in range(len(self._keys)))
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class IndexedRules(Mapping):
+    """{maladie: {symptôme: réponse}} décodé à la demande depuis les vecteurs de l'index."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, disease):
+        i = self._index.disease_index.get(disease)
+        if i is None:
+            raise KeyError(disease)
+        symptoms = self._index.symptoms
+        rule = {}
+        for value, mask in self._index.row(i).items():
+            while mask:
+                low = mask & -mask
+                rule[symptoms[low.bit_length() - 1]] = value
+                mask ^= low
+        return rule
+
+    def __iter__(self):
+        return iter(self._index.diseases)
+
+    def __len__(self):
+        return len(self._index.diseases)
+
+
+class IndexedRows(Sequence):
+    """rows[i] = {réponse: masque des symptômes} de la maladie i, lu à la demande."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return self._index.row(i % len(self))
+
+    def __len__(self):
+        return len(self._index.diseases)
+
+
+class IndexedColumns(Mapping):
+    """{(symptôme, réponse): masque des maladies} lu à la demande (colonnes non vides seulement)."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, key):
+        mask = self._index.column(*key)
+        if not mask:
+            raise KeyError(key)
+        return mask
+
+    def __iter__(self):
+        index = self._index
+        for symptom in index.symptoms:
+            for value in index.values:
+                if index.column(symptom, value):
+                    yield (symptom, value)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class MappedScoringEngine(ScoringEngine):
+    """
+    `ScoringEngine` dont les masques restent dans l'index projeté (pages
+    partagées entre workers). Le score est calculé par colonne : pour chaque
+    réponse de la requête, +1 aux maladies qui attendent cette réponse — même
+    résultat que `popcount(règle & requête)` par maladie, sans lire les règles.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.diseases = index.diseases
+        self.symptoms = index.symptoms
+        self.symptom_bits = {s: 1 << i for i, s in enumerate(self.symptoms)}
+        self.disease_index = index.disease_index
+        self.rows = IndexedRows(index)
+        self.columns = IndexedColumns(index)
+        self.all_diseases = (1 << len(self.diseases)) - 1
+
+    def fingerprint(self):
+        """Empreinte des sections de règles de l'index (hors en-tête et questions)."""
+        cached = getattr(self, "_fingerprint", None)
+        if cached is None:
+            cached = self._fingerprint = self.index.content_digest()
+        return cached
+
+    def scores(self, symptoms):
+        scores = [0] * len(self.diseases)
+        known = self.symptom_bits
+        for symptom, answer in (symptoms or {}).items():
+            if symptom in known:
+                for i in _positions(self.index.column(symptom, _normalize_value(answer))):
+                    scores[i] += 1
+        return scores
+
+
+class RuleIndex:
+    """
+    Index projeté en lecture seule. Les vecteurs et les questions restent dans
+    les pages partagées ; seuls les noms de symptômes et de maladies sont
+    matérialisés (ils servent de clés au moteur de scoring).
+
+    Raises:
+        ValueError: fichier tronqué, d'un autre format ou d'une autre version
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"Index de règles tronqué : {path}")
+        fields = HEADER.unpack_from(self._mmap, 0)
+        magic, version, n_symptoms, n_diseases, n_values, n_questions, symptom_words = fields[:7]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Format d'index de règles inconnu : {path}")
+        self.source_stats = fields[7:11]
+        self._offsets = dict(zip(SECTIONS, fields[11:]))
+        self._symptom_bytes = symptom_words * 8
+        self._disease_bytes = _words(n_diseases) * 8
+
+        self.symptoms = _StringTable(self._mmap, self._offsets["symptoms"], n_symptoms).all()
+        self.diseases = _StringTable(self._mmap, self._offsets["diseases"], n_diseases).all()
+        self.values = _StringTable(self._mmap, self._offsets["values"], n_values).all()
+        self.disease_index = {d: i for i, d in enumerate(self.diseases)}
+        self._symptom_position = {s: i for i, s in enumerate(self.symptoms)}
+        self._value_position = {v: i for i, v in enumerate(self.values)}
+        self.questions = IndexedQuestions(
+            _StringTable(self._mmap, self._offsets["q_keys"], n_questions),
+            _StringTable(self._mmap, self._offsets["q_texts"], n_questions))
+        self.rules = IndexedRules(self)
+
+    def is_fresh(self, rules_file, questions_file):
+        try:
+            return self.source_stats == _source_stat(rules_file) + _source_stat(questions_file)
+        except OSError:
+            return False
+
+    def _vector(self, section, i, size):
+        start = self._offsets[section] + i * size
+        return int.from_bytes(self._mmap[start:start + size], "little")
+
+    def row(self, i):
+        """{réponse: masque des symptômes} attendus par la maladie i."""
+        n_values = len(self.values)
+        row = {}
+        for v, value in enumerate(self.values):
+            mask = self._vector("rows", i * n_values + v, self._symptom_bytes)
+            if mask:
+                row[value] = mask
+        return row
+
+    def column(self, symptom, value):
+        """Masque des maladies qui attendent `value` pour `symptom` (0 si aucune)."""
+        s = self._symptom_position.get(symptom)
+        v = self._value_position.get(value)
+        if s is None or v is None:
+            return 0
+        return self._vector("columns", s * len(self.values) + v, self._disease_bytes)
+
+    def content_digest(self):
+        """SHA-1 des sections de règles, identique d'un processus à l'autre (lu sans copie)."""
+        view = memoryview(self._mmap)
+        try:
+            return hashlib.sha1(view[self._offsets["symptoms"]:self._offsets["q_keys"]]).hexdigest()
+        finally:
+            view.release()
+
+    def symptom_frequency(self):
+        count = len(self.symptoms)
+        return dict(zip(self.symptoms, struct.unpack_from(f"<{count}I", self._mmap, self._offsets["frequency"])))
+
+    def scoring_engine(self):
+        """Moteur de scoring qui lit ses masques dans la projection (voir `MappedScoringEngine`)."""
+        return MappedScoringEngine(self)
+
+
+def load_rule_index(index_path, rules_file, questions_file):
+    """
+    Projette l'index, en le recompilant d'abord s'il manque, s'il est illisible
+    ou si les fichiers sources ont changé depuis sa compilation.
+    """
+    try:
+        index = RuleIndex(index_path)
+        if index.is_fresh(rules_file, questions_file):
+            return index
+    except (OSError, ValueError, struct.error):
+        pass
+    build_rule_index(rules_file, questions_file, index_path)
+    return RuleIndex(index_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage : python -m tools.rule_index <disease_rules.json> <symptom_questions.json> <index>")
+        sys.exit(2)
+    print(f"Index écrit : {build_rule_index(*sys.argv[1:])}")
@@ -0,0 +1,30 @@
+"""
+Chemin rapide sans LLM : diagnostic déterministe d'une liste structurée de
+symptômes, en réutilisant exactement les outils de l'agent (`diagnose`,
+`save_patient_interaction`) pour que les deux chemins donnent les mêmes résultats.
+"""
+
+from .diagnosis_tools import diagnose, save_patient_interaction
+
+
+def rule_only_diagnosis(symptoms: dict, patient_id: str = None, top_k: int = 1) -> dict:
+    """
+    Diagnostique directement par le moteur de règles, sans appel au modèle.
+    Args:
+        symptoms (dict): Dictionnaire {symptôme: 'yes'/'no'}
+        patient_id (str): Si fourni, l'interaction est sauvegardée dans son historique
+        top_k (int): Nombre de maladies candidates à classer
+    Returns:
+        dict: même format que `diagnose` (+ saved si l'interaction a été enregistrée)
+    """
+    result = diagnose(symptoms, top_k=top_k)
+    if patient_id:
+        interaction = {
+            "source": "rule_only",
+            "symptoms": symptoms,
+            "diagnosis": result.get("diagnosis"),
+            "score": result.get("score"),
+        }
+        saved = save_patient_interaction(patient_id, interaction)
+        result["saved"] = saved["status"] == "success"
+    return result
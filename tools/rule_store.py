@@ -0,0 +1,153 @@
+"""
+Écritures de la base de règles : copie sur écriture, publication atomique,
+écritures disque regroupées.
+
+Les lecteurs (`diagnose`, `suggest_questions`…) lisent un `RuleBaseSnapshot`
+immuable, sans verrou. Une modification construit de nouveaux dictionnaires
+à partir de la version courante (les anciens ne sont jamais modifiés), puis
+publie immédiatement une nouvelle version en mémoire. Les fichiers JSON
+touchés sont réécrits un peu plus tard (`flush_delay`), en une seule fois
+pour une rafale de modifications, via fichier temporaire + `os.replace` :
+un lecteur (y compris d'un autre processus) voit l'ancien fichier ou le
+nouveau, jamais un fichier à moitié écrit.
+
+Pendant qu'une écriture est en attente, la base ne va pas relire les fichiers
+sur disque (voir `RuleBase.publish`) : la version publiée fait foi.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+
+from .rule_base import get_rule_base
+
+
+def atomic_write_json(path, data):
+    """Écrit `data` dans un fichier temporaire du même dossier, puis le renomme sur `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RuleStore:
+    """
+    Point d'entrée unique des écritures sur une `RuleBase`.
+
+    Args:
+        rule_base (RuleBase): base à modifier
+        flush_delay (float): délai (s) de regroupement des écritures disque
+    """
+
+    def __init__(self, rule_base, flush_delay=0.5):
+        self.rule_base = rule_base
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._dirty = set()
+        self._timer = None
+        self.updates = 0
+        self.flushes = 0
+        atexit.register(self.flush)
+
+    def snapshot(self):
+        return self.rule_base.snapshot()
+
+    def update(self, rules=None, disease_symptoms=None, questions=None, add_to_all_rules=None):
+        """
+        Publie une nouvelle version de la base.
+
+        Args:
+            rules (dict): {maladie: règle} à ajouter ou remplacer
+            disease_symptoms (dict): {maladie: [symptômes]} à ajouter ou remplacer
+            questions (dict): {symptôme: question} à ajouter ou remplacer
+            add_to_all_rules (dict): {symptôme: réponse par défaut} ajouté aux
+                règles qui ne citent pas encore ce symptôme (sans écraser)
+        Returns:
+            RuleBaseSnapshot: la version publiée
+        """
+        with self._lock:
+            current = self.rule_base.snapshot()
+            new_rules = current.rules
+            if rules or add_to_all_rules:
+                new_rules = dict(current.rules)
+                new_rules.update(rules or {})
+                for disease, rule in new_rules.items():
+                    missing = {s: v for s, v in (add_to_all_rules or {}).items() if s not in rule}
+                    if missing:
+                        new_rules[disease] = {**rule, **missing}
+                self._dirty.add(0)
+            new_disease_symptoms = current.disease_symptoms
+            if disease_symptoms:
+                new_disease_symptoms = {**current.disease_symptoms, **disease_symptoms}
+                self._dirty.add(1)
+            new_questions = current.questions
+            if questions:
+                new_questions = {**current.questions, **questions}
+                self._dirty.add(2)
+            snapshot = self.rule_base.publish(new_rules, new_disease_symptoms, new_questions)
+            self.updates += 1
+            self._schedule_flush()
+            return snapshot
+
+    def add_rule(self, disease, rule):
+        """Ajoute une règle si la maladie n'existe pas encore. Returns: bool"""
+        with self._lock:
+            if disease in self.rule_base.snapshot().rules:
+                return False
+            self.update(rules={disease: rule})
+            return True
+
+    def _schedule_flush(self):
+        # Un seul minuteur par rafale : la première modification fixe l'échéance
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Écrit sur disque les fichiers modifiés depuis la dernière écriture."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            snapshot = self.rule_base.snapshot()
+            contents = (snapshot.rules, snapshot.disease_symptoms, snapshot.questions)
+            try:
+                for index in sorted(self._dirty):
+                    atomic_write_json(self.rule_base.paths[index], contents[index])
+            except OSError as e:
+                print(f"ERREUR lors de l'écriture de la base de règles: {str(e)}")
+                self._schedule_flush()
+                return
+            self._dirty.clear()
+            self.rule_base.written(snapshot)
+            self.flushes += 1
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_rule_store(rules_file, symptoms_file, questions_file, flush_delay=0.5, index_path=None):
+    """Retourne le `RuleStore` unique associé à la base de règles de ces fichiers."""
+    base = get_rule_base(rules_file, symptoms_file, questions_file, index_path)
+    with _stores_lock:
+        store = _stores.get(id(base))
+        if store is None:
+            store = RuleStore(base, flush_delay)
+            _stores[id(base)] = store
+    return store
@@ -0,0 +1,139 @@
+"""
+Moteur de scoring par masques de bits.
+
+Chaque règle est encodée, pour chaque réponse possible ('yes', 'no', ...), en
+un entier dont le bit i vaut 1 si la règle attend cette réponse pour le
+symptôme i. Un dictionnaire de symptômes est encodé de la même façon ; le
+score d'une maladie est alors un simple `popcount(règle & requête)` par
+réponse, au lieu d'une boucle Python sur chaque clé avec `lower()`.
+
+Le moteur tient aussi les masques « colonne » (pour un symptôme et une
+réponse, l'ensemble des maladies concernées), utilisés pour élaguer les
+candidats sans repasser par les règles.
+"""
+
+import hashlib
+import heapq
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(x):
+        return bin(x).count("1")
+
+
+def _normalize_value(value):
+    return str(value).lower()
+
+
+def _positions(mask):
+    """Indices des bits à 1 (balayage de la représentation binaire, en C)."""
+    digits = bin(mask)[:1:-1]
+    i = digits.find("1")
+    while i >= 0:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+class ScoringEngine:
+    """
+    Base de règles compilée en masques de bits.
+
+    Args:
+        rules (dict): {maladie: {symptôme: 'yes'/'no'}}
+    """
+
+    def __init__(self, rules):
+        self.diseases = tuple(rules)
+        self.symptoms = tuple(sorted({s for rule in rules.values() for s in rule}))
+        self.symptom_bits = {s: 1 << i for i, s in enumerate(self.symptoms)}
+        self.disease_index = {d: i for i, d in enumerate(self.diseases)}
+        # rows[i] = {réponse: masque des symptômes} pour la maladie i
+        rows = []
+        # columns[(symptôme, réponse)] = masque des maladies
+        columns = {}
+        for i, disease in enumerate(self.diseases):
+            row = {}
+            for symptom, expected in rules[disease].items():
+                value = _normalize_value(expected)
+                row[value] = row.get(value, 0) | self.symptom_bits[symptom]
+                key = (symptom, value)
+                columns[key] = columns.get(key, 0) | (1 << i)
+            rows.append(row)
+        self.rows = tuple(rows)
+        self.columns = columns
+        self.all_diseases = (1 << len(self.diseases)) - 1
+
+    def fingerprint(self):
+        """Empreinte du contenu des règles, stable d'un processus à l'autre (calculée une fois)."""
+        cached = getattr(self, "_fingerprint", None)
+        if cached is None:
+            content = repr((self.diseases, self.symptoms, [sorted(row.items()) for row in self.rows]))
+            cached = self._fingerprint = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        return cached
+
+    def encode(self, symptoms):
+        """Encode {symptôme: réponse} en {réponse: masque}, en ignorant les symptômes inconnus."""
+        query = {}
+        bits = self.symptom_bits
+        for symptom, answer in (symptoms or {}).items():
+            bit = bits.get(symptom)
+            if bit is None:
+                continue
+            value = _normalize_value(answer)
+            query[value] = query.get(value, 0) | bit
+        return query
+
+    def scores(self, symptoms):
+        """Retourne la liste des scores, dans l'ordre de `self.diseases`."""
+        query = self.encode(symptoms)
+        if not query:
+            return [0] * len(self.rows)
+        items = tuple(query.items())
+        return [
+            sum(_popcount(row.get(value, 0) & mask) for value, mask in items)
+            for row in self.rows
+        ]
+
+    def best(self, symptoms):
+        """
+        Meilleure maladie, comme l'ancienne boucle : à égalité, la première
+        dans l'ordre du fichier l'emporte.
+
+        Returns:
+            tuple: (maladie ou None, score)
+        """
+        return self.best_of(self.scores(symptoms))
+
+    def best_of(self, scores):
+        """`best` à partir d'une liste de scores déjà calculée (ordre de `self.diseases`)."""
+        best_match = None
+        max_score = -1
+        for disease, score in zip(self.diseases, scores):
+            if score > max_score:
+                max_score = score
+                best_match = disease
+        return best_match, max_score
+
+    def rank(self, symptoms, top_k=5):
+        """
+        Classe les maladies par score décroissant (ordre du fichier à égalité).
+
+        Returns:
+            list: [{"disease", "score", "margin"}] où margin est l'écart avec
+            la maladie suivante du classement.
+        """
+        return self.rank_of(self.scores(symptoms), top_k)
+
+    def rank_of(self, scores, top_k=5):
+        """`rank` à partir d'une liste de scores déjà calculée (ordre de `self.diseases`)."""
+        order = heapq.nlargest(top_k + 1, range(len(scores)), key=scores.__getitem__)
+        ranked = []
+        for pos, i in enumerate(order[:top_k]):
+            next_score = scores[order[pos + 1]] if pos + 1 < len(order) else 0
+            ranked.append({
+                "disease": self.diseases[i],
+                "score": scores[i],
+                "margin": scores[i] - next_score
+            })
+        return ranked
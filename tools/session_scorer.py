@@ -0,0 +1,139 @@
+"""
+État de diagnostic incrémental d'une consultation, gardé dans `tool_context.state`.
+
+Au fil d'une consultation, chaque appel à `diagnose` ou `suggest_questions`
+reçoit le même dictionnaire de réponses, augmenté d'une ou deux réponses.
+Plutôt que de rescorer toute la base, on garde dans l'état de la session :
+
+    answers     réponses prises en compte {symptôme: réponse}
+    remaining   masque (hexadécimal) des maladies jamais contredites
+    rules       empreinte de la base de règles (`ScoringEngine.fingerprint`)
+    session     identifiant aléatoire de l'état, clé du cache des scores
+
+Les deux tableaux de len(maladies) entiers (score courant et nombre de
+réponses contradictoires de chaque maladie) ne sont pas stockés dans l'état,
+qui est recopié dans chaque événement persisté : ils restent dans un cache
+borné du processus, indexé par (session, empreinte des règles), et sont
+reconstruits à partir de `answers` s'ils manquent (redémarrage, autre worker,
+éviction) ou ne correspondent plus aux réponses de l'état.
+
+Un appel ne traite que les symptômes dont la réponse a changé (ajout,
+modification ou retrait) : pour chacun, seules les colonnes concernées
+(maladies qui attendent cette réponse, maladies qu'elle contredit) sont mises
+à jour, en O(symptômes modifiés × maladies). Les scores obtenus sont
+identiques à `ScoringEngine.scores` sur le dictionnaire complet.
+
+L'état est reconstruit de zéro si la base de règles a changé. La clé n'a pas
+le préfixe `temp:` et ne contient que des types JSON : elle est conservée avec
+la session.
+"""
+
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+
+from .scoring import _positions
+
+STATE_KEY = "diagnosis_state"
+# Sessions dont les scores restent en mémoire (2 × 4 octets par maladie et par session)
+SCORES_CACHE_SIZE = 256
+
+
+class _ScoresCache:
+    """LRU borné {(session, empreinte des règles): (réponses, scores, contradictions)}."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_SCORES = _ScoresCache(SCORES_CACHE_SIZE)
+
+
+def _mask(indices, size):
+    buffer = bytearray((size + 7) // 8)
+    for i in indices:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def session_scores(state, base, answers):
+    """
+    Met à jour l'état de la session pour les réponses `answers` (déjà normalisées).
+
+    Args:
+        state: `tool_context.state` (ou tout dictionnaire)
+        base (RuleBaseSnapshot): version courante de la base de règles
+        answers (dict): réponses complètes connues {symptôme: réponse}
+    Returns:
+        tuple: (scores par maladie, masque des maladies non contredites)
+    """
+    engine = base.scoring_engine()
+    planner = base.question_planner()
+    known = engine.symptom_bits
+    fingerprint = engine.fingerprint()
+    size = len(engine.diseases)
+    target = {s: str(v).lower() for s, v in (answers or {}).items() if s in known}
+
+    previous = state.get(STATE_KEY)
+    if not isinstance(previous, dict) or previous.get("rules") != fingerprint or "session" not in previous:
+        previous = None
+    session = previous["session"] if previous else uuid.uuid4().hex
+    cached = _SCORES.get((session, fingerprint))
+    if previous is not None and cached is not None and cached[0] == previous["answers"]:
+        seen, scores, mismatches = cached
+        remaining = int(previous["remaining"], 16)
+    else:
+        # Scores absents de ce processus : reconstruits à partir de zéro, avec les mêmes mises à jour
+        seen, scores, mismatches = {}, array("i", [0]) * size, array("i", [0]) * size
+        remaining = engine.all_diseases
+    changes = [(s, seen.get(s), target.get(s)) for s in set(seen) | set(target) if seen.get(s) != target.get(s)]
+    if not changes:
+        return scores, remaining
+
+    scores = array("i", scores)
+    mismatches = array("i", mismatches)
+    touched = set()
+    for symptom, old, new in changes:
+        for value, delta in ((old, -1), (new, 1)):
+            if value is None:
+                continue
+            for i in _positions(engine.columns.get((symptom, value), 0)):
+                scores[i] += delta
+            contradicted = list(_positions(planner.contradicted(symptom, value)))
+            for i in contradicted:
+                mismatches[i] += delta
+            touched.update(contradicted)
+
+    if touched:
+        remaining &= ~_mask(touched, size)
+        remaining |= _mask((i for i in touched if mismatches[i] == 0), size)
+    _SCORES.put((session, fingerprint), (dict(target), scores, mismatches))
+    if previous is None or previous["answers"] != target:
+        state[STATE_KEY] = {
+            "rules": fingerprint,
+            "session": session,
+            "answers": target,
+            "remaining": format(remaining, "x")
+        }
+    return scores, remaining
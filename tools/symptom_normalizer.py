@@ -0,0 +1,204 @@
+"""
+Normalisation des symptômes et des réponses avant le scoring.
+
+Les règles utilisent des clés anglaises (`cough`, `fever`) et des réponses
+`yes`/`no`, alors que le patient (et donc le modèle) parle français :
+`{"toux": "oui"}` doit donner `{"cough": "yes"}` sans tour de modèle
+supplémentaire pour reformater l'appel.
+
+L'index est précalculé une fois par version de la base de règles :
+- formes exactes, sans accents ni mots vides : clés des règles
+  (`sore_throat` -> `sore throat`), synonymes de `symptom_synonyms.json`,
+  et mots-clés tirés des questions (« Avez-vous de la toux ? » -> `toux`) ;
+- trigrammes de caractères de ces formes, pour les fautes de frappe et les
+  variantes proches (`fievr`, `douleur poitrine`), retenues au-delà d'un seuil
+  de similarité (coefficient de Dice).
+
+Une résolution coûte quelques microsecondes (dictionnaire, puis cache des noms
+déjà vus) ; aucun appel au modèle.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+YES_VALUES = frozenset(("yes", "y", "oui", "o", "true", "vrai", "1", "present", "presente", "positif", "positive"))
+NO_VALUES = frozenset(("no", "n", "non", "false", "faux", "0", "absent", "absente", "negatif", "negative"))
+
+STOPWORDS = frozenset((
+    "a", "ai", "au", "aux", "avez", "avoir", "d", "de", "des", "du", "en", "est", "et", "etes", "eu", "j", "je",
+    "l", "la", "le", "les", "ma", "me", "mes", "mon", "ou", "ressenti", "sentez", "un", "une", "vous",
+    "oui", "non", "an", "have", "i", "my", "of", "the"
+))
+
+# Écart minimal de similarité entre les deux meilleurs symptômes d'une correspondance approchée
+AMBIGUITY_MARGIN = 0.1
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_ANSWER_HINT = re.compile(r"\(\s*oui\s*/\s*non\s*\)", re.IGNORECASE)
+
+
+def fold(text):
+    """Minuscules, sans accents."""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def content_form(text):
+    """Forme de comparaison : mots sans accents, sans mots vides (`Mal à la gorge` -> `mal gorge`)."""
+    tokens = _TOKEN.findall(fold(text))
+    kept = [t for t in tokens if t not in STOPWORDS]
+    return " ".join(kept or tokens)
+
+
+def _trigrams(form):
+    padded = f" {form} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def normalize_answer(value):
+    """oui/non/yes/no/true/false/1/0 (et booléens) -> 'yes'/'no' ; sinon la valeur en minuscules."""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    folded = fold(value).strip()
+    if folded in YES_VALUES:
+        return "yes"
+    if folded in NO_VALUES:
+        return "no"
+    return str(value).lower()
+
+
+class SymptomNormalizer:
+    """
+    Args:
+        symptoms (iterable): clés connues (règles et questions)
+        questions (dict): {symptôme: question}
+        synonyms (dict): {symptôme: [synonymes]}
+        threshold (float): similarité minimale (Dice sur trigrammes) d'une correspondance approchée
+        cache_size (int): nombre de noms résolus gardés en cache
+    """
+
+    def __init__(self, symptoms, questions=None, synonyms=None, threshold=0.6, cache_size=4096):
+        self.symptoms = frozenset(symptoms)
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._cache = {}
+        # Priorité : clés, puis synonymes, puis mots-clés des questions
+        self._exact = {}
+        for symptom in sorted(self.symptoms):
+            self._exact.setdefault(content_form(symptom), symptom)
+        for symptom, names in (synonyms or {}).items():
+            if symptom in self.symptoms:
+                for name in names:
+                    self._exact.setdefault(content_form(name), symptom)
+        for symptom, question in (questions or {}).items():
+            if symptom in self.symptoms:
+                phrase = _ANSWER_HINT.sub(" ", str(question))
+                for part in re.split(r"[?/]", phrase):
+                    if part.strip():
+                        self._exact.setdefault(content_form(part), symptom)
+        self._exact.pop("", None)
+
+        self._forms = list(self._exact)
+        self._form_trigrams = [len(_trigrams(form)) for form in self._forms]
+        self._postings = defaultdict(list)
+        for i, form in enumerate(self._forms):
+            for gram in _trigrams(form):
+                self._postings[gram].append(i)
+
+    def resolve_exact(self, name):
+        """Comme `resolve`, sans correspondance approchée (clé, synonyme ou mot-clé exact), ou None."""
+        if name in self.symptoms:
+            return name
+        return self._exact.get(content_form(name))
+
+    def resolve(self, name):
+        """Clé de règle correspondant à `name`, ou None."""
+        if name in self.symptoms:
+            return name
+        cached = self._cache.get(name, self)
+        if cached is not self:
+            return cached
+        form = content_form(name)
+        symptom = self._exact.get(form)
+        if symptom is None and form:
+            symptom = self._fuzzy(form)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[name] = symptom
+        return symptom
+
+    def _fuzzy(self, form):
+        grams = _trigrams(form)
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in self._postings.get(gram, ()):
+                shared[i] += 1
+        best = {}
+        for i, count in shared.items():
+            score = 2 * count / (len(grams) + self._form_trigrams[i])
+            symptom = self._exact[self._forms[i]]
+            if score > best.get(symptom, 0):
+                best[symptom] = score
+        ranked = sorted(best.values(), reverse=True)
+        if not ranked or ranked[0] < self.threshold:
+            return None
+        if len(ranked) > 1 and ranked[0] - ranked[1] < AMBIGUITY_MARGIN:
+            # Ambigu (« mal » : mal de dos, de tête, de gorge…) : mieux vaut ne rien deviner
+            return None
+        return max(best, key=best.get)
+
+    def normalize(self, symptoms):
+        """
+        Returns:
+            tuple: ({clé: 'yes'/'no'/...}, [noms non reconnus, conservés tels quels])
+        """
+        normalized = {}
+        unrecognized = []
+        for name, answer in (symptoms or {}).items():
+            symptom = self.resolve(name)
+            if symptom is None:
+                unrecognized.append(name)
+                symptom = name
+            normalized[symptom] = normalize_answer(answer)
+        return normalized, unrecognized
+
+
+def load_synonyms(path):
+    """Fichier de synonymes optionnel : {} s'il est absent ou invalide."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"ERREUR lors du chargement de {path}: {str(e)}")
+        return {}
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def get_normalizer(snapshot, synonyms_file=None, threshold=0.6):
+    """Normaliseur de la version `snapshot` de la base de règles (reconstruit si elle ou les synonymes changent)."""
+    global _current
+    try:
+        st = os.stat(synonyms_file) if synonyms_file else None
+        synonyms_stat = (st.st_mtime_ns, st.st_size) if st else None
+    except OSError:
+        synonyms_stat = None
+    key = (snapshot, synonyms_file, synonyms_stat, threshold)
+    current = _current
+    if current is not None and current[0] == key:
+        return current[1]
+    with _current_lock:
+        if _current is None or _current[0] != key:
+            vocabulary = set(snapshot.symptoms)
+            vocabulary.update(snapshot.questions)
+            normalizer = SymptomNormalizer(vocabulary, snapshot.questions, load_synonyms(synonyms_file), threshold)
+            _current = (key, normalizer)
+        return _current[1]
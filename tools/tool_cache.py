@@ -0,0 +1,132 @@
+"""
+Mémoïsation des outils en lecture seule (`diagnose`, `list_symptoms`,
+`suggest_questions`).
+
+La clé de cache est une forme canonique des arguments : dictionnaires triés
+par clé, réponses en minuscules (`{"fever": "Oui", "cough": "no"}` et
+`{"cough": "No", "fever": "oui"}` partagent la même entrée) ; `tool_context`
+est ignoré. Un outil qui met à jour l'état de la session (`diagnose`,
+`suggest_questions` avec `tool_context`) ne passe pas par le cache : seul son
+calcul pur, sans contexte, est mémoïsé.
+
+Le cache est borné en taille (LRU) et vidé dès que la version de la base de
+règles change. Il ne contient donc que ce qui dérive des règles : les textes
+(descriptions, traitements) sont ajoutés après coup depuis les `TextStore`,
+qui suivent leurs propres fichiers. Les résultats sont copiés en sortie pour
+qu'un appelant ne puisse pas altérer une entrée partagée.
+
+Les fonctions mémoïsées sont des fonctions internes (`_cached_*`) : les
+outils exposés à l'agent restent des fonctions simples qui leur délèguent,
+car ADK décrit un outil au modèle à partir de son propre code et de sa
+docstring, qu'un wrapper ne transmet pas.
+"""
+
+import copy
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+IGNORED_ARGS = ("tool_context",)
+
+
+def _canonical(value, nested=False):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _canonical(v, True)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical(v, nested) for v in value)
+    if nested and isinstance(value, str):
+        return value.lower()
+    return value
+
+
+class ToolCache:
+    """
+    Args:
+        maxsize (int): nombre maximal d'entrées
+        version_fn (callable): retourne la version courante des données ;
+            tout changement vide le cache
+    """
+
+    def __init__(self, maxsize=4096, version_fn=None):
+        self.maxsize = maxsize
+        self.version_fn = version_fn
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._version = version
+
+    def get(self, key):
+        self._check_version()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "invalidations": self.invalidations
+            }
+
+    def memoize(self, func):
+        """
+        Décorateur de mémoïsation. Le wrapper n'est pas un outil ADK valide
+        (sa déclaration serait construite sans description) : l'appeler depuis
+        un outil, ne pas l'exposer directement.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__name__,) + tuple(
+                (name, _canonical(value)) for name, value in bound.arguments.items()
+                if name not in IGNORED_ARGS
+            )
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            found, value = self.get(key)
+            if not found:
+                value = func(*args, **kwargs)
+                self.put(key, value)
+            return copy.deepcopy(value)
+
+        return wrapper
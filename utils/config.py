@@ -0,0 +1,33 @@
+"""
+Configuration applicative partagée : `config/app_config.json` (ou le chemin
+donné par `APP_CONFIG_PATH`) n'est lu qu'une fois par processus, quel que soit
+le nombre de modules qui la demandent.
+"""
+
+import functools
+import json
+import os
+
+DEFAULT_APP_CONFIG_PATH = "config/app_config.json"
+
+
+def load_json_config(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def app_config_path():
+    return os.environ.get("APP_CONFIG_PATH", DEFAULT_APP_CONFIG_PATH)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_config(path):
+    return load_json_config(path)
+
+
+def get_app_config(path=None):
+    """
+    Retourne la configuration applicative (lue au premier appel, puis mise en
+    cache). Le dictionnaire est partagé : ne pas le modifier.
+    """
+    return _cached_config(os.path.abspath(path or app_config_path()))
@@ -0,0 +1,152 @@
+"""
+Configuration du logging commune aux points d'entrée (`main.py`,
+`api_server.py`/`asgi_server.py` via `services/runtime.py`, `file_interface.py`).
+
+`setup_logging(path)` applique le fichier dictConfig tel quel, puis, si la
+section `"queue"` est présente, déplace les handlers du logger racine
+derrière une file : les threads de requête ne font que déposer les
+enregistrements, un thread d'arrière-plan (`QueueListener`) les écrit.
+La file est bornée ; quand elle est pleine, les enregistrements sont
+abandonnés et comptés plutôt que de bloquer la requête.
+
+    "queue": {"maxsize": 10000}
+
+Le fichier de log tourne par taille (`CompressingRotatingFileHandler`) ou
+par date (`CompressingTimedRotatingFileHandler`), les anciens fichiers étant
+compressés en gzip. `JsonFormatter` produit une ligne JSON par
+enregistrement, avec `session_id`, `user_id` et `latency_ms` s'ils sont
+passés via `extra=`.
+"""
+
+import atexit
+import datetime
+import gzip
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+
+STRUCTURED_FIELDS = ("session_id", "user_id", "latency_ms")
+
+_listener = None
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotation par taille (`maxBytes`), archives compressées en .gz."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = _gzip_namer
+        self.rotator = _gzip_rotator
+
+
+class CompressingTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Rotation par date (`when`, `interval`), archives compressées en .gz."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = _gzip_namer
+        self.rotator = _gzip_rotator
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement (champs structurés inclus si fournis)."""
+
+    def format(self, record):
+        payload = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def log_context(session_id, user_id, started=None):
+    """Champs `extra=` d'un tour ; `started` = `time.perf_counter()` au début du tour."""
+    context = {"session_id": session_id, "user_id": user_id}
+    if started is not None:
+        context["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return context
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler qui n'attend jamais : file pleine = enregistrement abandonné."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _ensure_log_dirs(config):
+    for handler in config.get("handlers", {}).values():
+        filename = handler.get("filename")
+        if filename and os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+
+def stop_logging():
+    """Vide la file et arrête le thread d'écriture (appelé aussi à la sortie)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(path):
+    """
+    Applique le fichier de configuration `path` (format dictConfig + section
+    optionnelle `"queue"`).
+
+    Returns:
+        DroppingQueueHandler ou None si la configuration n'utilise pas de file
+    """
+    global _listener
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    queue_config = config.pop("queue", None)
+    _ensure_log_dirs(config)
+
+    stop_logging()
+    logging.config.dictConfig(config)
+    if queue_config is None:
+        return None
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_config.get("maxsize", 10000)))
+    root.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+atexit.register(stop_logging)
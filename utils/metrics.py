@@ -0,0 +1,292 @@
+"""
+Métriques applicatives au format texte Prometheus (servi par `/api/metrics`).
+
+Implémentation minimale, sans dépendance : compteurs, jauges et histogrammes
+à libellés, protégés chacun par un verrou. Un appel d'outil ou un tour
+d'agent coûte deux `perf_counter()` et quelques incréments, ce qui permet de
+laisser l'instrumentation active en production.
+
+- `track_tool(name)` : durée, nombre d'appels et d'erreurs par outil
+  (exception levée ou résultat `{"status": "error"}`) ; utilisé par
+  `InstrumentedTool` (agents/medical_agent.py), qui laisse les fonctions
+  outils intactes.
+- `track_turn(interface)` : durée d'un tour d'agent, événements ADK par tour,
+  tours en cours, issue du tour.
+- `ACTIVE_SESSIONS` : jauge lue au moment de l'export (`set_function`).
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value != value:
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _CounterChild
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ("function",)
+
+    def __init__(self):
+        super().__init__()
+        self.function = None
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """La valeur est lue en appelant `function()` à chaque export."""
+        self.function = function
+
+    def render(self, name, labelnames, key):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                value = math.nan
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_child = _GaugeChild
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            le = _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        """Export de toutes les métriques au format texte Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_CALLS = Counter("medical_tool_calls_total", "Appels d'outils de l'agent", ("tool",))
+TOOL_ERRORS = Counter("medical_tool_errors_total", "Appels d'outils en erreur (exception ou status=error)", ("tool",))
+TOOL_LATENCY = Histogram("medical_tool_duration_seconds", "Durée des appels d'outils", ("tool",))
+TURNS = Counter("medical_turns_total", "Tours d'agent terminés", ("interface", "status"))
+TURN_LATENCY = Histogram("medical_turn_duration_seconds", "Durée d'un tour d'agent (modèle + outils)", ("interface",))
+TURN_EVENTS = Histogram("medical_turn_events", "Événements ADK par tour d'agent", ("interface",),
+                        buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+TURNS_IN_FLIGHT = Gauge("medical_turns_in_flight", "Tours d'agent en cours", ("interface",))
+ACTIVE_SESSIONS = Gauge("medical_active_sessions", "Sessions actives suivies")
+
+
+def tool_metrics(name):
+    """(appels, erreurs, durée) de l'outil `name` ; crée les séries à zéro dès l'enregistrement."""
+    return TOOL_CALLS.labels(name), TOOL_ERRORS.labels(name), TOOL_LATENCY.labels(name)
+
+
+class _ToolCall:
+    __slots__ = ("result",)
+
+    def __init__(self):
+        self.result = None
+
+
+@contextmanager
+def track_tool(name):
+    """
+    Mesure un appel d'outil :
+
+        with track_tool("diagnose") as call:
+            call.result = func(**args)
+    """
+    calls, errors, latency = tool_metrics(name)
+    call = _ToolCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        errors.inc()
+        raise
+    finally:
+        calls.inc()
+        latency.observe(time.perf_counter() - start)
+    if isinstance(call.result, dict) and call.result.get("status") == "error":
+        errors.inc()
+
+
+class _Turn:
+    __slots__ = ("events", "status")
+
+    def __init__(self):
+        self.events = 0
+        self.status = "success"
+
+    def event(self, event=None):
+        self.events += 1
+
+
+@contextmanager
+def track_turn(interface):
+    """
+    Mesure un tour d'agent :
+
+        with track_turn("api") as turn:
+            for event in RUNNER.run(...):
+                turn.event(event)
+    """
+    in_flight = TURNS_IN_FLIGHT.labels(interface)
+    in_flight.inc()
+    turn = _Turn()
+    start = time.perf_counter()
+    try:
+        yield turn
+    except BaseException:
+        turn.status = "error"
+        raise
+    finally:
+        in_flight.dec()
+        TURN_LATENCY.labels(interface).observe(time.perf_counter() - start)
+        TURN_EVENTS.labels(interface).observe(turn.events)
+        TURNS.labels(interface, turn.status).inc()
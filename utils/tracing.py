@@ -0,0 +1,237 @@
+"""
+Traçage par tour d'agent (désactivé par défaut : `"tracing_enabled": true`
+dans `config/app_config.json`, ou variable d'environnement `MEDICAL_TRACING=1`).
+
+Pour chaque tour, une chronologie de spans est reconstruite à partir des
+événements ADK, horodatés à leur réception par la boucle du runner
+(`event.timestamp` est fixé par ADK avant l'appel au modèle et repris par
+tous les fragments : il ne mesure pas la latence du modèle) :
+- `model` : de l'envoi de la requête au modèle (début du tour, ou retour du
+  dernier outil) jusqu'à sa réponse, avec le délai du premier fragment en flux ;
+- `tool:<nom>` : de l'appel de fonction à sa réponse, avec la taille des
+  arguments et du résultat ;
+- spans explicites (`trace.span(...)`) autour de la sanitization et du logging.
+
+Les derniers tours sont gardés dans un tampon circulaire borné
+(`trace_buffer_size`), consultable via `/api/debug/trace/<session_id>` et
+exportable au format Chrome trace-event (chrome://tracing, Perfetto).
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from utils.config import get_app_config
+
+
+def _size(value):
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class TurnTrace:
+    """Chronologie d'un tour ; alimentée par `event()` et `span()`, close par `finish()`."""
+
+    def __init__(self, store, trace_id, session_id, user_id, interface):
+        self._store = store
+        self.trace_id = trace_id
+        self.session_id = session_id
+        self.user_id = user_id
+        self.interface = interface
+        self.start = time.time()
+        self.end = None
+        self.error = None
+        self.events = 0
+        self.spans = []
+        self._model_start = self.start
+        self._first_chunk = None
+        self._pending_calls = {}
+
+    def _add(self, name, category, start, end, **args):
+        self.spans.append({
+            "name": name,
+            "cat": category,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round(max(end - start, 0) * 1000, 3),
+            "args": args
+        })
+
+    def event(self, event):
+        """Intègre un événement ADK à la chronologie (à appeler dès sa réception)."""
+        now = time.time()
+        self.events += 1
+        parts = event.content.parts if event.content and event.content.parts else []
+        calls = [p.function_call for p in parts if p.function_call]
+        responses = [p.function_response for p in parts if p.function_response]
+
+        if responses:
+            for response in responses:
+                key = response.id or response.name
+                started, name, args_size = self._pending_calls.pop(key, (now, response.name, 0))
+                result = response.response or {}
+                self._add(f"tool:{name}", "tool", started, now, args_bytes=args_size,
+                          response_bytes=_size(result), status=result.get("status"))
+            # Les réponses des outils repartent vers le modèle
+            self._model_start = now
+            self._first_chunk = None
+            return
+
+        if getattr(event, "partial", False):
+            if self._first_chunk is None:
+                self._first_chunk = now
+            return
+
+        if self._model_start is not None and event.author != "user":
+            args = {"function_calls": [c.name for c in calls]}
+            if self._first_chunk is not None:
+                args["first_chunk_ms"] = round((self._first_chunk - self._model_start) * 1000, 3)
+            self._add("model", "llm", self._model_start, now, **args)
+            self._model_start = None
+            self._first_chunk = None
+        for call in calls:
+            self._pending_calls[call.id or call.name] = (now, call.name, _size(call.args or {}))
+
+    @contextmanager
+    def span(self, name, category="app", **args):
+        started = time.time()
+        try:
+            yield
+        finally:
+            self._add(name, category, started, time.time(), **args)
+
+    def set_error(self, message):
+        self.error = str(message)
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.time()
+            self._store.add(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "interface": self.interface,
+            "start": self.start,
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 3),
+            "events": self.events,
+            "error": self.error,
+            "spans": list(self.spans)
+        }
+
+
+class _NullTrace:
+    """Traçage désactivé : mêmes méthodes, sans effet."""
+
+    def event(self, event):
+        pass
+
+    def span(self, name, category="app", **args):
+        return nullcontext()
+
+    def set_error(self, message):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class TraceStore:
+    """
+    Tampon circulaire des derniers tours tracés (tous sessions confondues).
+
+    Args:
+        maxlen (int): nombre de tours conservés
+    """
+
+    def __init__(self, maxlen=200):
+        self._traces = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def start(self, session_id, user_id=None, interface="api"):
+        return TurnTrace(self, next(self._ids), session_id, user_id, interface)
+
+    def add(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def for_session(self, session_id):
+        with self._lock:
+            return [t.to_dict() for t in self._traces if t.session_id == session_id]
+
+
+def to_chrome_trace(traces):
+    """Export au format Chrome trace-event (un fil par tour)."""
+    events = []
+    for tid, trace in enumerate(traces, start=1):
+        base_us = trace["start"] * 1e6
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                       "args": {"name": f"{trace['interface']} tour {trace['trace_id']}"}})
+        events.append({"name": "turn", "cat": "turn", "ph": "X", "pid": 1, "tid": tid,
+                       "ts": base_us, "dur": trace["duration_ms"] * 1000,
+                       "args": {"session_id": trace["session_id"], "events": trace["events"],
+                                "error": trace["error"]}})
+        for span in trace["spans"]:
+            events.append({"name": span["name"], "cat": span["cat"], "ph": "X", "pid": 1, "tid": tid,
+                           "ts": base_us + span["start_ms"] * 1000, "dur": span["duration_ms"] * 1000,
+                           "args": span["args"]})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def tracing_enabled():
+    flag = os.environ.get("MEDICAL_TRACING")
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes", "on")
+    return bool(get_app_config().get("tracing_enabled", False))
+
+
+def trace_store():
+    """Tampon partagé par le processus (None si le traçage est désactivé)."""
+    global _store
+    if _store is None and tracing_enabled():
+        with _store_lock:
+            if _store is None:
+                _store = TraceStore(get_app_config().get("trace_buffer_size", 200))
+    return _store
+
+
+def export_session_trace(session_id, path):
+    """
+    Écrit les traces d'une session au format Chrome trace-event (écriture
+    atomique). Sans effet si le traçage est désactivé ou la session inconnue.
+
+    Returns:
+        str ou None: chemin écrit
+    """
+    store = trace_store()
+    traces = store.for_session(session_id) if store is not None else []
+    if not traces:
+        return None
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(traces), f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def start_trace(session_id, user_id=None, interface="api"):
+    """Nouvelle trace de tour, ou `NULL_TRACE` si le traçage est désactivé."""
+    store = trace_store()
+    if store is None:
+        return NULL_TRACE
+    return store.start(session_id, user_id, interface)
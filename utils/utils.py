@@ -1,3 +1,69 @@
+# Dictionnaire de remplacement pour les emojis courants
+_EMOJI_REPLACEMENTS = {
+    '😀': ':sourire:',
+    '😃': ':sourire:',
+    '😄': ':sourire:',
+    '😁': ':sourire:',
+    '😆': ':sourire:',
+    '😅': ':sourire:',
+    '🤣': ':rire:',
+    '😂': ':rire:',
+    '🙂': ':sourire:',
+    '🙃': ':sourire:',
+    '😉': ':clin_doeil:',
+    '😊': ':sourire:',
+    '😇': ':sourire:',
+    '🥰': ':amour:',
+    '😍': ':amour:',
+    '🤩': ':star:',
+    '😘': ':bisou:',
+    '😗': ':bisou:',
+    '☺️': ':sourire:',
+    '😚': ':bisou:',
+    '😙': ':bisou:',
+    '🥲': ':sourire:',
+    '😋': ':miam:',
+    '😛': ':langue:',
+    '😜': ':langue:',
+    '🤪': ':fou:',
+    '😝': ':langue:',
+    '🤑': ':argent:',
+    '🤗': ':calin:',
+    '🤭': ':surprise:',
+    '🤫': ':chut:',
+    '🤔': ':reflexion:',
+    # Ajoutez d'autres emojis selon vos besoins
+}
+
+_MULTI_CHAR_EMOJI = '☺️'
+
+
+class _LogTranslation(dict):
+    """
+    Table pour `str.translate`, remplie à la demande : emojis connus remplacés,
+    autres caractères non-ASCII gardés s'ils existent en cp1252, '?' sinon.
+    Chaque caractère n'est évalué qu'une fois, puis mis en cache.
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        if codepoint < 128:
+            value = char
+        else:
+            try:
+                char.encode('cp1252')
+                value = char  # Si le caractère peut être encodé, le garder
+            except UnicodeEncodeError:
+                value = '?'  # Sinon le remplacer par '?'
+        self[codepoint] = value
+        return value
+
+
+_LOG_TRANSLATION = _LogTranslation(
+    (ord(emoji), replacement) for emoji, replacement in _EMOJI_REPLACEMENTS.items() if len(emoji) == 1
+)
+
+
 def sanitize_for_logging(text):
     """
     Nettoie un texte des caractères qui pourraient causer des problèmes avec le logging.
@@ -9,60 +75,9 @@ def sanitize_for_logging(text):
     Returns:
         Texte nettoyé compatible avec l'encodage des logs
     """
-    # Dictionnaire de remplacement pour les emojis courants
-    emoji_replacements = {
-        '😀': ':sourire:',
-        '😃': ':sourire:',
-        '😄': ':sourire:',
-        '😁': ':sourire:',
-        '😆': ':sourire:',
-        '😅': ':sourire:',
-        '🤣': ':rire:',
-        '😂': ':rire:',
-        '🙂': ':sourire:',
-        '🙃': ':sourire:',
-        '😉': ':clin_doeil:',
-        '😊': ':sourire:',
-        '😇': ':sourire:',
-        '🥰': ':amour:',
-        '😍': ':amour:',
-        '🤩': ':star:',
-        '😘': ':bisou:',
-        '😗': ':bisou:',
-        '☺️': ':sourire:',
-        '😚': ':bisou:',
-        '😙': ':bisou:',
-        '🥲': ':sourire:',
-        '😋': ':miam:',
-        '😛': ':langue:',
-        '😜': ':langue:',
-        '🤪': ':fou:',
-        '😝': ':langue:',
-        '🤑': ':argent:',
-        '🤗': ':calin:',
-        '🤭': ':surprise:',
-        '🤫': ':chut:',
-        '🤔': ':reflexion:',
-        # Ajoutez d'autres emojis selon vos besoins
-    }
-
-    # Remplacer les emojis connus
-    for emoji, replacement in emoji_replacements.items():
-        text = text.replace(emoji, replacement)
-
-    # Pour les autres caractères non-ASCII, les remplacer par '?'
-    # ou les ignorer complètement
-    cleaned_text = ''
-    for char in text:
-        if ord(char) < 128:
-            # Caractère ASCII standard
-            cleaned_text += char
-        else:
-            # Caractère non-ASCII
-            try:
-                char.encode('cp1252')
-                cleaned_text += char  # Si le caractère peut être encodé, le garder
-            except UnicodeEncodeError:
-                cleaned_text += '?'  # Sinon le remplacer par '?'
-
-    return cleaned_text
\ No newline at end of file
+    # Chemin rapide : la plupart des messages sont en ASCII pur
+    if text.isascii():
+        return text
+    # Seul emoji sur deux caractères (avec sélecteur de variante) : remplacé avant la table
+    text = text.replace(_MULTI_CHAR_EMOJI, _EMOJI_REPLACEMENTS[_MULTI_CHAR_EMOJI])
+    return text.translate(_LOG_TRANSLATION)